@@ -0,0 +1,375 @@
+"""
+Storage for per-paper artifacts (Phase 1 Markdown, stored Docling documents).
+
+Callers keep using logical paths such as data/markdown/<category>/<stem>.md
+and go through the helpers here (read_text, write_text, exists, size, stems,
+delete); the store behind a root decides how that is laid out on disk:
+
+    files  data/markdown/Req_2/paper.md                (default; plain files)
+    zstd   data/markdown/Req_2/3f/paper.md.zst         (zstd blobs, sharded into
+                                                         256 subdirectories by name hash)
+
+The layout of a root is recorded in <root>/_store.json, so every process (CLI,
+web server, worker) picks up a migration without configuration. The zstd
+store needs `pip install zstandard` and can use a dictionary trained on the
+corpus, which helps most for many small, similar files.
+
+Migrate an existing tree (stop the worker first):
+    python artifact_store.py migrate data/markdown --to zstd --train-dict
+    python artifact_store.py migrate data/markdown --to files      # back to plain files
+    python artifact_store.py info data/markdown
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.resolve()
+MARKDOWN_DIR = PROJECT_ROOT / "data" / "markdown"
+
+MARKER = "_store.json"
+DICT_DIR = "_zstd"             # trained dictionaries: <root>/_zstd/<dict_id>.zdict
+DEFAULT_ZSTD_LEVEL = 10
+DICT_SIZE = 112 * 1024
+DICT_SAMPLES = 2000
+
+
+class FileStore:
+    """Plain files in <root>/<category>/, the layout the pipeline has always used."""
+
+    backend = "files"
+    # Stored gzipped as <name>.gz (Docling documents are large and rarely read)
+    GZIP_SUFFIXES = (".docling.json",)
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def path(self, category, name):
+        """Where an artifact lives on disk."""
+        if name.endswith(self.GZIP_SUFFIXES):
+            name += ".gz"
+        return self.root / category / name
+
+    def _encode(self, name, data):
+        return gzip.compress(data, compresslevel=6) if name.endswith(self.GZIP_SUFFIXES) else data
+
+    def _decode(self, name, data):
+        return gzip.decompress(data) if name.endswith(self.GZIP_SUFFIXES) else data
+
+    def read_bytes(self, category, name):
+        with open(self.path(category, name), "rb") as f:
+            return self._decode(name, f.read())
+
+    def write_bytes(self, category, name, data):
+        path = self.path(category, name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(self._encode(name, data))
+        os.replace(tmp, path)  # Readers never see a half-written artifact
+
+    def exists(self, category, name):
+        return self.path(category, name).is_file()
+
+    def delete(self, category, name):
+        """Remove an artifact; returns True if there was one."""
+        try:
+            self.path(category, name).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    def size(self, category, name):
+        """Uncompressed size in bytes (raises OSError if missing)."""
+        if name.endswith(self.GZIP_SUFFIXES):
+            return len(self.read_bytes(category, name))
+        return self.path(category, name).stat().st_size
+
+    def _scan(self, category):
+        directory = self.root / category
+        if not directory.is_dir():
+            return []
+        return [e.name for e in os.scandir(directory) if e.is_file()]
+
+    def names(self, category):
+        """All artifact names in a category."""
+        names = []
+        for filename in self._scan(category):
+            if filename.endswith(".tmp"):
+                continue
+            if filename.endswith(".gz") and filename[:-3].endswith(self.GZIP_SUFFIXES):
+                filename = filename[:-3]
+            names.append(filename)
+        return names
+
+    def categories(self):
+        if not self.root.is_dir():
+            return []
+        return sorted(e.name for e in os.scandir(self.root) if e.is_dir() and not e.name.startswith("_"))
+
+
+class ZstdStore(FileStore):
+    """zstd-compressed blobs in <root>/<category>/<2 hex chars>/<name>.zst."""
+
+    backend = "zstd"
+
+    def __init__(self, root, level=DEFAULT_ZSTD_LEVEL, dict_id=None):
+        import zstandard
+        super().__init__(root)
+        self._zstd = zstandard
+        self.level = level
+        self.dict_id = dict_id
+        self._dicts = {}
+        self._local = threading.local()  # (de)compressors are not thread-safe
+
+    @staticmethod
+    def shard(name):
+        return hashlib.sha1(name.encode("utf-8")).hexdigest()[:2]
+
+    def path(self, category, name):
+        return self.root / category / self.shard(name) / f"{name}.zst"
+
+    def _dictionary(self, dict_id):
+        if dict_id not in self._dicts:
+            data = (self.root / DICT_DIR / f"{dict_id}.zdict").read_bytes()
+            self._dicts[dict_id] = self._zstd.ZstdCompressionDict(data)
+        return self._dicts[dict_id]
+
+    def _compressor(self):
+        if getattr(self._local, "compressor", None) is None:
+            dict_data = self._dictionary(self.dict_id) if self.dict_id else None
+            self._local.compressor = self._zstd.ZstdCompressor(level=self.level, dict_data=dict_data)
+        return self._local.compressor
+
+    def _encode(self, name, data):
+        return self._compressor().compress(data)
+
+    def _decode(self, name, data):
+        # Each frame names its dictionary, so blobs written before a retrain still read
+        dict_id = self._zstd.get_frame_parameters(data).dict_id
+        dict_data = self._dictionary(dict_id) if dict_id else None
+        return self._zstd.ZstdDecompressor(dict_data=dict_data).decompress(data)
+
+    def size(self, category, name):
+        with open(self.path(category, name), "rb") as f:
+            header = f.read(18)  # Frame header carries the content size
+        size = self._zstd.get_frame_parameters(header).content_size
+        if size < 0:  # Unknown (not written by this store)
+            return len(self.read_bytes(category, name))
+        return size
+
+    def _scan(self, category):
+        directory = self.root / category
+        if not directory.is_dir():
+            return []
+        names = []
+        for shard in os.scandir(directory):
+            if shard.is_dir() and len(shard.name) == 2:
+                names.extend(e.name[:-4] for e in os.scandir(shard.path) if e.name.endswith(".zst"))
+        return names
+
+    def names(self, category):
+        return self._scan(category)
+
+
+# --- Opening a root ---
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def read_marker(root):
+    try:
+        return json.loads((Path(root) / MARKER).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"backend": "files"}
+
+
+def make_store(root, config):
+    if config.get("backend", "files") == "zstd":
+        return ZstdStore(root, level=config.get("level", DEFAULT_ZSTD_LEVEL), dict_id=config.get("dict_id"))
+    return FileStore(root)
+
+
+def open_store(root):
+    """The store for an artifact root, as recorded in its marker (cached per root)."""
+    root = Path(root)
+    try:
+        version = (root / MARKER).stat().st_mtime_ns
+    except OSError:
+        version = None
+    key = str(root.resolve())
+    with _stores_lock:
+        cached = _stores.get(key)
+        if cached is None or cached[0] != version:
+            cached = (version, make_store(root, read_marker(root)))
+            _stores[key] = cached
+        return cached[1]
+
+
+# --- Path-based helpers: <root>/<category>/<name> ---
+
+def _locate(path):
+    path = Path(path)
+    return open_store(path.parent.parent), path.parent.name, path.name
+
+
+def read_bytes(path):
+    store, category, name = _locate(path)
+    return store.read_bytes(category, name)
+
+
+def write_bytes(path, data):
+    store, category, name = _locate(path)
+    store.write_bytes(category, name, data)
+
+
+def read_text(path):
+    return read_bytes(path).decode("utf-8")
+
+
+def write_text(path, text):
+    write_bytes(path, text.encode("utf-8"))
+
+
+def exists(path):
+    store, category, name = _locate(path)
+    return store.exists(category, name)
+
+
+def delete(path):
+    store, category, name = _locate(path)
+    return store.delete(category, name)
+
+
+def size(path):
+    """Uncompressed size in bytes; raises OSError if the artifact is missing."""
+    store, category, name = _locate(path)
+    return store.size(category, name)
+
+
+def disk_path(path):
+    """The file actually holding an artifact (for messages and manifest paths)."""
+    store, category, name = _locate(path)
+    return store.path(category, name)
+
+
+def stems(directory, suffix):
+    """Stems of the artifacts named <stem><suffix> in <root>/<category>."""
+    directory = Path(directory)
+    store = open_store(directory.parent)
+    return {name[:-len(suffix)] for name in store.names(directory.name) if name.endswith(suffix)}
+
+
+# --- Migration ---
+
+def train_dictionary(store, dict_size=DICT_SIZE, max_samples=DICT_SAMPLES):
+    """Train a zstd dictionary on up to max_samples Markdown artifacts of `store`."""
+    import zstandard
+    samples = []
+    for category in store.categories():
+        for name in store.names(category):
+            if name.endswith(".md"):
+                samples.append(store.read_bytes(category, name))
+            if len(samples) >= max_samples:
+                break
+        if len(samples) >= max_samples:
+            break
+    if len(samples) < 10:
+        print(f"   ⚠️  Only {len(samples)} Markdown files; not training a dictionary")
+        return None
+    return zstandard.train_dictionary(dict_size, samples)
+
+
+def migrate(root, backend, level=DEFAULT_ZSTD_LEVEL, train_dict=False):
+    """
+    Rewrite every artifact under `root` into the given layout, switch the
+    marker, then remove the old copies. Safe to re-run after an interruption.
+    """
+    root = Path(root)
+    source = open_store(root)
+    config = {"backend": backend}
+    if backend == "zstd":
+        config["level"] = level
+        if train_dict:
+            dictionary = train_dictionary(source)
+            if dictionary is not None:
+                (root / DICT_DIR).mkdir(parents=True, exist_ok=True)
+                (root / DICT_DIR / f"{dictionary.dict_id()}.zdict").write_bytes(dictionary.as_bytes())
+                config["dict_id"] = dictionary.dict_id()
+                print(f"   📖 Trained dictionary {dictionary.dict_id()} ({len(dictionary.as_bytes()) // 1024} KB)")
+        elif source.backend == "zstd" and source.dict_id:
+            config["dict_id"] = source.dict_id
+    target = make_store(root, config)
+
+    moved, before, after = [], 0, 0
+    if not (source.backend == target.backend == "files"):
+        for category in source.categories():
+            for name in source.names(category):
+                old_path, new_path = source.path(category, name), target.path(category, name)
+                before += old_path.stat().st_size
+                data = source.read_bytes(category, name)
+                target.write_bytes(category, name, data)  # zstd -> zstd re-compresses in place
+                if target.read_bytes(category, name) != data:
+                    raise RuntimeError(f"Verification failed for {category}/{name}; old files kept")
+                after += new_path.stat().st_size
+                moved.append((old_path, new_path))
+
+    # Switch readers to the new layout, then drop the old copies
+    tmp = root / (MARKER + ".tmp")
+    tmp.write_text(json.dumps(config, indent=2), encoding="utf-8")
+    os.replace(tmp, root / MARKER)
+    for old_path, new_path in moved:
+        if old_path != new_path:
+            old_path.unlink(missing_ok=True)
+    for category in source.categories():
+        for shard in (root / category).iterdir():
+            if shard.is_dir() and len(shard.name) == 2 and not any(shard.iterdir()):
+                shard.rmdir()
+
+    ratio = f" ({after / before:.0%} of the previous size)" if before else ""
+    print(f"✅ {len(moved)} artifacts now in the '{backend}' layout: "
+          f"{before / 1e6:.1f} MB → {after / 1e6:.1f} MB{ratio}")
+
+
+def info(root):
+    store = open_store(root)
+    count, stored, raw = 0, 0, 0
+    for category in store.categories():
+        for name in store.names(category):
+            count += 1
+            stored += store.path(category, name).stat().st_size
+            raw += store.size(category, name)
+    extra = f", level {store.level}, dictionary {store.dict_id or 'none'}" if store.backend == "zstd" else ""
+    print(f"📦 {root}: '{store.backend}' layout{extra}")
+    print(f"   {count} artifacts, {raw / 1e6:.1f} MB → {stored / 1e6:.1f} MB on disk")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or migrate a Paper Pipeline artifact store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_migrate = sub.add_parser("migrate", help="Rewrite all artifacts into another layout")
+    p_migrate.add_argument("root", nargs="?", default=str(MARKDOWN_DIR))
+    p_migrate.add_argument("--to", choices=["files", "zstd"], required=True)
+    p_migrate.add_argument("--level", type=int, default=DEFAULT_ZSTD_LEVEL, help="zstd level (default: %(default)s)")
+    p_migrate.add_argument("--train-dict", action="store_true",
+                           help="Train a zstd dictionary on the existing Markdown first")
+    p_info = sub.add_parser("info", help="Show the layout and sizes of a store")
+    p_info.add_argument("root", nargs="?", default=str(MARKDOWN_DIR))
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        try:
+            migrate(args.root, args.to, level=args.level, train_dict=args.train_dict)
+        except ImportError:
+            print("❌ The zstd layout needs the zstandard package: pip install zstandard")
+    else:
+        info(args.root)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,22 +3,31 @@ Paper Pipeline Web Interface - Flask Backend
 Serves the web application and exposes API endpoints for the paper processing pipeline.
 """
 
+import hashlib
+import json
 import os
 import sys
-import threading
-import uuid
+import time
 from datetime import datetime
 from pathlib import Path
-from queue import Queue
 from typing import Any
 
 import logging
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 
 # Add parent directory to path for pdf_processor import
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from pdf_processor import LocalPDFProcessor
+import artifact_store
+from pdf_processor import (DEFAULT_PHASE1_PROFILE, PHASE1_PROFILES, PROFILE_HASHES, PROMPT_VERSION,
+                           document_path, resolve_backend)
+from llm_pool import BackendPool
+from manifest import STATUSES, Manifest, file_id_for
+from job_store import JobStore, make_task
+from dataset_export import FORMATS as DATASET_FORMATS, DatasetExporter
+from result_cache import ResultCache
+from sla import SlaPolicy, backlog_eta_seconds
+from worker import LLM_BACKEND, Worker
 
 
 # Filter out noisy /api/status polling logs
@@ -49,167 +58,101 @@ INPUT_DIR = DATA_DIR / 'input'
 MARKDOWN_DIR = DATA_DIR / 'markdown'
 OUTPUT_DIR = DATA_DIR / 'output'
 
+# Backend, prompt layout, warm-up and watch settings (PAPER_PIPELINE_BACKEND,
+# ..._PROMPT_LAYOUT, ..._WARMUP, ..._WATCH) are read by the worker (worker.py)
+
+# Page size of /api/categories/<name>/files (default and maximum)
+FILES_PAGE_SIZE = 100
+FILES_PAGE_MAX = 1000
+
+# A worker seen within this many seconds counts as alive in /api/status
+WORKER_STALE_SECONDS = 30
+
 # Ensure data directories exist
 INPUT_DIR.mkdir(parents=True, exist_ok=True)
 MARKDOWN_DIR.mkdir(parents=True, exist_ok=True)
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# Per-paper status, paths and timings (data/manifest.db); synced with the data
+# folders at startup so PDFs copied in by hand or by main.py are picked up
+manifest = Manifest()
+manifest.sync(INPUT_DIR, MARKDOWN_DIR, OUTPUT_DIR)
+
 
 # ============= Processing Infrastructure =============
 
-# Job tracking
-jobs: dict[str, dict[str, Any]] = {}
-processing_queue: Queue[dict[str, Any]] = Queue()
+# Queue, jobs and worker state shared with the processing worker (data/jobs.db).
+# Under gunicorn the worker runs as its own process (worker.py); the
+# development server runs one in-process (see __main__).
+job_store = JobStore()
 
-# Processing state
-processing_state = {
-    "status": "idle",  # idle, running, paused
-    "current_file": None,
-    "current_phase": None,  # 1 (PDF→MD) or 2 (MD→JSON)
-    "queue_length": 0,
-}
+# Parsed results, re-read only when a JSON file changes (see result_cache.py)
+result_cache = ResultCache()
 
-# Processing lock
-processing_lock = threading.Lock()
+_llm_models: list[str] | None = None
 
-# Processor instance (lazy initialized)
-_processor: LocalPDFProcessor | None = None
 
+def llm_models() -> list[str]:
+    """Model names of the configured Phase 2 backend (to spot stale JSON)."""
+    global _llm_models
+    if _llm_models is None:
+        _llm_models = BackendPool.from_config(resolve_backend(LLM_BACKEND)).models
+    return _llm_models
 
-def get_processor() -> LocalPDFProcessor:
-    """Get or create the PDF processor instance."""
-    global _processor
-    if _processor is None:
-        _processor = LocalPDFProcessor(backend="ollama")
-    return _processor
+
+def conditional_response(etag: str, build) -> Response:
+    """Strong-ETag conditional GET: 304 if the client already has `etag`, else build().
+    
+    The body is only built (and files only read) when the client's copy is out of date.
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = build()
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'  # Cache, but revalidate on every use
+    return response
+
+
+def listing_etag(*parts: Any) -> str:
+    """ETag for a manifest-backed listing: the manifest version plus whatever shapes the response."""
+    key = json.dumps([manifest.version(), *parts], sort_keys=True, default=str)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
 
 
 def find_file_by_id(file_id: str) -> tuple[Path, str] | None:
     """Find a PDF file by its ID. Returns (file_path, category) or None."""
-    for category_dir in INPUT_DIR.iterdir():
-        if category_dir.is_dir():
-            for pdf_file in category_dir.glob("*.pdf"):
-                if generate_file_id(category_dir.name, pdf_file.name) == file_id:
-                    return (pdf_file, category_dir.name)
-    return None
+    row = manifest.get_by_file_id(file_id)
+    if row is None:
+        # Maybe a PDF added outside the web UI since the last sync
+        manifest.sync(INPUT_DIR, MARKDOWN_DIR, OUTPUT_DIR)
+        row = manifest.get_by_file_id(file_id)
+    if row is None:
+        return None
+    return (Path(row["pdf_path"]), row["category"])
 
 
-def process_single_file(pdf_path: Path, category: str, job_id: str) -> bool:
-    """Process a single PDF file through the full pipeline.
-    
-    Skips Phase 1 if markdown already exists (resumes from Phase 2).
-    """
-    global processing_state
-    
-    try:
-        processor = get_processor()
-        base_name = pdf_path.stem
-        md_path = MARKDOWN_DIR / category / f"{base_name}.md"
-        
-        # Check if we can skip Phase 1 (markdown already exists)
-        if md_path.exists():
-            print(f"   ⏭️  Skipping Phase 1 - markdown exists: {md_path.name}")
-        else:
-            # Phase 1: PDF → Markdown
-            with processing_lock:
-                processing_state["current_file"] = pdf_path.name
-                processing_state["current_phase"] = 1
-            
-            md_success = processor.convert_pdf_to_markdown(str(pdf_path), category)
-            
-            if not md_success:
-                return False
-        
-        # Phase 2: Markdown → JSON
-        with processing_lock:
-            processing_state["current_file"] = pdf_path.name
-            processing_state["current_phase"] = 2
-        
-        json_success = processor.generate_json_from_markdown(str(md_path), category)
-        
-        return json_success
-        
-    except Exception as e:
-        print(f"Error processing {pdf_path.name}: {e}")
-        return False
-
+def get_file_status(filename: str, category: str) -> str:
+    """File status from the manifest: pending, markdown, completed or failed."""
+    row = manifest.get(category, filename)
+    return row["status"] if row is not None else "pending"
 
-def background_processor():
-    """Background thread that processes files from the queue."""
-    global processing_state
-    
-    while True:
-        # Get next file from queue
-        task = processing_queue.get()
-        
-        if task is None:  # Shutdown signal
-            break
-        
-        job_id = task["job_id"]
-        pdf_path = task["pdf_path"]
-        category = task["category"]
-        file_id = task["file_id"]
-        
-        # Check if paused
-        while True:
-            with processing_lock:
-                if processing_state["status"] == "idle":
-                    # Job was cancelled
-                    processing_queue.task_done()
-                    continue
-                if processing_state["status"] == "running":
-                    break
-            # Paused - wait a bit
-            threading.Event().wait(0.5)
-        
-        # Update job status
-        with processing_lock:
-            processing_state["queue_length"] = processing_queue.qsize()
-            if job_id in jobs:
-                jobs[job_id]["status"] = "processing"
-                jobs[job_id]["current_file"] = pdf_path.name
-        
-        # Process the file
-        success = process_single_file(pdf_path, category, job_id)
-        
-        # Update job status
-        with processing_lock:
-            if job_id in jobs:
-                if success:
-                    jobs[job_id]["completed"].append(file_id)
-                else:
-                    jobs[job_id]["failed"].append(file_id)
-            
-            processing_state["queue_length"] = processing_queue.qsize()
-            
-            # If queue is empty, go idle
-            if processing_queue.empty():
-                processing_state["status"] = "idle"
-                processing_state["current_file"] = None
-                processing_state["current_phase"] = None
-                if job_id in jobs:
-                    jobs[job_id]["status"] = "completed"
-        
-        processing_queue.task_done()
 
+def category_profile(category: str) -> str:
+    """Phase 1 profile a category's files are converted with unless a job names one."""
+    return job_store.category_profiles().get(category, DEFAULT_PHASE1_PROFILE)
 
-# Start background processor thread
-processor_thread = threading.Thread(target=background_processor, daemon=True)
-processor_thread.start()
 
+def requested_profile() -> str | None:
+    """Phase 1 profile named by the request (?profile= or "profile" in a JSON body), or None.
 
-def get_file_status(filename: str, category: str) -> str:
-    """Determine file status based on existence of output files."""
-    base_name = Path(filename).stem
-    json_path = OUTPUT_DIR / category / f"{base_name}.json"
-    md_path = MARKDOWN_DIR / category / f"{base_name}.md"
-    
-    if json_path.exists():
-        return "completed"
-    elif md_path.exists():
-        return "markdown"
-    else:
-        return "pending"
+    Raises ValueError for a name that isn't a profile.
+    """
+    data = request.get_json(silent=True)
+    profile = request.args.get('profile', '').strip() or (data or {}).get('profile') or None
+    if profile is not None and profile not in PHASE1_PROFILES:
+        raise ValueError(f"Unknown profile '{profile}'. Choose from: {list(PHASE1_PROFILES)}")
+    return profile
 
 
 def get_category_stats(category_name: str) -> dict:
@@ -218,15 +161,10 @@ def get_category_stats(category_name: str) -> dict:
     if not category_path.is_dir():
         return {"file_count": 0, "status_summary": {}}
     
-    pdf_files = list(category_path.glob("*.pdf"))
-    status_summary = {"pending": 0, "markdown": 0, "completed": 0, "failed": 0}
-    
-    for pdf in pdf_files:
-        status = get_file_status(pdf.name, category_name)
-        status_summary[status] = status_summary.get(status, 0) + 1
+    status_summary = manifest.status_counts(category_name)
     
     return {
-        "file_count": len(pdf_files),
+        "file_count": sum(status_summary.values()),
         "status_summary": status_summary
     }
 
@@ -245,16 +183,71 @@ def health_check():
 
 # ============= Processing Status API Endpoints =============
 
+def estimate_remaining_seconds(state: dict[str, Any], sla: SlaPolicy | None = None) -> int | None:
+    """ETA for everything queued plus what is left of the file in flight.
+    
+    With the worker's SLA policy, files it would degrade are estimated at
+    degraded-mode rates.
+    """
+    return backlog_eta_seconds(state, job_store.queued_tasks(), degraded=sla)
+
+
 @app.route('/api/status', methods=['GET'])
 def get_status():
-    """Get current processing status and queue information."""
-    with processing_lock:
-        status_response = {
-            "status": processing_state["status"],  # idle, running, or paused
-            "current_file": processing_state["current_file"],
-            "current_phase": processing_state["current_phase"],  # 1 (PDF→MD) or 2 (MD→JSON)
-            "queue_length": processing_state["queue_length"],
-        }
+    """Get current processing status and queue information.
+    
+    Query params:
+        file_id: Also report where this file sits in the queue (optional)
+    """
+    state = job_store.state()
+    current = state.get("current")
+    status_response = {
+        "status": state["status"],  # idle, running, or paused
+        "current_file": Path(current["pdf_path"]).name if current else None,
+        "current_phase": state.get("current_phase"),  # 1 (PDF→MD) or 2 (MD→JSON)
+        "queue_length": job_store.qsize(),
+        "queue_lanes": job_store.lane_sizes(),
+    }
+    
+    # SLA mode as last decided by the worker (settings from this process's environment)
+    sla = SlaPolicy(mode=(state.get("sla") or {}).get("mode"))
+    status_response["eta_seconds"] = estimate_remaining_seconds(state, sla)
+    status_response["sla"] = {
+        **sla.status(),
+        **(state.get("sla") or {}),
+        "full_quality_eta_seconds": estimate_remaining_seconds(state) if sla.mode == "degraded" else None,
+        "degraded_papers": manifest.count_degraded(),
+    }
+    
+    file_id = request.args.get('file_id')
+    if file_id:
+        # {"lane": ..., "position": 1 = next}, "processing", or null if not queued
+        status_response["file_id"] = file_id
+        status_response["queue_position"] = (
+            "processing" if current and file_id == current["file_id"] else job_store.position(file_id)
+        )
+    
+    worker = state.get("worker")
+    status_response["worker"] = {
+        "pid": worker["pid"] if worker else None,
+        "alive": bool(worker) and time.time() - worker["heartbeat"] < WORKER_STALE_SECONDS,
+    }
+    
+    if state.get("watch"):
+        status_response["watch"] = state["watch"]
+    
+    # Per-endpoint health and latency, as last published by the worker
+    if state.get("llm_endpoints"):
+        status_response["llm_endpoints"] = state["llm_endpoints"]
+    
+    # Worker RSS, budget and recycles (memory_governor.py)
+    if state.get("memory"):
+        status_response["memory"] = state["memory"]
+    
+    status_response["phase1_profiles"] = {
+        "default": DEFAULT_PHASE1_PROFILE,
+        "by_category": state.get("category_profiles") or {},
+    }
     
     return jsonify(status_response)
 
@@ -263,84 +256,70 @@ def get_status():
 
 @app.route('/api/process/pause', methods=['POST'])
 def pause_processing():
-    """Pause processing after the current file completes."""
-    with processing_lock:
-        if processing_state["status"] == "idle":
-            return jsonify({
-                "error": "No processing in progress to pause"
-            }), 400
-        
-        if processing_state["status"] == "paused":
-            return jsonify({
-                "message": "Processing is already paused",
-                "status": "paused"
-            }), 200
-        
-        processing_state["status"] = "paused"
+    """Pause processing; the file in progress stops at its next checkpoint."""
+    previous = job_store.set_status("paused", unless=("idle", "paused"))
+    if previous == "idle":
+        return jsonify({
+            "error": "No processing in progress to pause"
+        }), 400
+    
+    if previous == "paused":
         return jsonify({
-            "message": "Processing will pause after current file completes",
-            "status": "paused",
-            "current_file": processing_state["current_file"]
+            "message": "Processing is already paused",
+            "status": "paused"
         }), 200
+    
+    # Phase 1 halts before its next page batch; a Phase 2 request is
+    # aborted and sent again on resume
+    current = job_store.state().get("current")
+    return jsonify({
+        "message": "Processing paused (the current file stops at its next page batch or LLM chunk)",
+        "status": "paused",
+        "current_file": Path(current["pdf_path"]).name if current else None
+    }), 200
 
 
 @app.route('/api/process/resume', methods=['POST'])
 def resume_processing():
     """Resume paused processing."""
-    with processing_lock:
-        if processing_state["status"] == "idle":
-            return jsonify({
-                "error": "No processing in progress to resume"
-            }), 400
-        
-        if processing_state["status"] == "running":
-            return jsonify({
-                "message": "Processing is already running",
-                "status": "running"
-            }), 200
-        
-        processing_state["status"] = "running"
+    previous = job_store.set_status("running", unless=("idle", "running"))
+    if previous == "idle":
+        return jsonify({
+            "error": "No processing in progress to resume"
+        }), 400
+    
+    if previous == "running":
         return jsonify({
-            "message": "Processing resumed",
-            "status": "running",
-            "queue_length": processing_state["queue_length"]
+            "message": "Processing is already running",
+            "status": "running"
         }), 200
+    
+    return jsonify({
+        "message": "Processing resumed",
+        "status": "running",
+        "queue_length": job_store.qsize()
+    }), 200
 
 
 @app.route('/api/process/cancel', methods=['POST'])
 def cancel_processing():
-    """Cancel processing and clear the queue."""
-    global processing_queue
-    
-    with processing_lock:
-        if processing_state["status"] == "idle":
-            return jsonify({
-                "message": "No processing in progress",
-                "status": "idle"
-            }), 200
-        
-        # Clear the queue by creating a new empty queue
-        items_cleared = processing_queue.qsize()
-        
-        # Drain the queue
-        while not processing_queue.empty():
-            try:
-                processing_queue.get_nowait()
-                processing_queue.task_done()
-            except Exception:
-                break
-        
-        # Reset state to idle
-        processing_state["status"] = "idle"
-        processing_state["current_file"] = None
-        processing_state["current_phase"] = None
-        processing_state["queue_length"] = 0
-        
+    """Cancel processing: clear the queue and stop the file in progress."""
+    if job_store.status() == "idle":
         return jsonify({
-            "message": "Processing cancelled and queue cleared",
-            "status": "idle",
-            "items_cleared": items_cleared
+            "message": "No processing in progress",
+            "status": "idle"
         }), 200
+    
+    # The worker stops the current file (closes its LLM stream or stops
+    # Docling before the next page batch) and puts the paper back to pending
+    items_cleared, cancelled_file = job_store.cancel()
+    
+    return jsonify({
+        "message": "Processing cancelled and queue cleared",
+        "status": "idle",
+        "items_cleared": items_cleared,
+        "cancelled_file": cancelled_file
+    }), 200
 
 
 # ============= Category API Endpoints =============
@@ -348,19 +327,28 @@ def cancel_processing():
 @app.route('/api/categories', methods=['GET'])
 def list_categories():
     """List all categories with file counts and status summary."""
-    categories = []
+    # Category folders being added or removed changes the input dir's mtime
+    profiles = job_store.category_profiles()
+    etag = listing_etag('categories', INPUT_DIR.stat().st_mtime_ns if INPUT_DIR.exists() else None,
+                        sorted(profiles.items()))
     
-    if INPUT_DIR.exists():
-        for item in sorted(INPUT_DIR.iterdir()):
-            if item.is_dir():
-                stats = get_category_stats(item.name)
-                categories.append({
-                    "name": item.name,
-                    "file_count": stats["file_count"],
-                    "status_summary": stats["status_summary"]
-                })
+    def build():
+        categories = []
+        
+        if INPUT_DIR.exists():
+            for item in sorted(INPUT_DIR.iterdir()):
+                if item.is_dir():
+                    stats = get_category_stats(item.name)
+                    categories.append({
+                        "name": item.name,
+                        "file_count": stats["file_count"],
+                        "status_summary": stats["status_summary"],
+                        "profile": profiles.get(item.name, DEFAULT_PHASE1_PROFILE)
+                    })
+        
+        return jsonify({"categories": categories})
     
-    return jsonify({"categories": categories})
+    return conditional_response(etag, build)
 
 
 @app.route('/api/categories', methods=['POST'])
@@ -381,6 +369,12 @@ def create_category():
     if any(c in name for c in ['/', '\\', '..', '\0']):
         return jsonify({"error": "Invalid category name"}), 400
     
+    # Optional Phase 1 profile for the category's files
+    try:
+        profile = requested_profile()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
     category_path = INPUT_DIR / name
     
     if category_path.exists():
@@ -391,13 +385,15 @@ def create_category():
         # Also create corresponding markdown and output directories
         (MARKDOWN_DIR / name).mkdir(parents=True, exist_ok=True)
         (OUTPUT_DIR / name).mkdir(parents=True, exist_ok=True)
+        job_store.set_category_profile(name, profile)
         
         return jsonify({
             "message": f"Category '{name}' created successfully",
             "category": {
                 "name": name,
                 "file_count": 0,
-                "status_summary": {"pending": 0, "markdown": 0, "completed": 0, "failed": 0}
+                "status_summary": {"pending": 0, "markdown": 0, "completed": 0, "failed": 0},
+                "profile": profile or DEFAULT_PHASE1_PROFILE
             }
         }), 201
     except OSError as e:
@@ -425,13 +421,18 @@ def delete_category(name: str):
     
     try:
         category_path.rmdir()
+        job_store.set_category_profile(name, None)
         
         # Also remove corresponding markdown and output directories if empty
         md_path = MARKDOWN_DIR / name
         out_path = OUTPUT_DIR / name
         
-        if md_path.exists() and md_path.is_dir() and not any(md_path.iterdir()):
-            md_path.rmdir()
+        if md_path.exists() and md_path.is_dir():
+            for shard in md_path.iterdir():  # Empty artifact store shards
+                if shard.is_dir() and not any(shard.iterdir()):
+                    shard.rmdir()
+            if not any(md_path.iterdir()):
+                md_path.rmdir()
         if out_path.exists() and out_path.is_dir() and not any(out_path.iterdir()):
             out_path.rmdir()
         
@@ -440,6 +441,32 @@ def delete_category(name: str):
         return jsonify({"error": f"Failed to delete category: {str(e)}"}), 500
 
 
+@app.route('/api/categories/<name>/profile', methods=['GET', 'PUT'])
+def category_profile_endpoint(name: str):
+    """Get or set the Phase 1 profile (fast, balanced, accurate) of a category.
+    
+    PUT body: {"profile": "fast"}; {"profile": null} goes back to the default.
+    Queued files pick up the new profile; files already converted with
+    another profile show up in /api/process/stale.
+    """
+    if not (INPUT_DIR / name).is_dir():
+        return jsonify({"error": f"Category '{name}' not found"}), 404
+    
+    if request.method == 'PUT':
+        try:
+            profile = requested_profile()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        job_store.set_category_profile(name, profile)
+    
+    return jsonify({
+        "category": name,
+        "profile": category_profile(name),
+        "profiles": list(PHASE1_PROFILES),
+        "default": DEFAULT_PHASE1_PROFILE
+    })
+
+
 # ============= File Upload API Endpoints =============
 
 def get_unique_filename(directory: Path, filename: str) -> str:
@@ -460,8 +487,7 @@ def get_unique_filename(directory: Path, filename: str) -> str:
 
 def generate_file_id(category: str, filename: str) -> str:
     """Generate a unique file ID based on category and filename."""
-    import hashlib
-    return hashlib.md5(f"{category}/{filename}".encode()).hexdigest()[:12]
+    return file_id_for(category, filename)
 
 
 def is_valid_pdf(file) -> bool:
@@ -512,8 +538,9 @@ def upload_file(name: str):
     
     try:
         file.save(str(file_path))
-        file_size = file_path.stat().st_size
-        file_id = generate_file_id(name, final_filename)
+        row = manifest.register_pdf(file_path, name)
+        file_size = row["pdf_size"]
+        file_id = row["file_id"]
         
         return jsonify({
             "message": "File uploaded successfully",
@@ -534,77 +561,101 @@ def upload_file(name: str):
 
 @app.route('/api/categories/<name>/files', methods=['GET'])
 def list_files(name: str):
-    """List all files in a category with their processing status."""
+    """List one page of a category's files with their processing status.
+    
+    Query parameters:
+        sort:   name (default), date, size or status
+        order:  asc (default) or desc
+        status: comma-separated statuses to include (pending, markdown, completed, failed)
+        limit:  page size (default 100, max FILES_PAGE_MAX)
+        cursor: next_cursor from the previous page
+    """
     category_path = INPUT_DIR / name
     
     # Validate category exists
     if not category_path.exists() or not category_path.is_dir():
         return jsonify({"error": f"Category '{name}' not found"}), 404
     
-    files = []
+    sort = request.args.get('sort', 'name')
+    order = request.args.get('order', 'asc')
+    statuses = [s for s in request.args.get('status', '').split(',') if s]
+    cursor = request.args.get('cursor') or None
     
-    for pdf_file in sorted(category_path.glob("*.pdf")):
-        stat = pdf_file.stat()
-        file_id = generate_file_id(name, pdf_file.name)
-        status = get_file_status(pdf_file.name, name)
+    if order not in ('asc', 'desc'):
+        return jsonify({"error": "order must be 'asc' or 'desc'"}), 400
+    unknown = [s for s in statuses if s not in STATUSES]
+    if unknown:
+        return jsonify({"error": f"Unknown status {unknown}. Choose from: {list(STATUSES)}"}), 400
+    try:
+        limit = min(max(1, int(request.args.get('limit', FILES_PAGE_SIZE))), FILES_PAGE_MAX)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    
+    def build():
+        rows, next_cursor = manifest.page_category(name, sort=sort, descending=(order == 'desc'),
+                                                   statuses=statuses, cursor=cursor, limit=limit)
+        files = []
         
-        # Get file creation/upload time (use mtime as closest approximation)
-        upload_date = datetime.fromtimestamp(stat.st_mtime).isoformat()
+        for row in rows:
+            # Get file creation/upload time (use mtime as closest approximation)
+            upload_date = datetime.fromtimestamp(row["pdf_mtime"]).isoformat()
+            
+            files.append({
+                "id": row["file_id"],
+                "filename": row["filename"],
+                "category": name,
+                "status": row["status"],
+                "size": row["pdf_size"],
+                "upload_date": upload_date,
+                "error": row["error"]
+            })
         
-        files.append({
-            "id": file_id,
-            "filename": pdf_file.name,
+        return jsonify({
             "category": name,
-            "status": status,
-            "size": stat.st_size,
-            "upload_date": upload_date
+            "files": files,
+            "next_cursor": next_cursor,
+            "total_count": manifest.count_category(name, statuses),
+            "status_counts": manifest.status_counts(name)
         })
     
-    return jsonify({
-        "category": name,
-        "files": files,
-        "total_count": len(files)
-    })
+    try:
+        return conditional_response(listing_etag('files', name, sort, order, statuses, cursor, limit), build)
+    except ValueError as e:  # Unknown sort or bad cursor
+        return jsonify({"error": str(e)}), 400
 
 
 # ============= Processing Trigger API Endpoints =============
 
 def create_job(file_count: int) -> str:
     """Create a new processing job and return its ID."""
-    job_id = str(uuid.uuid4())[:8]
-    jobs[job_id] = {
-        "id": job_id,
-        "status": "queued",
-        "created_at": datetime.now().isoformat(),
-        "total_files": file_count,
-        "completed": [],
-        "failed": [],
-        "current_file": None
-    }
-    return job_id
+    return job_store.create_job(file_count)
 
 
-def queue_files_for_processing(file_list: list[tuple[Path, str]], job_id: str) -> None:
-    """Add files to the processing queue."""
-    global processing_state
-    
-    for pdf_path, category in file_list:
-        file_id = generate_file_id(category, pdf_path.name)
-        processing_queue.put({
-            "job_id": job_id,
-            "pdf_path": pdf_path,
-            "category": category,
-            "file_id": file_id
-        })
+def queue_files_for_processing(file_list: list[tuple[Path, str]], job_id: str, lane: str = "bulk",
+                               profile: str | None = None) -> None:
+    """Add files to the processing queue (the shared job store).
     
-    with processing_lock:
-        processing_state["status"] = "running"
-        processing_state["queue_length"] = processing_queue.qsize()
+    lane is "interactive" for single-file requests (served first) or "bulk".
+    profile is the job's Phase 1 profile (None: each file's category profile).
+    Files that are already queued are not added twice.
+    """
+    tasks = [make_task(job_id, pdf_path, category, manifest.get(category, pdf_path.name), profile)
+             for pdf_path, category in file_list]
+    job_store.put_many(tasks, lane=lane)
 
 
 @app.route('/api/process/file/<file_id>', methods=['POST'])
 def process_file(file_id: str):
-    """Trigger full pipeline processing for a single file."""
+    """Trigger full pipeline processing for a single file.
+    
+    Query params / JSON body:
+        profile: Phase 1 profile for this job (default: the category's)
+    """
+    try:
+        profile = requested_profile()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
     result = find_file_by_id(file_id)
     
     if result is None:
@@ -620,13 +671,15 @@ def process_file(file_id: str):
             "suggestion": "Use /api/files/<file_id>/reprocess to reprocess"
         }), 400
     
-    # Create job and queue file
+    # Create job and queue file ahead of bulk jobs
     job_id = create_job(1)
-    queue_files_for_processing([(pdf_path, category)], job_id)
+    queue_files_for_processing([(pdf_path, category)], job_id, lane="interactive", profile=profile)
     
     return jsonify({
         "message": "Processing started",
         "job_id": job_id,
+        "queue_position": job_store.position(file_id),
+        "profile": profile or category_profile(category),
         "file": {
             "id": file_id,
             "filename": pdf_path.name,
@@ -637,18 +690,27 @@ def process_file(file_id: str):
 
 @app.route('/api/process/category/<name>', methods=['POST'])
 def process_category(name: str):
-    """Trigger processing for all pending files in a category."""
+    """Trigger processing for all pending files in a category.
+    
+    Query params / JSON body:
+        profile: Phase 1 profile for this job (default: the category's)
+    """
+    try:
+        profile = requested_profile()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
     category_path = INPUT_DIR / name
     
     if not category_path.exists() or not category_path.is_dir():
         return jsonify({"error": f"Category '{name}' not found"}), 404
     
-    # Find all pending files in category
-    pending_files: list[tuple[Path, str]] = []
-    for pdf_file in category_path.glob("*.pdf"):
-        status = get_file_status(pdf_file.name, name)
-        if status in ["pending", "markdown"]:  # Include markdown (phase 1 done, need phase 2)
-            pending_files.append((pdf_file, name))
+    # Find all unfinished files in category (markdown = phase 1 done, need phase 2;
+    # failed ones are retried)
+    pending_files: list[tuple[Path, str]] = [
+        (Path(row["pdf_path"]), name)
+        for row in manifest.list_category(name, statuses=["pending", "markdown", "failed"])
+    ]
     
     if not pending_files:
         return jsonify({
@@ -657,28 +719,33 @@ def process_category(name: str):
     
     # Create job and queue files
     job_id = create_job(len(pending_files))
-    queue_files_for_processing(pending_files, job_id)
+    queue_files_for_processing(pending_files, job_id, profile=profile)
     
     return jsonify({
         "message": f"Processing started for {len(pending_files)} files",
         "job_id": job_id,
         "category": name,
-        "file_count": len(pending_files)
+        "file_count": len(pending_files),
+        "profile": profile or category_profile(name)
     }), 202
 
 
 @app.route('/api/process/all', methods=['POST'])
 def process_all():
-    """Trigger processing for all pending files across all categories."""
-    pending_files: list[tuple[Path, str]] = []
+    """Trigger processing for all pending files across all categories.
     
-    for category_dir in INPUT_DIR.iterdir():
-        if category_dir.is_dir():
-            category_name = category_dir.name
-            for pdf_file in category_dir.glob("*.pdf"):
-                status = get_file_status(pdf_file.name, category_name)
-                if status in ["pending", "markdown"]:
-                    pending_files.append((pdf_file, category_name))
+    Query params / JSON body:
+        profile: Phase 1 profile for this job (default: each file's category profile)
+    """
+    try:
+        profile = requested_profile()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    pending_files: list[tuple[Path, str]] = [
+        (Path(row["pdf_path"]), row["category"])
+        for row in manifest.list_papers(statuses=["pending", "markdown", "failed"])
+    ]
     
     if not pending_files:
         return jsonify({
@@ -687,7 +754,7 @@ def process_all():
     
     # Create job and queue files
     job_id = create_job(len(pending_files))
-    queue_files_for_processing(pending_files, job_id)
+    queue_files_for_processing(pending_files, job_id, profile=profile)
     
     # Count by category
     category_counts: dict[str, int] = {}
@@ -698,7 +765,67 @@ def process_all():
         "message": f"Processing started for {len(pending_files)} files",
         "job_id": job_id,
         "total_files": len(pending_files),
-        "by_category": category_counts
+        "by_category": category_counts,
+        "profile": profile
+    }), 202
+
+
+@app.route('/api/process/stale', methods=['POST'])
+def process_stale():
+    """Reprocess files whose outputs were made from other inputs than the current ones.
+    
+    A changed PDF or Phase 1 (Docling) options redo both phases; a changed
+    Markdown, prompt or model redoes only Phase 2. Markdown counts as stale
+    when it was made with other settings than its category's Phase 1
+    profile, or than the profile the request names.
+    
+    Query params (profile also as JSON body):
+        category: Limit to one category (optional)
+        profile: Phase 1 profile to compare against and reprocess with (optional)
+    """
+    try:
+        profile = requested_profile()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    category = request.args.get('category', '').strip() or None
+    if category is not None and not (INPUT_DIR / category).is_dir():
+        return jsonify({"error": f"Category '{category}' not found"}), 404
+    
+    try:
+        models = llm_models()
+    except ValueError as e:  # Bad PAPER_PIPELINE_BACKEND (e.g. a pool entry without a model)
+        return jsonify({"error": f"Invalid LLM backend configuration: {e}"}), 500
+    
+    manifest.sync(INPUT_DIR, MARKDOWN_DIR, OUTPUT_DIR, category)
+    stale = []
+    for cat in [category] if category is not None else manifest.categories():
+        expected = PROFILE_HASHES[profile or category_profile(cat)]
+        stale += manifest.stale(expected, PROMPT_VERSION, models, cat)
+    
+    if not stale:
+        return jsonify({
+            "message": "No stale files to reprocess"
+        }), 200
+    
+    # Mark the changed phase (and everything after it) as pending again
+    stale_files: list[tuple[Path, str]] = []
+    by_phase = {"phase1": 0, "phase2": 0}
+    for row, phase in stale:
+        manifest.reset(row["category"], row["filename"], from_phase=phase)
+        stale_files.append((Path(row["pdf_path"]), row["category"]))
+        by_phase[f"phase{phase}"] += 1
+    
+    job_id = create_job(len(stale_files))
+    queue_files_for_processing(stale_files, job_id, profile=profile)
+    
+    return jsonify({
+        "message": f"Reprocessing started for {len(stale_files)} stale files",
+        "job_id": job_id,
+        "category": category,
+        "file_count": len(stale_files),
+        "from_phase": by_phase,
+        "profile": profile
     }), 202
 
 
@@ -706,9 +833,7 @@ def process_all():
 
 @app.route('/api/results/<file_id>', methods=['GET'])
 def get_results(file_id: str):
-    """Get parsed JSON content for a processed file."""
-    import json
-    
+    """Get parsed JSON content for a processed file (cached, with a strong ETag)."""
     result = find_file_by_id(file_id)
     
     if result is None:
@@ -729,15 +854,7 @@ def get_results(file_id: str):
         }), 404
     
     try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            content = json.load(f)
-        
-        return jsonify({
-            "file_id": file_id,
-            "filename": pdf_path.name,
-            "category": category,
-            "results": content
-        })
+        entry = result_cache.get(json_path)
     except json.JSONDecodeError as e:
         return jsonify({
             "error": "Failed to parse JSON results",
@@ -747,13 +864,18 @@ def get_results(file_id: str):
         return jsonify({
             "error": f"Failed to read results file: {str(e)}"
         }), 500
+    
+    def build():
+        # Splice the cached JSON text in instead of re-serialising the results
+        header = json.dumps({"file_id": file_id, "filename": pdf_path.name, "category": category})
+        return Response(f'{header[:-1]}, "results": {entry.text}}}', mimetype='application/json')
+    
+    return conditional_response(f"{entry.digest}-{file_id}", build)
 
 
 @app.route('/api/results/<file_id>/raw', methods=['GET'])
 def get_results_raw(file_id: str):
     """Get raw JSON file content for a processed file."""
-    from flask import Response
-    
     result = find_file_by_id(file_id)
     
     if result is None:
@@ -773,7 +895,7 @@ def get_results_raw(file_id: str):
             "suggestion": "Use /api/process/file/<file_id> to process this file"
         }), 404
     
-    try:
+    def build():
         with open(json_path, 'r', encoding='utf-8') as f:
             content = f.read()
         
@@ -784,6 +906,13 @@ def get_results_raw(file_id: str):
                 'Content-Disposition': f'attachment; filename="{base_name}.json"'
             }
         )
+    
+    try:
+        try:
+            etag = result_cache.get(json_path).digest
+        except json.JSONDecodeError:
+            return build()  # Serve unparseable files as-is so they can be inspected
+        return conditional_response(etag, build)
     except OSError as e:
         return jsonify({
             "error": f"Failed to read results file: {str(e)}"
@@ -818,11 +947,13 @@ def delete_file(file_id: str):
     except OSError as e:
         errors.append(f"Failed to delete PDF: {str(e)}")
     
-    # Delete markdown output
+    # Delete markdown output and the stored Docling document
     try:
-        if md_path.exists():
-            md_path.unlink()
+        if artifact_store.delete(md_path):
             deleted_files.append(f"markdown/{category}/{base_name}.md")
+        doc_path = document_path(md_path)
+        if artifact_store.delete(doc_path):
+            deleted_files.append(f"markdown/{category}/{doc_path.name}")
     except OSError as e:
         errors.append(f"Failed to delete markdown: {str(e)}")
     
@@ -834,6 +965,9 @@ def delete_file(file_id: str):
     except OSError as e:
         errors.append(f"Failed to delete JSON: {str(e)}")
     
+    if not pdf_path.exists():
+        manifest.remove(category, pdf_path.name)
+    
     if errors:
         return jsonify({
             "message": "File deletion completed with errors",
@@ -855,7 +989,16 @@ def delete_file(file_id: str):
 
 @app.route('/api/files/<file_id>/reprocess', methods=['POST'])
 def reprocess_file(file_id: str):
-    """Clear outputs and queue file for reprocessing."""
+    """Clear outputs and queue file for reprocessing.
+    
+    Query params / JSON body:
+        profile: Phase 1 profile for this job (default: the category's)
+    """
+    try:
+        profile = requested_profile()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
     result = find_file_by_id(file_id)
     
     if result is None:
@@ -872,8 +1015,7 @@ def reprocess_file(file_id: str):
     
     # Clear markdown output
     try:
-        if md_path.exists():
-            md_path.unlink()
+        if artifact_store.delete(md_path):
             cleared_files.append(f"markdown/{category}/{base_name}.md")
     except OSError as e:
         return jsonify({
@@ -890,9 +1032,11 @@ def reprocess_file(file_id: str):
             "error": f"Failed to clear JSON output: {str(e)}"
         }), 500
     
-    # Queue file for reprocessing
+    manifest.reset(category, pdf_path.name)
+    
+    # Queue file for reprocessing ahead of bulk jobs
     job_id = create_job(1)
-    queue_files_for_processing([(pdf_path, category)], job_id)
+    queue_files_for_processing([(pdf_path, category)], job_id, lane="interactive", profile=profile)
     
     return jsonify({
         "message": "File outputs cleared and queued for reprocessing",
@@ -900,6 +1044,7 @@ def reprocess_file(file_id: str):
         "file_id": file_id,
         "filename": pdf_path.name,
         "category": category,
+        "profile": profile or category_profile(category),
         "cleared_outputs": cleared_files
     }), 202
 
@@ -995,8 +1140,6 @@ def search_files():
     
     Returns matching files with relevance snippets.
     """
-    import json
-    
     query = request.args.get('q', '').strip()
     category_filter = request.args.get('category', '').strip()
     
@@ -1025,8 +1168,7 @@ def search_files():
         
         for json_file in category_dir.glob("*.json"):
             try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    json_data = json.load(f)
+                json_data = result_cache.get(json_file).data
                 
                 # Search in the JSON content
                 matches = search_in_json_result(json_data, query)
@@ -1071,14 +1213,16 @@ def search_files():
 
 def create_export_zip(
     files_to_export: list[tuple[Path, str, str]],  # (file_path, archive_name, file_type)
-    include_pdfs: bool = False
+    include_pdfs: bool = False,
+    compress: bool = True
 ) -> bytes:
     """Create a zip file in memory with the given files.
     
     Args:
         files_to_export: List of tuples (file_path, archive_name, file_type)
-            where file_type is 'json' or 'pdf'
+            where file_type is 'json', 'pdf' or 'dataset'
         include_pdfs: Whether to include PDF files along with JSONs
+        compress: Deflate entries (off for files that are already compressed)
     
     Returns:
         Bytes of the zip file
@@ -1088,7 +1232,7 @@ def create_export_zip(
     
     buffer = io.BytesIO()
     
-    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED) as zf:
         for file_path, archive_name, file_type in files_to_export:
             if file_type == 'pdf' and not include_pdfs:
                 continue
@@ -1099,18 +1243,65 @@ def create_export_zip(
     return buffer.getvalue()
 
 
+def export_dataset(fmt: str, categories: list[str] | None, label: str) -> Response:
+    """Download the columnar dataset (see dataset_export.py), updated first.
+    
+    parquet: zip of the hive-partitioned directory (category=<name>/part-*.parquet)
+    ndjson:  one .ndjson.gz; partitions are gzip members, so they concatenate as-is
+    """
+    try:
+        exporter = DatasetExporter(fmt)
+    except ImportError:
+        return jsonify({
+            "error": "Parquet export needs pyarrow on the server",
+            "suggestion": "pip install pyarrow, or use format=ndjson"
+        }), 400
+    exporter.update(categories)
+    files = exporter.files(categories)
+    
+    if not files:
+        return jsonify({"error": "No processed files to export"}), 404
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    headers = {'X-Export-File-Count': str(exporter.paper_count(categories))}
+    
+    if fmt == 'parquet':
+        data = create_export_zip([(path, name, 'dataset') for path, name in files], compress=False)
+        mimetype, filename = 'application/zip', f"export_{label}_{timestamp}.parquet.zip"
+    else:
+        # Open everything first: a concurrent rewrite replaces files, it doesn't truncate them
+        handles = [open(path, 'rb') for path, _ in files]
+        try:
+            data = b''.join(handle.read() for handle in handles)
+        finally:
+            for handle in handles:
+                handle.close()
+        mimetype, filename = 'application/gzip', f"export_{label}_{timestamp}.ndjson.gz"
+    
+    headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    headers['Content-Length'] = str(len(data))
+    return Response(data, mimetype=mimetype, headers=headers)
+
+
+def export_format() -> str:
+    """The ?format= of an export request: zip (default) or a dataset format."""
+    fmt = request.args.get('format', 'zip').lower()
+    if fmt != 'zip' and fmt not in DATASET_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}' (zip, {', '.join(DATASET_FORMATS)})")
+    return fmt
+
+
 @app.route('/api/export/category/<name>', methods=['GET'])
 def export_category(name: str):
     """Export all processed JSON results in a category as a zip file.
     
     Query params:
         include_pdf: If 'true', includes original PDF files (default: false)
+        format: 'zip' (default), or 'parquet' / 'ndjson' for the flattened dataset
     
     Returns:
         Zip file containing JSON results and optionally PDFs
     """
-    from flask import Response
-    
     category_output_dir = OUTPUT_DIR / name
     category_input_dir = INPUT_DIR / name
     
@@ -1118,6 +1309,13 @@ def export_category(name: str):
     if not category_input_dir.exists() or not category_input_dir.is_dir():
         return jsonify({"error": f"Category '{name}' not found"}), 404
     
+    try:
+        fmt = export_format()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if fmt != 'zip':
+        return export_dataset(fmt, [name], name)
+    
     include_pdfs = request.args.get('include_pdf', 'false').lower() == 'true'
     
     # Collect all JSON files in the category
@@ -1166,11 +1364,17 @@ def export_all():
     
     Query params:
         include_pdf: If 'true', includes original PDF files (default: false)
+        format: 'zip' (default), or 'parquet' / 'ndjson' for the flattened dataset
     
     Returns:
         Zip file containing JSON results and optionally PDFs, organized by category
     """
-    from flask import Response
+    try:
+        fmt = export_format()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if fmt != 'zip':
+        return export_dataset(fmt, None, 'all')
     
     include_pdfs = request.args.get('include_pdf', 'false').lower() == 'true'
     
@@ -1224,5 +1428,11 @@ def export_all():
 
 
 if __name__ == '__main__':
+    # Development server. Unless a separate worker.py is running
+    # (PAPER_PIPELINE_EXTERNAL_WORKER=1), process files in this process; with
+    # the reloader only its child process (WERKZEUG_RUN_MAIN) runs the worker.
+    if (os.environ.get('PAPER_PIPELINE_EXTERNAL_WORKER', '0') != '1'
+            and os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        Worker(job_store, manifest).start()
     # Bind to 0.0.0.0 for LAN accessibility
     app.run(host='0.0.0.0', port=5000, debug=True)
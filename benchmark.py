@@ -0,0 +1,550 @@
+"""
+Benchmarks for the paper pipeline.
+
+Usage:
+    python benchmark.py prefix-cache                 # Prefill tokens saved per prompt layout
+    python benchmark.py prefix-cache --runs 3 --limit 50
+    python benchmark.py import-time                  # CLI / processor startup cost
+    python benchmark.py import-time --with-docling   # ... plus Phase 1 cold start
+    python benchmark.py phase2-order --parallel 4    # Wait time / makespan per Phase 2 order
+    python benchmark.py raster-cache --pdf paper.pdf # Rasterisation saved by the page cache
+    python benchmark.py figure-scale                 # VLM figures/s: fixed vs adaptive scale
+    python benchmark.py vlm-api --concurrency 8      # Figures/s on a vision server: serial vs concurrent
+
+All LLM benchmarks run against the local mock server (mock_llm_server.py),
+so they need no GPU and measure the pipeline's request shape, not the model.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import artifact_store
+import mock_llm_server
+from figure_triage import fit_to_budget, vision_tokens
+from llm_pool import BackendPool
+from manifest import Manifest
+from pdf_processor import DOCUMENT_SUFFIX, PHASE1_OPTIONS, SYSTEM_PROMPT, VLM_API_CONCURRENCY, PROMPT_LAYOUTS, build_user_message, prefix_group_key
+from raster_cache import RasterCache
+from scheduling import CHARS_PER_TOKEN, PHASE2_ORDERS, SYSTEM_PROMPT_TOKENS, order_by_size
+
+MARKDOWN_DIR = Path("data/markdown")
+INPUT_DIR = Path("data/input")
+
+
+def load_corpus(markdown_dir, limit, synthetic_docs=20, synthetic_words=6000):
+    """Markdown docs from data/markdown, or a reproducible synthetic corpus if there are none."""
+    markdown_dir = Path(markdown_dir)
+    md_files = sorted((stem, category)
+                      for category in artifact_store.open_store(markdown_dir).categories()
+                      for stem in artifact_store.stems(markdown_dir / category, ".md"))
+    docs = [(stem, category, artifact_store.read_text(markdown_dir / category / f"{stem}.md"))
+            for stem, category in md_files[:limit]]
+    if docs:
+        return docs
+
+    rng = random.Random(42)
+    vocab = [f"term{i}" for i in range(2000)]
+    for i in range(min(limit, synthetic_docs)):
+        body = " ".join(rng.choice(vocab) for _ in range(synthetic_words))
+        docs.append((f"Synthetic-{i + 1:03d}", "Synthetic", f"# Synthetic Paper {i + 1}\n\n{body}"))
+    return docs
+
+
+def add_duplicates(docs, fraction):
+    """
+    Re-file a fraction of papers under a second category (same content,
+    different PAPER ID / CATEGORY), appended at the end the way a
+    category-by-category run would reach them.
+    """
+    count = int(len(docs) * fraction)
+    rng = random.Random(7)
+    extra = [(f"{paper_id}-dup", f"{category}_Copy", text)
+             for paper_id, category, text in rng.sample(docs, count)]
+    return docs + extra
+
+
+def order_requests(docs, layout):
+    """Same scheduling as main.py: group shared prefixes when using the prefix-cache layout."""
+    if layout != "prefix-cache":
+        return docs
+    groups = {}
+    for doc in docs:
+        groups.setdefault(prefix_group_key(doc[2]), []).append(doc)
+    return [doc for group in groups.values() for doc in group]
+
+
+def warm_clients(pool):
+    """Create each endpoint's OpenAI client up front so the first timed request doesn't pay for it."""
+    for endpoint in pool.endpoints:
+        endpoint.client
+
+
+def bench_prefix_cache(args):
+    server, base_url = mock_llm_server.start_in_thread(port=0, cache_tokens=args.cache_tokens)
+    pool = BackendPool.from_config([{"name": "mock", "base_url": base_url, "model": "mock-model"}])
+    warm_clients(pool)
+    docs = add_duplicates(load_corpus(args.markdown_dir, args.limit), args.duplicates)
+
+    print("=" * 70)
+    print("🧪 PREFIX CACHE BENCHMARK (mock server)")
+    print("=" * 70)
+    print(f"Requests per run: {len(docs)} (incl. {args.duplicates:.0%} duplicates) | "
+          f"Runs per layout: {args.runs} | Cache: {args.cache_tokens:,} tokens")
+
+    results = {}
+    for layout in PROMPT_LAYOUTS:
+        server.cache.reset()
+        print(f"\n📐 Layout: {layout}")
+        print("-" * 70)
+        print(f"{'Run':<6} {'Prompt tok':>12} {'Cached tok':>12} {'Prefill tok':>12} {'Saved':>8} {'Time':>8}")
+        print("-" * 70)
+
+        per_run = []
+        for run in range(1, args.runs + 1):
+            prompt_tokens = cached_tokens = 0
+            start = time.time()
+            for paper_id, category, text in order_requests(docs, layout):
+                completion, _ = pool.chat_completion(
+                    messages=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": build_user_message(paper_id, category, text, layout)},
+                    ],
+                    temperature=0.3,
+                    max_tokens=8192,
+                )
+                prompt_tokens += completion.usage.prompt_tokens
+                cached_tokens += completion.usage.prompt_tokens_details.cached_tokens
+            elapsed = time.time() - start
+
+            saved = cached_tokens / prompt_tokens * 100 if prompt_tokens else 0.0
+            per_run.append((prompt_tokens, cached_tokens))
+            print(f"{run:<6} {prompt_tokens:>12,} {cached_tokens:>12,} {prompt_tokens - cached_tokens:>12,} "
+                  f"{saved:>7.1f}% {elapsed:>7.2f}s")
+        results[layout] = per_run
+
+    print("\n📊 PREFILL TOKENS SAVED vs header-first")
+    print("-" * 70)
+    baseline = results["header-first"]
+    for layout, per_run in results.items():
+        if layout == "header-first":
+            continue
+        for run, ((_, base_cached), (_, cached)) in enumerate(zip(baseline, per_run), 1):
+            print(f"{layout} run {run}: {cached - base_cached:+,} cached tokens")
+    print("=" * 70)
+    server.shutdown()
+
+
+# Runs in a fresh interpreter so nothing is already imported
+STARTUP_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+from pdf_processor import LocalPDFProcessor
+t1 = time.perf_counter()
+processor = LocalPDFProcessor(backend="vllm")
+t2 = time.perf_counter()
+result = {"import": t1 - t0, "init": t2 - t1,
+          "docling_loaded": "docling" in sys.modules, "torch_loaded": "torch" in sys.modules}
+if WITH_DOCLING:
+    from docling.datamodel.base_models import InputFormat
+    processor.converter.initialize_pipeline(InputFormat.PDF)
+    result["phase1_cold_start"] = time.perf_counter() - t2
+print(json.dumps(result))
+"""
+
+
+def bench_import_time(args):
+    print("=" * 70)
+    print("⏱️  STARTUP BENCHMARK (fresh interpreter per run)")
+    print("=" * 70)
+
+    probe = f"WITH_DOCLING = {bool(args.with_docling)}\n" + STARTUP_PROBE
+    samples = []
+    for _ in range(args.runs):
+        out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    cli_times = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "main.py", "--list"], capture_output=True, check=True)
+        cli_times.append(time.perf_counter() - start)
+
+    def row(label, values):
+        print(f"{label:<34} {statistics.median(values):>8.3f}s {min(values):>8.3f}s {max(values):>8.3f}s")
+
+    print(f"{'Measurement':<34} {'Median':>9} {'Min':>9} {'Max':>9}")
+    print("-" * 70)
+    row("import pdf_processor", [s["import"] for s in samples])
+    row("LocalPDFProcessor() (Phase 2 ready)", [s["init"] for s in samples])
+    row("python main.py --list (wall)", cli_times)
+    if args.with_docling:
+        row("Phase 1 cold start (models loaded)", [s["phase1_cold_start"] for s in samples])
+    print("-" * 70)
+    print(f"Docling imported before Phase 1: {'❌ yes' if samples[0]['docling_loaded'] else '✅ no'}")
+    print(f"torch imported before Phase 1:   {'❌ yes' if samples[0]['torch_loaded'] else '✅ no'}")
+    print("=" * 70)
+
+
+def bench_phase2_order(args):
+    server, base_url = mock_llm_server.start_in_thread(port=0, prefill_ms_per_1k=args.ms_per_1k,
+                                                       cache_tokens=0)
+    pool = BackendPool.from_config([{"name": "mock", "base_url": base_url, "model": "mock-model"}])
+    warm_clients(pool)
+
+    # Skewed sizes like a real corpus: mostly short papers, a few long theses
+    rng = random.Random(11)
+    docs = []
+    for i in range(args.requests):
+        words = int(rng.lognormvariate(8.3, 0.8))
+        docs.append((f"Doc-{i + 1:03d}", " ".join(f"w{rng.randrange(5000)}" for _ in range(words))))
+
+    print("=" * 70)
+    print(f"🧪 PHASE 2 ORDER BENCHMARK (mock server, {args.ms_per_1k:g} ms per 1k prompt tokens)")
+    print("=" * 70)
+    print(f"Requests: {len(docs)} | In flight: {args.parallel}")
+    print(f"{'Order':<10} {'Mean wait':>11} {'p95 wait':>11} {'Makespan':>11} {'Tokens/s':>11}")
+    print("-" * 70)
+
+    for order in PHASE2_ORDERS:
+        work = order_by_size(docs, tokens=lambda d: len(d[1]) // CHARS_PER_TOKEN + SYSTEM_PROMPT_TOKENS,
+                             order=order)
+        start = time.time()
+
+        def run(doc):
+            completion, _ = pool.chat_completion(
+                messages=[{"role": "system", "content": SYSTEM_PROMPT},
+                          {"role": "user", "content": build_user_message(doc[0], "Bench", doc[1])}],
+                max_tokens=8192,
+            )
+            return time.time() - start, completion.usage.prompt_tokens
+
+        with ThreadPoolExecutor(max_workers=args.parallel) as executor:
+            results = list(executor.map(run, work))
+        finish_times = sorted(t for t, _ in results)
+        makespan = finish_times[-1]
+        tokens = sum(n for _, n in results)
+        print(f"{order:<10} {statistics.mean(finish_times):>10.2f}s "
+              f"{finish_times[int(len(finish_times) * 0.95) - 1]:>10.2f}s {makespan:>10.2f}s "
+              f"{tokens / makespan:>11,.0f}")
+    print("=" * 70)
+    server.shutdown()
+
+
+def synthetic_pdf(path, pages=8):
+    """A reproducible image-heavy PDF (Letter pages at 150 dpi) for when no real one is given."""
+    from PIL import Image, ImageDraw
+    rng = random.Random(5)
+    images = []
+    for n in range(pages):
+        image = Image.new("RGB", (1275, 1650), "white")
+        draw = ImageDraw.Draw(image)
+        for line in range(60):
+            draw.text((100, 100 + line * 24), f"Page {n + 1} line {line} " + "lorem ipsum " * 8, fill="black")
+        for _ in range(3):
+            x, y = rng.randrange(100, 900), rng.randrange(100, 1300)
+            draw.rectangle((x, y, x + 250, y + 200), fill=tuple(rng.randrange(256) for _ in range(3)))
+        images.append(image)
+    images[0].save(path, "PDF", resolution=150, save_all=True, append_images=images[1:])
+    return path
+
+
+def bench_raster_cache(args):
+    import pypdfium2
+    from docling_core.types.doc import BoundingBox, CoordOrigin
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = args.pdf
+        if pdf_path is None:
+            found = sorted(INPUT_DIR.rglob("*.pdf"))
+            pdf_path = found[0] if found else synthetic_pdf(Path(tmp) / "synthetic.pdf")
+        pdf_path = Path(pdf_path)
+        pdf = pypdfium2.PdfDocument(pdf_path)
+        doc_hash = hashlib.sha256(pdf_path.read_bytes()).hexdigest()
+        num_pages = min(len(pdf), args.pages)
+        sizes = [pdf[n].get_size() for n in range(num_pages)]
+
+        def render(page_no, scale, cropbox=None):
+            """What Docling's PDF backend does: render at 1.5x the scale, then downsample."""
+            width, height = sizes[page_no]
+            box = cropbox or BoundingBox(l=0, t=0, r=width, b=height, coord_origin=CoordOrigin.TOPLEFT)
+            crop = (box.l, height - box.b, width - box.r, box.t)  # pdfium: left, bottom, right, top margins
+            image = pdf[page_no].render(scale=scale * 1.5, crop=crop).to_pil()
+            return image.resize((round(box.width * scale), round(box.height * scale)))
+
+        # Per page: the layout model's page image, then an OCR region and a
+        # figure crop at the VLM scale (what a page with one figure costs)
+        rng = random.Random(3)
+        requests = []
+        for page_no, (width, height) in enumerate(sizes):
+            requests.append((page_no, 1.0, None))
+            for _ in range(2):
+                x, y = rng.uniform(0, width * 0.6), rng.uniform(0, height * 0.6)
+                requests.append((page_no, args.scale, BoundingBox(l=x, t=y, r=x + width * 0.35, b=y + height * 0.3,
+                                                                   coord_origin=CoordOrigin.TOPLEFT)))
+
+        def run(cache):
+            start = time.perf_counter()
+            for page_no, scale, cropbox in requests:
+                if cache is None:
+                    render(page_no, scale, cropbox)
+                    continue
+                box = None if cropbox is None else (cropbox.l, cropbox.t, cropbox.r, cropbox.b)
+                cache.page_image(doc_hash, page_no, scale, lambda: render(page_no, scale, cropbox), box)
+            return time.perf_counter() - start
+
+        print("=" * 70)
+        print(f"🖼️  RASTER CACHE BENCHMARK ({pdf_path.name}, {num_pages} pages, VLM scale {args.scale:g})")
+        print("=" * 70)
+        print(f"Image requests per run: {len(requests)} (page at 1x + OCR region + figure crop per page)")
+        print(f"{'Run':<26} {'Wall':>10} {'Rendered':>10} {'Cached':>10}")
+        print("-" * 70)
+        uncached = statistics.median(run(None) for _ in range(args.runs))
+        print(f"{'No cache':<26} {uncached:>9.2f}s {len(requests):>10} {0:>10}")
+        cache = RasterCache(Path(tmp) / "raster", max_mb=args.cache_mb)
+        timings = []
+        for n in range(args.runs + 1):
+            before = cache.stats()
+            elapsed = run(cache)
+            cache.flush()
+            after = cache.stats()
+            timings.append(elapsed)
+            label = "Cache, first run" if n == 0 else f"Cache, rerun {n}"
+            print(f"{label:<26} {elapsed:>9.2f}s {after['misses'] - before['misses']:>10} "
+                  f"{after['hits'] - before['hits']:>10}")
+        rerun = statistics.median(timings[1:])
+        print("-" * 70)
+        print(f"Rasterisation saved on a rerun: {uncached - rerun:.2f}s "
+              f"({(1 - rerun / uncached) * 100:.0f}%, {(uncached - rerun) / num_pages * 1000:.0f} ms/page)")
+        print(f"Cache on disk: {cache.size() / 1024 / 1024:.1f} MB for {num_pages} pages")
+        print("=" * 70)
+        pdf.close()
+
+
+def load_figure_boxes(markdown_dir, limit):
+    """(page width, page height, l, t, r, b) of pictures in stored Docling documents, in points."""
+    markdown_dir = Path(markdown_dir)
+    boxes = []
+    for category in artifact_store.open_store(markdown_dir).categories():
+        for stem in artifact_store.stems(markdown_dir / category, DOCUMENT_SUFFIX):
+            document = json.loads(artifact_store.read_bytes(markdown_dir / category / f"{stem}{DOCUMENT_SUFFIX}"))
+            for picture in document.get("pictures", []):
+                if not picture.get("prov"):
+                    continue
+                prov = picture["prov"][0]
+                size = document["pages"][str(prov["page_no"])]["size"]
+                bbox = prov["bbox"]
+                top, bottom = sorted((size["height"] - bbox["t"], size["height"] - bbox["b"]))
+                if bbox.get("coord_origin") == "TOPLEFT":
+                    top, bottom = bbox["t"], bbox["b"]
+                boxes.append((size["width"], size["height"], bbox["l"], top, bbox["r"], bottom))
+                if len(boxes) >= limit:
+                    return boxes
+    return boxes
+
+
+def bench_figure_scale(args):
+    import pypdfium2
+
+    boxes = load_figure_boxes(args.markdown_dir, args.limit)
+    source = "stored Docling documents"
+    if not boxes:
+        # Figures of two-column papers: mostly column width, a third full width, some small
+        source = "synthetic sizes"
+        rng = random.Random(9)
+        for _ in range(args.limit):
+            width = rng.choices([rng.uniform(220, 260), rng.uniform(440, 520), rng.uniform(90, 160)],
+                                weights=[6, 3, 1])[0]
+            height = width * rng.uniform(0.5, 0.9)
+            left, top = rng.uniform(36, 576 - width), rng.uniform(36, 756 - height)
+            boxes.append((612.0, 792.0, left, top, left + width, top + height))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = pypdfium2.PdfDocument(synthetic_pdf(Path(tmp) / "synthetic.pdf", pages=1))
+        page = pdf[0]
+        page_width, page_height = page.get_size()
+
+        def render(box, scale):
+            """A figure crop the way Docling renders it (1.5x oversampling, then downsample)."""
+            sx, sy = page_width / box[0], page_height / box[1]  # Map onto the synthetic page
+            l, t, r, b = box[2] * sx, box[3] * sy, box[4] * sx, box[5] * sy
+            image = page.render(scale=scale * 1.5, crop=(l, page_height - b, page_width - r, t)).to_pil()
+            return image.resize((round((r - l) * scale), round((b - t) * scale)))
+
+        def run(adaptive):
+            render_s, tokens, scales = 0.0, [], []
+            for box in boxes:
+                start = time.perf_counter()
+                image = render(box, args.scale)
+                scale = args.scale
+                if adaptive:
+                    image, scale = fit_to_budget(image, args.scale, args.budget_tokens * 32 * 32, args.min_scale)
+                render_s += time.perf_counter() - start
+                tokens.append(vision_tokens(*image.size))
+                scales.append(scale)
+            vlm_s = sum(tokens) / args.prefill_tps + len(boxes) * args.decode_s
+            return render_s, tokens, scales, vlm_s
+
+        print("=" * 70)
+        print(f"🖼️  FIGURE SCALE BENCHMARK ({len(boxes)} figures from {source})")
+        print("=" * 70)
+        print(f"Simulated VLM: {args.prefill_tps:,.0f} vision tokens/s prefill + {args.decode_s:g}s decode per figure")
+        print(f"{'Setting':<26} {'Scale':>7} {'Tokens/fig':>11} {'Max':>7} {'Render':>8} {'Figures/s':>10}")
+        print("-" * 70)
+        results = {}
+        for label, adaptive in ((f"Fixed scale {args.scale:g}", False),
+                                (f"Adaptive ({args.budget_tokens} tok budget)", True)):
+            render_s, tokens, scales, vlm_s = run(adaptive)
+            results[adaptive] = len(boxes) / (render_s + vlm_s)
+            print(f"{label:<26} {statistics.mean(scales):>6.2f}x {statistics.mean(tokens):>11,.0f} "
+                  f"{max(tokens):>7,} {render_s:>7.2f}s {results[adaptive]:>10.2f}")
+        print("-" * 70)
+        print(f"Speed-up: {results[True] / results[False]:.2f}x figures per second")
+        print("=" * 70)
+        pdf.close()
+
+
+def figure_crops(count):
+    """Figure crops at the VLM pixel budget: line charts of varying size."""
+    from PIL import Image, ImageDraw
+    rng = random.Random(5)
+    images = []
+    for _ in range(count):
+        width, height = rng.randint(400, 1000), rng.randint(300, 700)
+        image = Image.new("RGB", (width, height), "white")
+        draw = ImageDraw.Draw(image)
+        draw.line([(x, height - rng.randint(0, height)) for x in range(0, width, 40)], fill="black", width=2)
+        images.append(image)
+    return images
+
+
+def bench_vlm_api(args):
+    """
+    Figures per second through Docling's own picture description API client,
+    configured the way LocalPDFProcessor configures it (_vlm_api_options), at
+    one request at a time and at --concurrency. With --pdf the whole Phase 1
+    converter runs instead, figure triage included.
+    """
+    import pdf_processor
+    try:
+        from docling.datamodel.accelerator_options import AcceleratorOptions
+        from docling.models.picture_description_api_model import PictureDescriptionApiModel
+    except ImportError as e:
+        print(f"❌ The vlm-api benchmark runs Docling's picture description client: {e}")
+        return
+
+    images = [] if args.pdf else figure_crops(args.figures)
+    server, url = mock_llm_server.start_in_thread(port=0, vision_ms=args.vision_ms)
+    base_url = url.removesuffix("/v1")
+    subject = args.pdf.name if args.pdf else f"{args.figures} figures"
+    print("=" * 70)
+    print(f"🖼️  VLM API BENCHMARK ({subject}, mock server {args.vision_ms:g} ms/figure)")
+    print("=" * 70)
+    print(f"{'Concurrency':<14} {'Time':>8} {'Figures':>8} {'Figures/s':>10} {'Peak in flight':>15}")
+    print("-" * 70)
+    results = {}
+    default_concurrency = pdf_processor.VLM_API_CONCURRENCY
+    tmp = tempfile.TemporaryDirectory()
+    manifest = Manifest(Path(tmp.name) / "manifest.db")  # Not the shared data/manifest.db
+    try:
+        for concurrency in sorted({1, args.concurrency}):
+            # _vlm_api_options reads the concurrency (and batch size) from here
+            pdf_processor.VLM_API_CONCURRENCY = concurrency
+            processor = pdf_processor.LocalPDFProcessor(backend=None, phase1_server=None, shard_threshold=0,
+                                                        manifest=manifest, vlm_url=url)
+            urllib.request.urlopen(urllib.request.Request(f"{base_url}/reset", data=b"{}"))
+            start = time.perf_counter()
+            if args.pdf:
+                processor.convert_document(args.pdf)
+            else:
+                options = processor._vlm_api_options(PHASE1_OPTIONS)
+                model = PictureDescriptionApiModel(enabled=True, enable_remote_services=True, artifacts_path=None,
+                                                   options=options, accelerator_options=AcceleratorOptions())
+                # The enrichment pipeline hands the model batch_size pictures at a time
+                for i in range(0, len(images), options.batch_size):
+                    descriptions = list(model._annotate_images(images[i:i + options.batch_size]))
+                    assert all(descriptions), "empty picture description"
+            elapsed = time.perf_counter() - start
+            with urllib.request.urlopen(f"{base_url}/stats") as response:
+                stats = json.loads(response.read())
+            results[concurrency] = stats["images"] / elapsed
+            print(f"{concurrency:<14} {elapsed:>7.2f}s {stats['images']:>8} {results[concurrency]:>10.2f} "
+                  f"{stats['vision_peak_concurrency']:>15}")
+    finally:
+        pdf_processor.VLM_API_CONCURRENCY = default_concurrency
+        server.shutdown()
+        tmp.cleanup()
+    print("-" * 70)
+    if results[1]:
+        print(f"Speed-up: {results[max(results)] / results[1]:.2f}x figures per second")
+    print("=" * 70)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paper pipeline benchmarks")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("prefix-cache", help="Prefill tokens saved by the prefix-cache prompt layout")
+    p.add_argument("--markdown-dir", default=str(MARKDOWN_DIR))
+    p.add_argument("--limit", type=int, default=20, help="Max documents to send per run")
+    p.add_argument("--runs", type=int, default=2, help="Passes over the corpus per layout (2nd+ = re-runs)")
+    p.add_argument("--duplicates", type=float, default=0.25,
+                   help="Fraction of papers also filed under a second category")
+    p.add_argument("--cache-tokens", type=int, default=mock_llm_server.CACHE_CAPACITY,
+                   help="Simulated KV cache capacity in tokens")
+    p.set_defaults(func=bench_prefix_cache)
+
+    p = sub.add_parser("import-time", help="Startup cost of the CLI and a Phase-2-ready processor")
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--with-docling", action="store_true",
+                   help="Also time building the converter and loading the Phase 1 models")
+    p.set_defaults(func=bench_import_time)
+
+    p = sub.add_parser("phase2-order", help="Completion times of the Phase 2 request orders")
+    p.add_argument("--requests", type=int, default=40)
+    p.add_argument("--parallel", type=int, default=4)
+    p.add_argument("--ms-per-1k", type=float, default=20.0,
+                   help="Simulated prefill latency per 1k prompt tokens")
+    p.set_defaults(func=bench_phase2_order)
+
+    p = sub.add_parser("raster-cache", help="Page rasterisation saved by the raster cache on a rerun")
+    p.add_argument("--pdf", help="PDF to render (default: first in data/input, else a synthetic one)")
+    p.add_argument("--pages", type=int, default=20, help="Max pages to render")
+    p.add_argument("--scale", type=float, default=PHASE1_OPTIONS["vlm_scale"])
+    p.add_argument("--runs", type=int, default=2)
+    p.add_argument("--cache-mb", type=int, default=1024)
+    p.set_defaults(func=bench_raster_cache)
+
+    p = sub.add_parser("figure-scale", help="VLM figures per second: fixed vs adaptive figure scale")
+    p.add_argument("--markdown-dir", default=str(MARKDOWN_DIR),
+                   help="Take figure sizes from the Docling documents stored here")
+    p.add_argument("--limit", type=int, default=60, help="Max figures")
+    p.add_argument("--scale", type=float, default=PHASE1_OPTIONS["vlm_scale"])
+    p.add_argument("--budget-tokens", type=int, default=PHASE1_OPTIONS["vlm_pixel_budget"] // 32 ** 2)
+    p.add_argument("--min-scale", type=float, default=PHASE1_OPTIONS["vlm_min_scale"])
+    p.add_argument("--prefill-tps", type=float, default=4000.0, help="Simulated VLM prefill, vision tokens/s")
+    p.add_argument("--decode-s", type=float, default=0.0, help="Simulated VLM decode time per figure")
+    p.set_defaults(func=bench_figure_scale)
+
+    p = sub.add_parser("vlm-api", help="Figures per second on a vision server: serial vs concurrent requests")
+    p.add_argument("--figures", type=int, default=32)
+    p.add_argument("--concurrency", type=int, default=VLM_API_CONCURRENCY)
+    p.add_argument("--vision-ms", type=float, default=250.0, help="Simulated server latency per figure")
+    p.add_argument("--pdf", type=Path, help="Convert this PDF with the full Phase 1 converter instead")
+    p.set_defaults(func=bench_vlm_api)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Columnar dataset of all extracted papers, partitioned by category.
+
+Flattens each data/output/<category>/<paper>.json (the SYSTEM_PROMPT schema)
+into one row with dotted column names (metadata.title, metadata.year,
+methodology.approach_type, keywords, ...), so the whole corpus can be scanned
+without opening thousands of files:
+
+    data/dataset/parquet/category=Req_2/part-00000.parquet   (needs pyarrow)
+    data/dataset/ndjson/category=Req_2/papers.ndjson.gz
+
+The layout is hive-style: pandas/pyarrow/duckdb/polars read the parquet
+directory as one table with a `category` column. NDJSON rows carry the
+category themselves, and gzip members can be concatenated, so partitions
+concatenate into one valid .ndjson.gz.
+
+Updates are incremental. Only JSON files that are new since the last update
+are read; they are appended as a new part (Parquet) or gzip member (NDJSON).
+A partition is rewritten only when a paper in it changed or was removed, or
+after MAX_PARTS appends.
+
+Usage:
+    python main.py --export-dataset parquet
+    DatasetExporter("ndjson").update(["Req_2"])
+"""
+
+import fcntl
+import gzip
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.resolve()
+OUTPUT_DIR = PROJECT_ROOT / "data" / "output"
+DATASET_DIR = PROJECT_ROOT / "data" / "dataset"
+
+FORMATS = ("parquet", "ndjson")
+PARTITION_FILES = {"ndjson": "papers.ndjson.gz"}
+MAX_PARTS = 16  # appends before a partition is compacted
+
+# (column, type, path into the result JSON); types: str, int, bool, list (of str)
+COLUMNS = [
+    ("paper_id", "str", ("paper_id",)),
+    ("metadata.title", "str", ("metadata", "title")),
+    ("metadata.authors", "list", ("metadata", "authors")),
+    ("metadata.year", "int", ("metadata", "year")),
+    ("metadata.publication_venue", "str", ("metadata", "publication_venue")),
+    ("metadata.doi", "str", ("metadata", "doi")),
+    ("summary.problem_statement", "str", ("summary", "problem_statement")),
+    ("summary.objective", "str", ("summary", "objective")),
+    ("summary.key_contribution", "str", ("summary", "key_contribution")),
+    ("methodology.approach_type", "str", ("methodology", "approach_type")),
+    ("methodology.technologies_and_protocols", "list", ("methodology", "technologies_and_protocols")),
+    ("methodology.method_summary", "str", ("methodology", "method_summary")),
+    ("results_and_evaluation.key_findings", "list", ("results_and_evaluation", "key_findings")),
+    ("results_and_evaluation.evaluation_metrics", "list", ("results_and_evaluation", "evaluation_metrics")),
+    ("visual_insights.has_visuals", "bool", ("visual_insights", "has_visuals")),
+    ("visual_insights.description", "str", ("visual_insights", "description")),
+    ("keywords", "list", ("keywords",)),
+    ("provenance.pdf_hash", "str", ("_provenance", "pdf_hash")),
+    ("provenance.prompt_version", "str", ("_provenance", "prompt_version")),
+    ("provenance.model", "str", ("_provenance", "model")),
+    ("provenance.generated_at", "str", ("_provenance", "generated_at")),
+]
+
+
+# --- Flattening ---
+
+def _as_str(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _as_int(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    return None
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        value = [value]
+    return [_as_str(item) for item in value if item is not None]
+
+
+COERCE = {"str": _as_str, "int": _as_int, "bool": _as_bool, "list": _as_list}
+
+
+def flatten_result(data):
+    """One dataset row from a result JSON; missing or mistyped fields become null/[]."""
+    row = {}
+    for column, kind, path in COLUMNS:
+        value = data
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        row[column] = COERCE[kind](value)
+    return row
+
+
+def arrow_schema():
+    import pyarrow as pa
+    types = {"str": pa.string(), "int": pa.int64(), "bool": pa.bool_(), "list": pa.list_(pa.string())}
+    return pa.schema([(column, types[kind]) for column, kind, _ in COLUMNS])
+
+
+# --- Dataset ---
+
+class DatasetExporter:
+    """Keeps data/dataset/<format> in step with data/output."""
+
+    def __init__(self, fmt, output_dir=OUTPUT_DIR, dataset_dir=DATASET_DIR):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown dataset format '{fmt}' (choose from {', '.join(FORMATS)})")
+        if fmt == "parquet":
+            import pyarrow  # noqa: F401  (fail early with ImportError, not mid-update)
+        self.fmt = fmt
+        self.output_dir = Path(output_dir)
+        self.root = Path(dataset_dir) / fmt
+        self.state_path = self.root / "_state.json"
+
+    def partition_dir(self, category):
+        return self.root / f"category={category}"
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive across processes (web workers and the processing worker)."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _load_state(self):
+        try:
+            return json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state):
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state, indent=1), encoding="utf-8")
+        os.replace(tmp, self.state_path)
+
+    def update(self, categories=None):
+        """
+        Bring the given categories (default: all) up to date. Returns
+        {category: {"added", "changed", "removed", "rewritten"}} for the
+        partitions that changed.
+        """
+        with self._locked():
+            state = self._load_state()
+            if categories is None:
+                present = {d.name for d in self.output_dir.iterdir() if d.is_dir()} if self.output_dir.exists() else set()
+                categories = sorted(present | set(state))
+            report = {}
+            for category in categories:
+                change = self._update_category(category, state)
+                if change:
+                    report[category] = change
+            self._save_state(state)
+            return report
+
+    def _update_category(self, category, state):
+        entry = state.get(category, {"files": {}, "parts": 0})
+        source = self.output_dir / category
+        current = {}
+        if source.is_dir():
+            for json_file in source.glob("*.json"):
+                stat = json_file.stat()
+                current[json_file.stem] = [stat.st_mtime_ns, stat.st_size]
+
+        previous = entry["files"]
+        added = sorted(set(current) - set(previous))
+        changed = sorted(s for s in set(current) & set(previous) if current[s] != previous[s])
+        removed = sorted(set(previous) - set(current))
+        if not (added or changed or removed):
+            return None
+
+        if not current:
+            shutil.rmtree(self.partition_dir(category), ignore_errors=True)
+            state.pop(category, None)
+            return {"added": 0, "changed": 0, "removed": len(removed), "rewritten": True}
+
+        rewrite = bool(changed or removed) or entry["parts"] >= MAX_PARTS
+        stems = sorted(current) if rewrite else added
+        rows, read = [], {}
+        for stem in stems:
+            try:
+                with open(source / f"{stem}.json", "r", encoding="utf-8") as f:
+                    rows.append(flatten_result(json.load(f)))
+                read[stem] = current[stem]
+            except (OSError, ValueError) as e:
+                # Left out of the state, so it is picked up once it is valid
+                print(f"   ⚠️  Dataset: skipping {category}/{stem}.json ({e})")
+
+        if not (rewrite or rows):
+            return None  # Only unreadable new files; nothing to append
+        if rewrite:
+            self._write_partition(category, rows)
+            entry = {"files": read, "parts": 1 if rows else 0}
+        elif rows:
+            self._append_partition(category, rows, entry["parts"])
+            entry["files"].update(read)
+            entry["parts"] += 1
+        state[category] = entry
+        return {"added": len(added), "changed": len(changed), "removed": len(removed), "rewritten": rewrite}
+
+    # --- Writers ---
+
+    def _write_rows(self, path, category, rows, append=False):
+        tmp = path.with_name(path.name + ".tmp")
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pylist(rows, schema=arrow_schema())
+            pq.write_table(table, tmp, compression="zstd")
+        else:
+            if append:
+                shutil.copyfile(path, tmp)
+            # Each write is a gzip member; readers treat concatenated members as one stream
+            with gzip.open(tmp, "at" if append else "wt", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps({"category": category, **row}, ensure_ascii=False) + "\n")
+        os.replace(tmp, path)
+
+    def _write_partition(self, category, rows):
+        partition = self.partition_dir(category)
+        shutil.rmtree(partition, ignore_errors=True)
+        if not rows:
+            return
+        partition.mkdir(parents=True)
+        name = PARTITION_FILES.get(self.fmt, "part-00000.parquet")
+        self._write_rows(partition / name, category, rows)
+
+    def _append_partition(self, category, rows, parts):
+        partition = self.partition_dir(category)
+        partition.mkdir(parents=True, exist_ok=True)
+        if self.fmt == "parquet":
+            self._write_rows(partition / f"part-{parts:05d}.parquet", category, rows)
+        else:
+            path = partition / PARTITION_FILES[self.fmt]
+            self._write_rows(path, category, rows, append=path.exists())
+
+    # --- Reading back ---
+
+    def files(self, categories=None):
+        """(path, path relative to the dataset root) of every data file, by category."""
+        if not self.root.exists():
+            return []
+        partitions = sorted(p for p in self.root.glob("category=*") if p.is_dir())
+        if categories is not None:
+            wanted = {f"category={c}" for c in categories}
+            partitions = [p for p in partitions if p.name in wanted]
+        return [(f, f.relative_to(self.root).as_posix())
+                for p in partitions for f in sorted(p.iterdir()) if not f.name.endswith(".tmp")]
+
+    def paper_count(self, categories=None):
+        state = self._load_state()
+        return sum(len(entry["files"]) for category, entry in state.items()
+                   if categories is None or category in categories)
+
+
+def refresh_existing(output_dir=OUTPUT_DIR, dataset_dir=DATASET_DIR):
+    """Update every dataset format that has been built before (cheap if nothing changed)."""
+    for fmt in FORMATS:
+        if not (Path(dataset_dir) / fmt / "_state.json").exists():
+            continue
+        try:
+            report = DatasetExporter(fmt, output_dir, dataset_dir).update()
+        except ImportError:
+            continue
+        if report:
+            print(f"   🗃️  Dataset ({fmt}): updated {', '.join(sorted(report))}")
+
@@ -0,0 +1,223 @@
+"""
+Conditional enrichment for Phase 1: formula, code and table models only where needed.
+
+Docling loads the CodeFormula model for every conversion and runs TableFormer
+in ACCURATE mode on every table. Most papers have few formulas or code
+blocks, and most tables are simple grids. EnrichmentPolicy changes three
+things in a built pipeline:
+
+- The CodeFormula model is loaded on the first region the layout pass labels
+  as a formula or code. Papers without any never load it. It only ever runs
+  on those regions.
+- With table_mode "adaptive", tables go through TableFormer FAST first. A
+  page whose result looks complex (spanning cells, multi-row headers,
+  degenerate or mostly empty grids) is redone in ACCURATE mode. That model
+  is also loaded on first use.
+- What happened per paper (tables per mode and why, formulas, code blocks)
+  is counted so it can be stored with the paper's artifacts for auditing.
+
+Usage:
+    policy = EnrichmentPolicy(table_mode="adaptive")
+    policy.install(pipeline, pipeline_options)   # In the pipeline's __init__
+    policy.since(before)                         # Per-paper summary
+"""
+
+import threading
+from collections import Counter
+
+TABLE_MODES = ("fast", "accurate", "adaptive")
+MAX_EMPTY_CELLS = 0.4  # Fraction of empty cells above which a FAST table is redone
+
+
+def table_complexity(table):
+    """Why a FAST TableFormer result should be redone in ACCURATE mode, or None if it looks simple."""
+    cells = table.table_cells
+    if not cells or table.num_rows < 2 or table.num_cols < 2:
+        return "degenerate grid"
+    if any(cell.row_span > 1 or cell.col_span > 1 for cell in cells):
+        return "spanning cells"
+    if len({cell.start_row_offset_idx for cell in cells if cell.column_header}) > 1:
+        return "multi-row header"
+    if sum(1 for cell in cells if not cell.text.strip()) > MAX_EMPTY_CELLS * table.num_rows * table.num_cols:
+        return "sparse grid"
+    return None
+
+
+def _replace_models(pipeline, cls, wrap):
+    """
+    Swap every instance of `cls` the pipeline holds, as an attribute or in a
+    model list (build_pipe, enrichment_pipe), for wrap(model). Returns
+    whether any was found. Docling versions differ in where they keep models.
+    """
+    wrapped = {}
+
+    def swap(model):
+        if id(model) not in wrapped:
+            wrapped[id(model)] = wrap(model)
+        return wrapped[id(model)]
+
+    for name, value in list(vars(pipeline).items()):
+        if isinstance(value, cls):
+            setattr(pipeline, name, swap(value))
+        elif isinstance(value, list) and any(isinstance(item, cls) for item in value):
+            setattr(pipeline, name, [swap(item) if isinstance(item, cls) else item for item in value])
+    return bool(wrapped)
+
+
+class _Lazy:
+    """A model built on first use (thread-safe)."""
+
+    def __init__(self, build):
+        self._build = build
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def get(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._build()
+        return self._model
+
+
+class AdaptiveTableModel:
+    """TableFormer FAST per page, redone in ACCURATE when a table on the page looks complex."""
+
+    def __init__(self, fast_model, accurate, policy):
+        self.fast_model = fast_model
+        self.accurate = accurate  # _Lazy
+        self.policy = policy
+
+    def __getattr__(self, name):
+        return getattr(self.fast_model, name)
+
+    def __call__(self, conv_res, page_batch):
+        for page in self.fast_model(conv_res, page_batch):
+            prediction = page.predictions.tablestructure if page.predictions is not None else None
+            tables = list(prediction.table_map.values()) if prediction is not None else []
+            reasons = [reason for reason in map(table_complexity, tables) if reason]
+            if reasons:
+                print(f"      🧮 Page {page.page_no + 1}: {len(tables)} table(s) redone in ACCURATE mode "
+                      f"({', '.join(sorted(set(reasons)))})")
+                page = next(iter(self.accurate.get()(conv_res, [page])))
+                self.policy.record(tables_accurate=len(tables), fallbacks=reasons)
+            elif tables:
+                self.policy.record(tables_fast=len(tables))
+            yield page
+
+
+class LazyCodeFormulaModel:
+    """The CodeFormula enrichment model, loaded on the first formula or code region."""
+
+    def __init__(self, model, do_code, do_formula, policy, elements_batch_size):
+        self.model = model  # _Lazy
+        self.do_code = do_code
+        self.do_formula = do_formula
+        self.policy = policy
+        self.elements_batch_size = elements_batch_size
+
+    def is_processable(self, doc, element):
+        from docling_core.types.doc import CodeItem, DocItemLabel, TextItem
+        if isinstance(element, CodeItem):
+            return self.do_code
+        return self.do_formula and isinstance(element, TextItem) and element.label == DocItemLabel.FORMULA
+
+    def prepare_element(self, conv_res, element):
+        if not self.is_processable(conv_res.document, element):
+            return None
+        return self.model.get().prepare_element(conv_res=conv_res, element=element)
+
+    def __call__(self, doc, element_batch):
+        from docling_core.types.doc import CodeItem
+        code = sum(1 for element in element_batch if isinstance(element.item, CodeItem))
+        self.policy.record(code_blocks=code, formulas=len(element_batch) - code)
+        yield from self.model.get()(doc=doc, element_batch=element_batch)
+
+
+class EnrichmentPolicy:
+    """Settings plus counts accumulated over every paper a converter handles."""
+
+    def __init__(self, table_mode="adaptive", do_formula=True, do_code=True):
+        if table_mode not in TABLE_MODES:
+            raise ValueError(f"Unknown table mode '{table_mode}'. Choose from: {list(TABLE_MODES)}")
+        self.table_mode = table_mode
+        self.do_formula = do_formula
+        self.do_code = do_code
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._fallbacks = Counter()  # reason -> tables redone in ACCURATE
+        self._loaded = []            # _Lazy models, for reporting
+
+    def install(self, pipeline, pipeline_options):
+        """
+        Rewire a StandardPdfPipeline built from `pipeline_options` with formula
+        and code enrichment off, and with FAST tables if table_mode is adaptive.
+        """
+        from docling.datamodel.pipeline_options import TableFormerMode
+        from docling.models.code_formula_model import CodeFormulaModel, CodeFormulaModelOptions
+        from docling.models.table_structure_model import TableStructureModel
+
+        if self.table_mode == "adaptive":
+            def build_accurate():
+                print("   ⚙️  Loading TableFormer (ACCURATE) for complex tables...")
+                options = pipeline_options.table_structure_options.model_copy(
+                    update={"mode": TableFormerMode.ACCURATE})
+                return TableStructureModel(enabled=True, artifacts_path=pipeline_options.artifacts_path,
+                                           options=options, accelerator_options=pipeline_options.accelerator_options)
+
+            accurate = _Lazy(build_accurate)
+            self._loaded.append(("table_accurate", accurate))
+            if not _replace_models(pipeline, TableStructureModel,
+                                   lambda model: AdaptiveTableModel(model, accurate, self)):
+                print("   ⚠️  Adaptive tables: no TableFormer model found in this Docling pipeline")
+
+        if self.do_formula or self.do_code:
+            def build_code_formula():
+                print("   ⚙️  Loading CodeFormula model (first formula / code region)...")
+                return CodeFormulaModel(
+                    enabled=True, artifacts_path=pipeline_options.artifacts_path,
+                    options=CodeFormulaModelOptions(do_code_enrichment=self.do_code,
+                                                    do_formula_enrichment=self.do_formula),
+                    accelerator_options=pipeline_options.accelerator_options)
+
+            code_formula = _Lazy(build_code_formula)
+            self._loaded.append(("code_formula", code_formula))
+            lazy = LazyCodeFormulaModel(code_formula, self.do_code, self.do_formula, self,
+                                        CodeFormulaModel.elements_batch_size)
+            if not _replace_models(pipeline, CodeFormulaModel, lambda model: lazy):
+                pipeline.enrichment_pipe.insert(0, lazy)
+            pipeline.keep_backend = True  # Formula and code crops are rendered after layout
+
+    def record(self, fallbacks=(), **counts):
+        with self._lock:
+            self._counts.update(counts)
+            self._fallbacks.update(fallbacks)
+
+    def stats(self):
+        with self._lock:
+            return {"counts": dict(self._counts), "fallbacks": dict(self._fallbacks)}
+
+    def since(self, before):
+        """Policy and counts for the work done since stats() returned `before` (one paper)."""
+        after = self.stats()
+
+        def diff(key):
+            return {name: n - before[key].get(name, 0) for name, n in after[key].items()
+                    if n - before[key].get(name, 0)}
+
+        counts = diff("counts")
+        return {
+            "table_mode": self.table_mode,
+            "tables_fast": counts.get("tables_fast", 0),
+            "tables_accurate": counts.get("tables_accurate", 0),
+            "table_fallbacks": diff("fallbacks"),
+            "formula_enrichment": "detected regions" if self.do_formula else "off",
+            "code_enrichment": "detected regions" if self.do_code else "off",
+            "formulas": counts.get("formulas", 0),
+            "code_blocks": counts.get("code_blocks", 0),
+            "models_loaded": sorted(name for name, model in self._loaded if model.loaded),
+        }
@@ -0,0 +1,246 @@
+"""
+Cheap pre-filter and sizing for figures before the VLM picture description.
+
+Docling sends every picture above min_coverage_area_pct to Qwen3-VL, which
+spends up to 2048 tokens on each, including logos, icons, separator rules and
+author photos. This module looks at statistics that are free once the crop
+is rendered: size on the page, aspect ratio, greyscale entropy, edge density,
+background, colour count and whether the picture has a caption. Only
+informative figures (charts, diagrams, tables, captioned images) go to the
+VLM. The rest get a short placeholder description, recorded with provenance
+"figure-triage" so they can be told apart from VLM output.
+
+Figures that are sent are downscaled to a fixed pixel budget for the VLM's
+patch grid. A large figure is already readable below the render scale and
+would otherwise cost thousands of vision tokens of prefill. Small,
+fine-print figures keep the render scale, which is the upper bound.
+
+Usage:
+    triage = FigureTriage(pixel_budget=1024 * VLM_PATCH_PX ** 2, max_scale=3.0)
+    triage.install(pipeline)              # In the Docling pipeline's __init__
+    figure_counts(document.export_to_dict())   # {"described": 4, "skipped": 7}
+"""
+
+import math
+import threading
+import time
+from collections import Counter
+
+PROVENANCE = "figure-triage"
+PLACEHOLDER = "[Decorative image: {kind}]"
+
+# Qwen-VL: 16 px patches, merged 2x2 into one vision token
+VLM_PATCH_PX = 32
+
+# Thresholds; part of PHASE1_OPTIONS, so changing them marks Markdown stale
+TRIAGE_OPTIONS = {
+    "min_side_pt": 40,          # Both sides under this (~14 mm): icon or bullet
+    "min_area_pct": 1.0,        # Of the page area
+    "max_aspect": 8.0,          # Longer side / shorter side: rules, banners
+    "blank_edges": 0.005,       # Edge pixel fraction below this: blank or solid
+    "logo_max_area_pct": 5.0,   # Uncaptioned, this small and ...
+    "logo_max_edges": 0.08,     # ... with this little structure: logo or emblem
+    "photo_colors": 1000,       # Many colours, high entropy, no white background ...
+    "photo_entropy": 6.0,
+    "photo_max_area_pct": 8.0,  # ... and this small without a caption: portrait
+}
+
+
+def image_stats(image):
+    """
+    Statistics of a crop downsampled to 256 px: greyscale entropy (bits),
+    fraction of near-white pixels, fraction of edge pixels (lines, text,
+    gridlines) and number of distinct colours.
+    """
+    from PIL import ImageFilter
+    thumb = image.convert("RGB")
+    thumb.thumbnail((256, 256))
+    grey = thumb.convert("L")
+    histogram = grey.histogram()
+    width, height = grey.size
+    # FIND_EDGES marks the image border; leave it out
+    inner = (1, 1, width - 1, height - 1) if min(width, height) > 2 else (0, 0, width, height)
+    edges = grey.filter(ImageFilter.FIND_EDGES).crop(inner).histogram()
+    colors = thumb.getcolors(maxcolors=1 << 16)
+    return {
+        "entropy": grey.entropy(),
+        "white": sum(histogram[240:]) / max(1, sum(histogram)),
+        "edges": sum(edges[40:]) / max(1, sum(edges)),
+        "colors": len(colors) if colors is not None else 1 << 16,
+    }
+
+
+def classify(width_pt, height_pt, page_area, image, has_caption, options=TRIAGE_OPTIONS):
+    """
+    (informative, kind) for one picture. kind says why a picture was skipped
+    (blank, tiny, banner, logo, photo) or roughly what it is (captioned,
+    table, chart, figure). Captioned pictures are informative unless blank.
+    """
+    stats = image_stats(image) if image is not None else None
+    if stats is not None and stats["edges"] < options["blank_edges"]:
+        return False, "blank"
+    if has_caption:
+        return True, "captioned"
+
+    area_pct = width_pt * height_pt / page_area * 100 if page_area else 100.0
+    if max(width_pt, height_pt) < options["min_side_pt"] or area_pct < options["min_area_pct"]:
+        return False, "tiny"
+    if max(width_pt, height_pt) / max(1.0, min(width_pt, height_pt)) > options["max_aspect"]:
+        return False, "banner"
+    if stats is None:
+        return True, "figure"
+    if area_pct < options["logo_max_area_pct"] and stats["edges"] < options["logo_max_edges"]:
+        return False, "logo"
+    if (stats["colors"] > options["photo_colors"] and stats["entropy"] > options["photo_entropy"]
+            and stats["white"] < 0.2 and area_pct < options["photo_max_area_pct"]):
+        return False, "photo"
+    # Plots, diagrams and tables are line art on a white background
+    if stats["white"] > 0.5:
+        return True, "table" if stats["edges"] > 0.15 else "chart"
+    return True, "figure"
+
+
+def vision_tokens(width_px, height_px, patch_px=VLM_PATCH_PX):
+    """Vision tokens for an image on the VLM's patch grid (sides rounded to whole patches)."""
+    return max(1, round(width_px / patch_px)) * max(1, round(height_px / patch_px))
+
+
+def budget_scale(width_px, height_px, rendered_scale, pixel_budget, min_scale=1.0):
+    """
+    Scale for an image rendered at `rendered_scale` so it fits `pixel_budget`
+    pixels, never above the render scale and never below `min_scale`.
+    """
+    if not pixel_budget or width_px * height_px <= pixel_budget:
+        return rendered_scale
+    scale = rendered_scale * math.sqrt(pixel_budget / (width_px * height_px))
+    return min(rendered_scale, max(min_scale, scale))
+
+
+def fit_to_budget(image, rendered_scale, pixel_budget, min_scale=1.0):
+    """(image, scale): the crop downscaled to the pixel budget, and the scale it ends up at."""
+    scale = budget_scale(image.width, image.height, rendered_scale, pixel_budget, min_scale)
+    if scale >= rendered_scale:
+        return image, rendered_scale
+    from PIL import Image
+    factor = scale / rendered_scale
+    size = (max(1, round(image.width * factor)), max(1, round(image.height * factor)))
+    return image.resize(size, Image.LANCZOS), scale
+
+
+def figure_counts(document):
+    """{"described", "skipped"} pictures of an export_to_dict() document."""
+    counts = {"described": 0, "skipped": 0}
+    for picture in (document or {}).get("pictures", []):
+        description = (picture.get("meta") or {}).get("description")
+        source = description.get("created_by") if description else None
+        if description is None:
+            # Older Docling versions store the description as an annotation
+            for annotation in picture.get("annotations", []):
+                if annotation.get("kind") == "description":
+                    description, source = annotation, annotation.get("provenance")
+        if description is not None:
+            counts["skipped" if source == PROVENANCE else "described"] += 1
+    return counts
+
+
+class FigureTriage:
+    """
+    Triage and sizing settings, plus the decisions and VLM time accumulated
+    over every paper a converter handles. options=None sends every picture;
+    pixel_budget=None keeps the render scale (max_scale).
+    """
+
+    def __init__(self, options=TRIAGE_OPTIONS, pixel_budget=None, min_scale=1.0, max_scale=3.0):
+        self.options = dict(options) if options else None
+        self.pixel_budget = pixel_budget
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self._lock = threading.Lock()
+        self.skipped = Counter()  # kind -> pictures given a placeholder
+        self.described = 0
+        self.vlm_seconds = 0.0
+        self.scale_sum = 0.0  # Of described figures
+
+    def classify_item(self, doc, item, image):
+        if self.options is None:
+            return True, "figure"
+        width_pt = height_pt = page_area = 0
+        if item.prov:
+            bbox = item.prov[0].bbox
+            width_pt, height_pt = abs(bbox.r - bbox.l), abs(bbox.t - bbox.b)
+            page = doc.pages.get(item.prov[0].page_no)
+            if page is not None and page.size is not None:
+                page_area = page.size.width * page.size.height
+        return classify(width_pt, height_pt, page_area, image, bool(item.captions), self.options)
+
+    def install(self, pipeline):
+        """Put the triage in front of a built Docling pipeline's picture description model."""
+        from docling.models.picture_description_base_model import PictureDescriptionBaseModel
+        pipeline.enrichment_pipe = [TriagedPictureDescription(model, self)
+                                    if isinstance(model, PictureDescriptionBaseModel) else model
+                                    for model in pipeline.enrichment_pipe]
+
+    def fit(self, image):
+        """(image, scale) for the VLM; see fit_to_budget."""
+        if image is None:
+            return image, self.max_scale
+        return fit_to_budget(image, self.max_scale, self.pixel_budget, self.min_scale)
+
+    def record(self, described=0, seconds=0.0, skipped_kind=None, scales=()):
+        with self._lock:
+            self.described += described
+            self.vlm_seconds += seconds
+            self.scale_sum += sum(scales)
+            if skipped_kind is not None:
+                self.skipped[skipped_kind] += 1
+
+    def stats(self):
+        with self._lock:
+            return {"described": self.described, "skipped": dict(self.skipped),
+                    "vlm_seconds": self.vlm_seconds, "scale_sum": self.scale_sum}
+
+    def seconds_per_figure(self):
+        with self._lock:
+            return self.vlm_seconds / self.described if self.described else None
+
+
+def _set_placeholder(item, kind):
+    text = PLACEHOLDER.format(kind=kind)
+    try:
+        from docling_core.types.doc.document import DescriptionMetaField, PictureMeta
+    except ImportError:
+        from docling_core.types.doc.document import PictureDescriptionData
+        item.annotations.append(PictureDescriptionData(text=text, provenance=PROVENANCE))
+        return
+    if item.meta is None:
+        item.meta = PictureMeta()
+    item.meta.description = DescriptionMetaField(text=text, created_by=PROVENANCE)
+
+
+class TriagedPictureDescription:
+    """Wraps the picture description model; everything but __call__ is delegated."""
+
+    def __init__(self, model, triage):
+        self.model = model
+        self.triage = triage
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def __call__(self, doc, element_batch):
+        informative, scales = [], []
+        for element in element_batch:
+            keep, kind = self.triage.classify_item(doc, element.item, element.image)
+            if keep:
+                element.image, scale = self.triage.fit(element.image)
+                informative.append(element)
+                scales.append(scale)
+                continue
+            _set_placeholder(element.item, kind)
+            self.triage.record(skipped_kind=kind)
+            yield element.item
+        if informative:
+            start = time.perf_counter()
+            yield from self.model(doc=doc, element_batch=informative)
+            self.triage.record(described=len(informative), seconds=time.perf_counter() - start,
+                               scales=scales)
@@ -35,6 +35,10 @@ const elements = {
     browseFilesBtn: document.getElementById('browse-files-btn'),
     fileGrid: document.getElementById('file-grid'),
     emptyStateFiles: document.getElementById('empty-state-files'),
+    fileStatusFilter: document.getElementById('file-status-filter'),
+    fileSort: document.getElementById('file-sort'),
+    fileOrderBtn: document.getElementById('file-order-btn'),
+    fileToolbarCount: document.getElementById('file-toolbar-count'),
 
     // Results Panel
     resultsPanel: document.getElementById('results-panel'),
@@ -54,7 +58,13 @@ const elements = {
 let state = {
     currentCategory: null,
     categories: [],
-    files: [],
+    files: [],           // Loaded pages of the current category, in display order
+    filesCursor: null,   // next_cursor of the last loaded page (null = all loaded)
+    filesTotal: 0,       // Files matching the current filter (loaded or not)
+    fileStatusCounts: {},  // Whole-category counts per status
+    filesLoading: false,
+    filesRequest: 0,     // Bumped on reload so late pages of an old listing are dropped
+    fileQuery: { sort: 'name', order: 'asc', status: '' },
     selectedFiles: new Set(),
     isConnected: true,
     processingStatus: { status: 'idle', queue_length: 0 }
@@ -303,89 +313,215 @@ async function selectCategory(name) {
 }
 
 // Files
+const FILES_PAGE_SIZE = 200;
+const FILE_OVERSCAN_ROWS = 4;  // Rows rendered above and below the viewport
+
+// Grid geometry for virtualized rendering, measured from a rendered card
+let fileLayout = { columns: 1, rowHeight: 0 };
+let renderedRange = null;
+
+function filesUrl(category, cursor) {
+    const params = new URLSearchParams({
+        sort: state.fileQuery.sort,
+        order: state.fileQuery.order,
+        limit: FILES_PAGE_SIZE
+    });
+    if (state.fileQuery.status) params.set('status', state.fileQuery.status);
+    if (cursor) params.set('cursor', cursor);
+    return `/categories/${category}/files?${params}`;
+}
+
+// Load the first page of a category (resets the listing)
 async function loadFiles(category) {
+    const request = ++state.filesRequest;
+    state.filesLoading = true;
     try {
-        const data = await fetchAPI(`/categories/${category}/files`);
+        const data = await fetchAPI(filesUrl(category));
+        if (request !== state.filesRequest) return;
         state.files = data.files || [];
+        state.filesCursor = data.next_cursor;
+        state.filesTotal = data.total_count;
+        state.fileStatusCounts = data.status_counts || {};
         renderFiles();
     } catch (error) {
         console.error('Failed to load files:', error);
+    } finally {
+        if (request === state.filesRequest) state.filesLoading = false;
     }
 }
 
-function renderFiles() {
+// Append the next page when the viewport gets near the end of what is loaded
+async function loadMoreFiles() {
+    if (state.filesLoading || !state.filesCursor || !state.currentCategory) return;
+    const request = state.filesRequest;
+    state.filesLoading = true;
+    try {
+        const data = await fetchAPI(filesUrl(state.currentCategory, state.filesCursor));
+        if (request !== state.filesRequest) return;
+        state.files = state.files.concat(data.files || []);
+        state.filesCursor = data.next_cursor;
+        state.filesTotal = data.total_count;
+    } catch (error) {
+        console.error('Failed to load more files:', error);
+    } finally {
+        if (request === state.filesRequest) state.filesLoading = false;
+    }
+    renderFiles();
+}
+
+function measureFileLayout() {
     const grid = elements.fileGrid;
-    grid.innerHTML = '';
+    const style = getComputedStyle(grid);
+    const card = grid.querySelector('.file-card');
+    fileLayout = {
+        columns: Math.max(1, style.gridTemplateColumns.split(' ').filter(Boolean).length),
+        rowHeight: card ? card.offsetHeight + (parseFloat(style.rowGap) || 0) : 0
+    };
+}
+
+// Only the cards in (and near) the viewport are in the DOM; padding on the
+// grid stands in for the rows above and below, so the page keeps its full
+// scroll height and opening a category with 10,000 files costs the same as 10.
+function renderFiles(force = true) {
+    const grid = elements.fileGrid;
+    const filterLabel = state.fileQuery.status ? ` ${state.fileQuery.status}` : '';
+    elements.fileToolbarCount.textContent = `${state.filesTotal}${filterLabel} file${state.filesTotal === 1 ? '' : 's'}`;
 
     if (state.files.length === 0) {
+        grid.innerHTML = '';
+        grid.style.paddingTop = grid.style.paddingBottom = '';
+        renderedRange = null;
         elements.emptyStateFiles.classList.remove('hidden');
         return;
     }
 
     elements.emptyStateFiles.classList.add('hidden');
 
-    state.files.forEach(file => {
-        const card = document.createElement('div');
-        card.className = `file-card${state.selectedFiles.has(file.id) ? ' selected' : ''}`;
-        card.dataset.fileId = file.id;
-        card.innerHTML = `
-            <div class="file-card-checkbox">
-                <input type="checkbox" class="checkbox file-checkbox" data-file-id="${file.id}" ${state.selectedFiles.has(file.id) ? 'checked' : ''}>
-            </div>
-            <div class="file-card-content">
-                <div class="file-card-header">
-                    <span class="file-name">${file.filename}</span>
-                    <div class="file-card-actions">
-                        <span class="status-badge ${file.status}">${file.status}</span>
-                        <button class="btn btn-icon btn-small file-menu-btn" aria-label="File menu">
-                            <span class="icon">⋮</span>
-                        </button>
-                    </div>
-                </div>
-                <div class="file-meta">
-                    ${formatFileSize(file.size)} • ${formatDate(file.upload_date)}
+    if (!fileLayout.rowHeight) {
+        grid.innerHTML = '';
+        grid.appendChild(createFileCard(state.files[0]));
+        measureFileLayout();
+    }
+    const { columns, rowHeight } = fileLayout;
+    const totalRows = Math.ceil(Math.max(state.filesTotal, state.files.length) / columns);
+
+    const gridTop = grid.getBoundingClientRect().top + window.scrollY;
+    const viewTop = window.scrollY - gridTop;
+    const firstRow = Math.max(0, Math.floor(viewTop / rowHeight) - FILE_OVERSCAN_ROWS);
+    const lastRow = Math.min(totalRows - 1, Math.ceil((viewTop + window.innerHeight) / rowHeight) + FILE_OVERSCAN_ROWS);
+    const start = Math.min(firstRow * columns, state.files.length);
+    const end = Math.max(start, Math.min((lastRow + 1) * columns, state.files.length));
+
+    // Fetch the next page before the user scrolls past what is loaded
+    if ((lastRow + 1) * columns >= state.files.length - FILES_PAGE_SIZE / 2) {
+        loadMoreFiles();
+    }
+
+    const range = `${start}:${end}:${columns}:${totalRows}`;
+    if (!force && range === renderedRange) return;
+    renderedRange = range;
+
+    const renderedRows = Math.ceil((end - start) / columns);
+    grid.style.paddingTop = `${Math.floor(start / columns) * rowHeight}px`;
+    grid.style.paddingBottom = `${Math.max(0, totalRows - Math.floor(start / columns) - renderedRows) * rowHeight}px`;
+
+    const fragment = document.createDocumentFragment();
+    state.files.slice(start, end).forEach(file => fragment.appendChild(createFileCard(file)));
+    grid.replaceChildren(fragment);
+}
+
+function createFileCard(file) {
+    const card = document.createElement('div');
+    card.className = `file-card${state.selectedFiles.has(file.id) ? ' selected' : ''}`;
+    card.dataset.fileId = file.id;
+    card.innerHTML = `
+        <div class="file-card-checkbox">
+            <input type="checkbox" class="checkbox file-checkbox" data-file-id="${file.id}" ${state.selectedFiles.has(file.id) ? 'checked' : ''}>
+        </div>
+        <div class="file-card-content">
+            <div class="file-card-header">
+                <span class="file-name" title="${file.filename}">${file.filename}</span>
+                <div class="file-card-actions">
+                    <span class="status-badge ${file.status}">${file.status}</span>
+                    <button class="btn btn-icon btn-small file-menu-btn" aria-label="File menu">
+                        <span class="icon">⋮</span>
+                    </button>
                 </div>
             </div>
-        `;
+            <div class="file-meta">
+                ${formatFileSize(file.size)} • ${formatDate(file.upload_date)}
+            </div>
+        </div>
+    `;
 
-        // Checkbox click handler - toggle file selection
-        const checkbox = card.querySelector('.file-checkbox');
-        checkbox.addEventListener('click', (e) => {
-            e.stopPropagation();
-        });
-        checkbox.addEventListener('change', (e) => {
-            toggleFileSelection(file.id, e.target.checked);
-        });
+    // Checkbox click handler - toggle file selection
+    const checkbox = card.querySelector('.file-checkbox');
+    checkbox.addEventListener('click', (e) => {
+        e.stopPropagation();
+    });
+    checkbox.addEventListener('change', (e) => {
+        toggleFileSelection(file.id, e.target.checked);
+    });
 
-        // Click on card content to view results
-        const cardContent = card.querySelector('.file-card-content');
-        cardContent.addEventListener('click', (e) => {
-            // Don't trigger if clicking the menu button
-            if (!e.target.closest('.file-menu-btn')) {
-                viewFileResults(file);
-            }
-        });
+    // Click on card content to view results
+    const cardContent = card.querySelector('.file-card-content');
+    cardContent.addEventListener('click', (e) => {
+        // Don't trigger if clicking the menu button
+        if (!e.target.closest('.file-menu-btn')) {
+            viewFileResults(file);
+        }
+    });
 
-        // Right-click on card content for context menu
-        cardContent.addEventListener('contextmenu', (e) => showContextMenu(e, file));
+    // Right-click on card content for context menu
+    cardContent.addEventListener('contextmenu', (e) => showContextMenu(e, file));
 
-        // Menu button click (for touch devices)
-        const menuBtn = card.querySelector('.file-menu-btn');
-        menuBtn.addEventListener('click', (e) => {
-            e.stopPropagation();
-            showContextMenu(e, file);
-        });
+    // Menu button click (for touch devices)
+    const menuBtn = card.querySelector('.file-menu-btn');
+    menuBtn.addEventListener('click', (e) => {
+        e.stopPropagation();
+        showContextMenu(e, file);
+    });
 
-        grid.appendChild(card);
+    return card;
+}
+
+// Re-render the visible window on scroll/resize (once per animation frame)
+let fileScrollFrame = null;
+function scheduleVisibleFilesRender(remeasure = false) {
+    if (fileScrollFrame !== null) return;
+    fileScrollFrame = requestAnimationFrame(() => {
+        fileScrollFrame = null;
+        if (!state.currentCategory) return;
+        if (remeasure) fileLayout.rowHeight = 0;
+        renderFiles(remeasure);
     });
 }
 
+function applyFileQuery() {
+    state.fileQuery = {
+        sort: elements.fileSort.value,
+        order: state.fileQuery.order,
+        status: elements.fileStatusFilter.value
+    };
+    if (state.currentCategory) {
+        window.scrollTo({ top: 0 });
+        loadFiles(state.currentCategory);
+    }
+}
+
 function formatFileSize(bytes) {
     if (bytes < 1024) return bytes + ' B';
     if (bytes < 1024 * 1024) return (bytes / 1024).toFixed(1) + ' KB';
     return (bytes / (1024 * 1024)).toFixed(1) + ' MB';
 }
 
+function formatEta(seconds) {
+    if (seconds == null) return '';
+    if (seconds < 60) return `${seconds}s`;
+    if (seconds < 3600) return `${Math.floor(seconds / 60)}m ${String(seconds % 60).padStart(2, '0')}s`;
+    return `${Math.floor(seconds / 3600)}h ${String(Math.floor((seconds % 3600) / 60)).padStart(2, '0')}m`;
+}
+
 function formatDate(isoString) {
     return new Date(isoString).toLocaleDateString();
 }
@@ -828,6 +964,17 @@ document.addEventListener('DOMContentLoaded', () => {
     startStatusPolling();
     checkFirstVisit();
 
+    // File list: sort, filter and windowed rendering
+    elements.fileSort?.addEventListener('change', applyFileQuery);
+    elements.fileStatusFilter?.addEventListener('change', applyFileQuery);
+    elements.fileOrderBtn?.addEventListener('click', () => {
+        state.fileQuery.order = state.fileQuery.order === 'asc' ? 'desc' : 'asc';
+        elements.fileOrderBtn.querySelector('.icon').textContent = state.fileQuery.order === 'asc' ? '↑' : '↓';
+        applyFileQuery();
+    });
+    window.addEventListener('scroll', () => scheduleVisibleFilesRender(), { passive: true });
+    window.addEventListener('resize', () => scheduleVisibleFilesRender(true));
+
     // Welcome modal "Get Started" button
     document.getElementById('get-started-btn')?.addEventListener('click', hideWelcomeModal);
 
@@ -1000,6 +1147,13 @@ document.addEventListener('DOMContentLoaded', () => {
         hideExportModal();
     });
 
+    // Export Modal - PDFs only go into the ZIP format
+    document.querySelectorAll('input[name="export-format"]').forEach(radio => {
+        radio.addEventListener('change', () => {
+            document.getElementById('export-include-fieldset').disabled = radio.value !== 'zip';
+        });
+    });
+
     // Export Modal - Confirm button
     document.getElementById('confirm-export-btn')?.addEventListener('click', () => {
         confirmExportCategory();
@@ -1258,6 +1412,9 @@ function updateProcessingUI(status) {
             const phaseText = phase ? ` (Phase ${phase})` : '';
             statusMessage = `Processing: ${state.processingStatus.current_file}${phaseText}`;
         }
+        if (state.processingStatus.eta_seconds != null) {
+            statusMessage += ` · ETA ${formatEta(state.processingStatus.eta_seconds)}`;
+        }
         statusText.textContent = statusMessage;
         elements.pauseBtn.disabled = false;
         elements.pauseBtn.innerHTML = '<span class="icon">⏸️</span> Pause';
@@ -1527,9 +1684,8 @@ function showExportModal() {
         return;
     }
 
-    // Check if there are any completed files in the category
-    const completedFiles = state.files.filter(f => f.status === 'completed');
-    if (completedFiles.length === 0) {
+    // Check if there are any completed files in the category (not just the loaded pages)
+    if (!state.fileStatusCounts.completed) {
         showToast('No processed files to export in this category', 'warning');
         return;
     }
@@ -1539,8 +1695,12 @@ function showExportModal() {
 
     // Reset checkboxes to defaults
     document.getElementById('export-pdf-checkbox').checked = false;
+    document.querySelector('input[name="export-format"][value="zip"]').checked = true;
+    document.getElementById('export-include-fieldset').disabled = false;
 }
 
+const EXPORT_EXTENSIONS = { zip: '.zip', parquet: '.parquet.zip', ndjson: '.ndjson.gz' };
+
 function hideExportModal() {
     document.getElementById('export-modal').classList.add('hidden');
 }
@@ -1552,7 +1712,8 @@ async function confirmExportCategory() {
         return;
     }
 
-    const includePdf = document.getElementById('export-pdf-checkbox').checked;
+    const format = document.querySelector('input[name="export-format"]:checked')?.value || 'zip';
+    const includePdf = format === 'zip' && document.getElementById('export-pdf-checkbox').checked;
     const categoryName = state.currentCategory;
 
     hideExportModal();
@@ -1561,30 +1722,36 @@ async function confirmExportCategory() {
 
     try {
         // Build the export URL
-        let url = `${API_BASE}/export/category/${encodeURIComponent(categoryName)}`;
+        const params = new URLSearchParams();
+        if (format !== 'zip') {
+            params.set('format', format);
+        }
         if (includePdf) {
-            url += '?include_pdf=true';
+            params.set('include_pdf', 'true');
         }
+        const query = params.toString();
+        const url = `${API_BASE}/export/category/${encodeURIComponent(categoryName)}${query ? '?' + query : ''}`;
 
-        // Fetch the zip file
+        // Fetch the export file
         const response = await fetch(url);
 
         if (!response.ok) {
             if (response.status === 404) {
                 showToast('No processed files to export', 'warning');
             } else {
-                showToast('Export failed', 'error');
+                const error = await response.json().catch(() => ({}));
+                showToast(error.error ? `Export failed: ${error.error}` : 'Export failed', 'error');
             }
             return;
         }
 
-        // Download the zip file
+        // Download the file
         const blob = await response.blob();
         const downloadUrl = URL.createObjectURL(blob);
 
         const a = document.createElement('a');
         a.href = downloadUrl;
-        a.download = `${categoryName}_export.zip`;
+        a.download = `${categoryName}_export${EXPORT_EXTENSIONS[format]}`;
         document.body.appendChild(a);
         a.click();
         document.body.removeChild(a);
@@ -0,0 +1,38 @@
+"""
+Queue lanes and the fair round-robin position rule shared by the job store.
+
+Tasks go into a lane ("interactive" ahead of "bulk"). Inside a lane each
+(job, category) pair is a flow, and the queue serves one task from each flow
+in turn, so a 5,000-file "process all" cannot starve a small category job,
+and a single-file request never waits behind the bulk backlog.
+job_store.JobStore claims tasks in that order; fair_position tells a queued
+file where it sits.
+
+Usage:
+    flows = {"interactive": [], "bulk": [(("job-1", "Req_2"), 3), (("job-2", "Theses"), 40)]}
+    fair_position(LANES, flows, "bulk", ("job-2", "Theses"), 2)   # 6: 1-based run position
+"""
+
+LANES = ("interactive", "bulk")
+
+
+def fair_position(lanes, flows, lane, key, index):
+    """
+    1-based run position of the task at `index` in flow `key` of `lane`.
+    `flows` maps each lane to [(flow_key, queued_count), ...] in serving order.
+    """
+    ahead = 0
+    for higher in lanes[:lanes.index(lane)]:
+        ahead += sum(count for _, count in flows[higher])
+    # Round r serves one task from every flow with more than r tasks, in
+    # flow order; our task is served in round `index`.
+    before_us = True
+    for other_key, count in flows[lane]:
+        if other_key == key:
+            before_us = False
+            ahead += index
+            continue
+        ahead += min(count, index)
+        if before_us and count > index:
+            ahead += 1
+    return ahead + 1
@@ -0,0 +1,414 @@
+"""
+Shared job store: the processing queue, jobs and worker state in SQLite.
+
+The web tier (any number of gunicorn workers) queues files and reads status
+here; the processing worker (worker.py, a separate process) claims tasks and
+publishes what it is doing. Tasks are claimed in the order job_queue
+describes: the "interactive" lane before "bulk", and round-robin between
+(job, category) flows inside a lane (fair_position gives a file's place).
+
+Usage:
+    store = JobStore()                               # data/jobs.db
+    job_id = store.create_job(2)
+    store.put_many([make_task(job_id, pdf_path, "Req_2", row), ...], lane="bulk")
+    store.set_category_profile("Req_2", "fast")      # Phase 1 profile for tasks without one
+    task = store.claim()                             # worker side; None if paused or empty
+    store.finish(task, success=True)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from job_queue import LANES, fair_position
+from manifest import file_id_for
+from scheduling import estimate_tokens
+
+PROJECT_ROOT = Path(__file__).parent.resolve()
+JOBS_PATH = Path(os.environ.get("PAPER_PIPELINE_JOBS", PROJECT_ROOT / "data" / "jobs.db"))
+
+# Finished jobs are kept this long for status lookups
+JOB_RETENTION_DAYS = 7
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,      -- queued, processing, completed, cancelled
+    created_at  TEXT NOT NULL,
+    total_files INTEGER NOT NULL,
+    completed   INTEGER NOT NULL DEFAULT 0,
+    failed      INTEGER NOT NULL DEFAULT 0,
+    current_file TEXT
+);
+-- Queued and running files; rows are deleted when a file finishes
+CREATE TABLE IF NOT EXISTS tasks (
+    seq           INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id        TEXT NOT NULL,
+    file_id       TEXT NOT NULL,
+    category      TEXT NOT NULL,
+    pdf_path      TEXT NOT NULL,
+    lane          TEXT NOT NULL,
+    state         TEXT NOT NULL DEFAULT 'queued',   -- queued, running
+    phase1_bytes  INTEGER NOT NULL DEFAULT 0,
+    phase2_tokens INTEGER,
+    profile       TEXT                              -- Phase 1 profile chosen for the job, if any
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_queued ON tasks(file_id) WHERE state = 'queued';
+CREATE INDEX IF NOT EXISTS idx_tasks_flow ON tasks(lane, job_id, category, state, seq);
+-- One row per (lane, job, category) with queued tasks; lowest turn is served next
+CREATE TABLE IF NOT EXISTS flows (
+    lane     TEXT NOT NULL,
+    job_id   TEXT NOT NULL,
+    category TEXT NOT NULL,
+    turn     INTEGER NOT NULL,
+    PRIMARY KEY (lane, job_id, category)
+);
+-- Processing status and worker-published state, JSON values
+CREATE TABLE IF NOT EXISTS control (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Columns added to tables of existing stores: (table, column, type)
+MIGRATIONS = [
+    ("tasks", "profile", "TEXT"),
+]
+
+# control defaults: status is idle/running/paused; generation is bumped on
+# cancel; turn orders flows; category_profiles maps categories to their
+# Phase 1 profile
+DEFAULTS = {"status": "idle", "generation": 0, "turn": 0, "category_profiles": {}}
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def make_task(job_id, pdf_path, category, row=None, profile=None):
+    """
+    Task dict for a PDF, with the size estimates the ETA needs (row: its
+    manifest row). profile is the job's Phase 1 profile; None leaves it to
+    the category's (see JobStore.set_category_profile) or the worker's default.
+    """
+    phase1_done = row is not None and row["phase1_status"] == "done"
+    return {
+        "job_id": job_id,
+        "file_id": file_id_for(category, Path(pdf_path).name),
+        "category": category,
+        "pdf_path": str(pdf_path),
+        "phase1_bytes": 0 if phase1_done else ((row["pdf_size"] or 0) if row is not None else 0),
+        "phase2_tokens": estimate_tokens(row["md_path"]) if phase1_done and row["md_path"] else None,
+        "profile": profile,
+    }
+
+
+class JobStore:
+    """SQLite-backed queue and worker state. Safe to share between threads and processes."""
+
+    def __init__(self, path=JOBS_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        # Wakes an in-process worker right away; a worker in another process
+        # notices changes on its next poll
+        self.changed = threading.Event()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+            for table, column, column_type in MIGRATIONS:
+                existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+            conn.executemany(
+                "INSERT OR IGNORE INTO control (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value)) for key, value in DEFAULTS.items()],
+            )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        """Write transaction that takes the lock up front (no upgrade deadlocks between processes)."""
+        conn = self._conn()
+
+        class _Tx:
+            def __enter__(self_tx):
+                conn.execute("BEGIN IMMEDIATE")
+                return conn
+
+            def __exit__(self_tx, exc_type, exc, tb):
+                conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+        return _Tx()
+
+    # --- Control values ---
+
+    @staticmethod
+    def _get(conn, key, default=None):
+        row = conn.execute("SELECT value FROM control WHERE key = ?", (key,)).fetchone()
+        return json.loads(row["value"]) if row is not None else default
+
+    @staticmethod
+    def _set(conn, **values):
+        conn.executemany(
+            "INSERT INTO control (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            [(key, json.dumps(value)) for key, value in values.items()],
+        )
+
+    def state(self):
+        """All control values: status, generation, plus whatever the worker published."""
+        rows = self._conn().execute("SELECT key, value FROM control").fetchall()
+        return {row["key"]: json.loads(row["value"]) for row in rows}
+
+    def publish(self, **values):
+        """Worker-side: record current file, phase, ETA rates, endpoint stats, heartbeat..."""
+        with self._transaction() as conn:
+            self._set(conn, **values)
+
+    def status(self):
+        return self._get(self._conn(), "status", "idle")
+
+    def generation(self):
+        return self._get(self._conn(), "generation", 0)
+
+    def category_profiles(self):
+        """{category: Phase 1 profile} for categories that have one."""
+        return self._get(self._conn(), "category_profiles", {})
+
+    def set_category_profile(self, category, profile):
+        """Set a category's Phase 1 profile (None clears it)."""
+        with self._transaction() as conn:
+            profiles = self._get(conn, "category_profiles", {})
+            if profile is None:
+                profiles.pop(category, None)
+            else:
+                profiles[category] = profile
+            self._set(conn, category_profiles=profiles)
+
+    # --- Jobs ---
+
+    def create_job(self, file_count):
+        """Create a new processing job and return its ID."""
+        job_id = str(uuid.uuid4())[:8]
+        cutoff = (datetime.now() - timedelta(days=JOB_RETENTION_DAYS)).isoformat(timespec="seconds")
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM jobs WHERE status IN ('completed', 'cancelled') AND created_at < ?",
+                         (cutoff,))
+            conn.execute("INSERT INTO jobs (id, status, created_at, total_files) VALUES (?, 'queued', ?, ?)",
+                         (job_id, _now(), file_count))
+        return job_id
+
+    def get_job(self, job_id):
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    # --- Queue ---
+
+    def _next_turn(self, conn):
+        turn = self._get(conn, "turn", 0) + 1
+        self._set(conn, turn=turn)
+        return turn
+
+    def _unlink(self, conn, task):
+        """Remove a queued task row, dropping its flow if it was the flow's last task."""
+        conn.execute("DELETE FROM tasks WHERE seq = ?", (task["seq"],))
+        left = conn.execute(
+            "SELECT 1 FROM tasks WHERE lane = ? AND job_id = ? AND category = ? AND state = 'queued' LIMIT 1",
+            (task["lane"], task["job_id"], task["category"]),
+        ).fetchone()
+        if left is None:
+            conn.execute("DELETE FROM flows WHERE lane = ? AND job_id = ? AND category = ?",
+                         (task["lane"], task["job_id"], task["category"]))
+
+    def put_many(self, tasks, lane="bulk"):
+        """
+        Queue tasks (dicts from make_task) in one transaction. A file that is
+        already queued is not queued twice; if the new request is in a
+        higher-priority lane the file moves there. Returns how many tasks
+        were added or promoted.
+        """
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane '{lane}'. Choose from: {list(LANES)}")
+        added = 0
+        with self._transaction() as conn:
+            for task in tasks:
+                existing = conn.execute(
+                    "SELECT * FROM tasks WHERE file_id = ? AND state = 'queued'", (task["file_id"],)
+                ).fetchone()
+                if existing is not None:
+                    if LANES.index(lane) >= LANES.index(existing["lane"]):
+                        continue
+                    self._unlink(conn, existing)
+                has_flow = conn.execute(
+                    "SELECT 1 FROM flows WHERE lane = ? AND job_id = ? AND category = ?",
+                    (lane, task["job_id"], task["category"]),
+                ).fetchone()
+                if has_flow is None:
+                    conn.execute("INSERT INTO flows (lane, job_id, category, turn) VALUES (?, ?, ?, ?)",
+                                 (lane, task["job_id"], task["category"], self._next_turn(conn)))
+                conn.execute(
+                    "INSERT INTO tasks (job_id, file_id, category, pdf_path, lane, phase1_bytes, phase2_tokens, "
+                    "profile) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (task["job_id"], task["file_id"], task["category"], task["pdf_path"], lane,
+                     task.get("phase1_bytes") or 0, task.get("phase2_tokens"), task.get("profile")),
+                )
+                added += 1
+            if added and self._get(conn, "status") != "paused":
+                self._set(conn, status="running")
+        self.changed.set()
+        return added
+
+    def put(self, task, lane="bulk"):
+        return self.put_many([task], lane) > 0
+
+    def claim(self):
+        """
+        Worker-side: take the next task (lane priority, round-robin inside the
+        lane) and mark it running. None when paused or nothing is queued.
+        """
+        with self._transaction() as conn:
+            if self._get(conn, "status") == "paused":
+                return None
+            for lane in LANES:
+                flow = conn.execute(
+                    "SELECT job_id, category FROM flows WHERE lane = ? ORDER BY turn LIMIT 1", (lane,)
+                ).fetchone()
+                if flow is None:
+                    continue
+                task = conn.execute(
+                    "SELECT * FROM tasks WHERE lane = ? AND job_id = ? AND category = ? AND state = 'queued' "
+                    "ORDER BY seq LIMIT 1",
+                    (lane, flow["job_id"], flow["category"]),
+                ).fetchone()
+                conn.execute("UPDATE tasks SET state = 'running' WHERE seq = ?", (task["seq"],))
+                more = conn.execute(
+                    "SELECT 1 FROM tasks WHERE lane = ? AND job_id = ? AND category = ? AND state = 'queued' LIMIT 1",
+                    (lane, flow["job_id"], flow["category"]),
+                ).fetchone()
+                if more is None:
+                    conn.execute("DELETE FROM flows WHERE lane = ? AND job_id = ? AND category = ?",
+                                 (lane, flow["job_id"], flow["category"]))
+                else:
+                    conn.execute("UPDATE flows SET turn = ? WHERE lane = ? AND job_id = ? AND category = ?",
+                                 (self._next_turn(conn), lane, flow["job_id"], flow["category"]))
+                conn.execute("UPDATE jobs SET status = 'processing', current_file = ? WHERE id = ?",
+                             (Path(task["pdf_path"]).name, task["job_id"]))
+                claimed = dict(task)
+                claimed["generation"] = self._get(conn, "generation", 0)
+                return claimed
+        return None
+
+    def finish(self, task, success):
+        """
+        Worker-side: a claimed task is done (success True/False) or was
+        cancelled (None). Goes idle when nothing is left.
+        """
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM tasks WHERE seq = ?", (task["seq"],))
+            if success is not None:
+                column = "completed" if success else "failed"
+                conn.execute(f"UPDATE jobs SET {column} = {column} + 1 WHERE id = ?", (task["job_id"],))
+                conn.execute(
+                    "UPDATE jobs SET status = 'completed', current_file = NULL "
+                    "WHERE id = ? AND status != 'cancelled' AND completed + failed >= total_files",
+                    (task["job_id"],),
+                )
+            if conn.execute("SELECT 1 FROM tasks LIMIT 1").fetchone() is None:
+                self._set(conn, status="idle", current=None, current_phase=None, current_started_at=None)
+
+    def requeue_running(self):
+        """Put tasks a previous worker died on back at the front of their flow."""
+        with self._transaction() as conn:
+            rows = conn.execute("SELECT * FROM tasks WHERE state = 'running'").fetchall()
+            for task in rows:
+                if conn.execute("SELECT 1 FROM tasks WHERE file_id = ? AND state = 'queued'",
+                                (task["file_id"],)).fetchone() is not None:
+                    conn.execute("DELETE FROM tasks WHERE seq = ?", (task["seq"],))
+                    continue
+                conn.execute("UPDATE tasks SET state = 'queued' WHERE seq = ?", (task["seq"],))
+                conn.execute(
+                    "INSERT INTO flows (lane, job_id, category, turn) VALUES (?, ?, ?, 0) "
+                    "ON CONFLICT(lane, job_id, category) DO UPDATE SET turn = 0",
+                    (task["lane"], task["job_id"], task["category"]),
+                )
+            if rows:
+                self._set(conn, current=None, current_phase=None, current_started_at=None)
+        return len(rows)
+
+    def set_status(self, status, unless=()):
+        """Set idle/running/paused unless the current status is in `unless`; returns the previous status."""
+        with self._transaction() as conn:
+            previous = self._get(conn, "status")
+            if previous not in unless:
+                self._set(conn, status=status)
+        self.changed.set()
+        return previous
+
+    def cancel(self):
+        """
+        Drop everything queued, mark open jobs cancelled and bump the cancel
+        generation (the worker stops its current file when it sees it).
+        Returns (items_cleared, current_file).
+        """
+        with self._transaction() as conn:
+            cleared = conn.execute("DELETE FROM tasks WHERE state = 'queued'").rowcount
+            conn.execute("DELETE FROM flows")
+            conn.execute("UPDATE jobs SET status = 'cancelled', current_file = NULL "
+                         "WHERE status IN ('queued', 'processing')")
+            current = self._get(conn, "current")
+            self._set(conn, status="idle", generation=self._get(conn, "generation", 0) + 1)
+        self.changed.set()
+        return cleared, (Path(current["pdf_path"]).name if current else None)
+
+    def queued_tasks(self):
+        return [dict(row) for row in self._conn().execute(
+            "SELECT * FROM tasks WHERE state = 'queued' ORDER BY seq")]
+
+    def qsize(self):
+        return self._conn().execute("SELECT COUNT(*) FROM tasks WHERE state = 'queued'").fetchone()[0]
+
+    def lane_sizes(self):
+        sizes = {lane: 0 for lane in LANES}
+        for row in self._conn().execute(
+            "SELECT lane, COUNT(*) AS n FROM tasks WHERE state = 'queued' GROUP BY lane"
+        ):
+            sizes[row["lane"]] = row["n"]
+        return sizes
+
+    def position(self, file_id):
+        """Where a queued file sits: {"lane", "position"} (1 = next), or None if not queued."""
+        conn = self._conn()
+        conn.execute("BEGIN")  # One consistent snapshot for the reads below
+        try:
+            task = conn.execute("SELECT * FROM tasks WHERE file_id = ? AND state = 'queued'",
+                                (file_id,)).fetchone()
+            if task is None:
+                return None
+            key = (task["job_id"], task["category"])
+            index = conn.execute(
+                "SELECT COUNT(*) FROM tasks WHERE lane = ? AND job_id = ? AND category = ? "
+                "AND state = 'queued' AND seq < ?",
+                (task["lane"], task["job_id"], task["category"], task["seq"]),
+            ).fetchone()[0]
+            flows = {lane: [] for lane in LANES}
+            for row in conn.execute(
+                "SELECT f.lane, f.job_id, f.category, COUNT(t.seq) AS n FROM flows f "
+                "JOIN tasks t ON t.lane = f.lane AND t.job_id = f.job_id AND t.category = f.category "
+                "AND t.state = 'queued' GROUP BY f.lane, f.job_id, f.category ORDER BY f.turn"
+            ):
+                flows[row["lane"]].append(((row["job_id"], row["category"]), row["n"]))
+        finally:
+            conn.execute("COMMIT")
+        return {"lane": task["lane"], "position": fair_position(LANES, flows, task["lane"], key, index)}
@@ -0,0 +1,325 @@
+"""
+Multi-endpoint LLM pool for Phase 2 (Markdown → JSON).
+
+Spreads chat completions over several OpenAI-compatible servers (vLLM
+replicas, Ollama on another box, ...) with weighted
+least-outstanding-requests routing. Endpoints that stop answering are
+evicted and re-admitted once a background health check succeeds again.
+Per-endpoint latency stats are kept for the CLI summary and /api/status.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+# The openai client is imported on first use so that importing this module
+# (and pdf_processor) stays cheap for runs that never call an LLM.
+
+HEALTH_CHECK_INTERVAL = 15.0   # seconds between health probes
+HEALTH_CHECK_TIMEOUT = 5.0     # seconds before a probe counts as failed
+MAX_CONSECUTIVE_FAILURES = 2   # request failures before an endpoint is evicted
+LATENCY_EWMA_ALPHA = 0.3
+AFFINITY_SLACK = 2             # extra in-flight requests tolerated to keep a prefix on "its" endpoint
+
+
+class NoHealthyEndpointError(RuntimeError):
+    """Raised when every endpoint in the pool is evicted or has failed."""
+
+
+class RequestAborted(Exception):
+    """Raised when a streaming request is aborted by its caller (cancel or pause)."""
+
+
+def is_endpoint_error(error):
+    """
+    True for errors that mean "this server is unhealthy", as opposed to a bad
+    request that would fail on every endpoint (those are re-raised immediately).
+    """
+    from openai import APIConnectionError, InternalServerError
+    return isinstance(error, (APIConnectionError, InternalServerError))
+
+
+class Endpoint:
+    """One OpenAI-compatible server plus its routing and latency state."""
+
+    def __init__(self, name, base_url, api_key, model, extra_body=None, weight=1.0):
+        if weight <= 0:
+            raise ValueError(f"Endpoint '{name}' weight must be > 0 (got {weight})")
+
+        self.name = name
+        self.base_url = base_url
+        self.model = model
+        self.extra_body = extra_body or {}
+        self.weight = float(weight)
+        self._api_key = api_key
+        self._client = None
+        self._client_lock = threading.Lock()
+
+        # Routing state (guarded by the pool lock)
+        self.outstanding = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.last_error = None
+
+        # Latency stats (successful requests only)
+        self.requests = 0
+        self.failures = 0
+        self.total_latency = 0.0
+        self.min_latency = None
+        self.max_latency = 0.0
+        self.ewma_latency = None
+
+    @property
+    def client(self):
+        """OpenAI client for this endpoint, created on the first request."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from openai import OpenAI
+                    self._client = OpenAI(base_url=self.base_url, api_key=self._api_key)
+        return self._client
+
+    def record_success(self, latency):
+        self.requests += 1
+        self.consecutive_failures = 0
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.min_latency = latency if self.min_latency is None else min(self.min_latency, latency)
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency = LATENCY_EWMA_ALPHA * latency + (1 - LATENCY_EWMA_ALPHA) * self.ewma_latency
+
+    def record_failure(self, error):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = str(error)
+
+    def stats(self):
+        """Snapshot of this endpoint's state, JSON-serialisable."""
+        avg = self.total_latency / self.requests if self.requests else None
+        return {
+            "name": self.name,
+            "base_url": self.base_url,
+            "model": self.model,
+            "weight": self.weight,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "avg_latency": round(avg, 3) if avg is not None else None,
+            "ewma_latency": round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+            "min_latency": round(self.min_latency, 3) if self.min_latency is not None else None,
+            "max_latency": round(self.max_latency, 3),
+            "last_error": self.last_error,
+        }
+
+
+class BackendPool:
+    """
+    Weighted least-outstanding-requests pool of OpenAI-compatible endpoints.
+
+    Usage:
+        pool = BackendPool.from_config([{"base_url": ..., "model": ..., "weight": 2}, ...])
+        completion, endpoint = pool.chat_completion(messages=[...], temperature=0.3)
+    """
+
+    def __init__(self, endpoints, health_interval=HEALTH_CHECK_INTERVAL,
+                 max_failures=MAX_CONSECUTIVE_FAILURES):
+        if not endpoints:
+            raise ValueError("BackendPool needs at least one endpoint")
+
+        self.endpoints = list(endpoints)
+        self.health_interval = health_interval
+        self.max_failures = max_failures
+        self._lock = threading.Lock()
+        self._health_thread = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_config(cls, endpoint_configs, **kwargs):
+        """Build a pool from a list of endpoint dicts (base_url, api_key, model, extra_body, weight)."""
+        endpoints = []
+        for idx, cfg in enumerate(endpoint_configs):
+            endpoints.append(Endpoint(
+                name=cfg.get("name") or f"endpoint-{idx + 1}",
+                base_url=cfg["base_url"],
+                api_key=cfg.get("api_key", "EMPTY"),
+                model=cfg["model"],
+                extra_body=cfg.get("extra_body"),
+                weight=cfg.get("weight", 1.0),
+            ))
+        return cls(endpoints, **kwargs)
+
+    # --- Routing ---
+
+    @property
+    def models(self):
+        """Distinct model names served by this pool, in endpoint order."""
+        return list(dict.fromkeys(e.model for e in self.endpoints))
+
+    def describe(self):
+        """Short human-readable label for log lines."""
+        if len(self.endpoints) == 1:
+            return self.endpoints[0].model
+        return f"{len(self.endpoints)} endpoints: " + ", ".join(
+            f"{e.name}={e.model}" for e in self.endpoints
+        )
+
+    @staticmethod
+    def _affinity_score(key, endpoint):
+        # Weighted rendezvous hashing: stable key → endpoint mapping that only
+        # moves the keys of an endpoint when that endpoint leaves the pool.
+        digest = hashlib.sha1(f"{key}|{endpoint.base_url}|{endpoint.model}".encode()).digest()
+        u = (int.from_bytes(digest[:8], "big") + 1) / (2 ** 64 + 2)
+        return -endpoint.weight / math.log(u)
+
+    def _pick(self, exclude, affinity_key=None):
+        candidates = [e for e in self.endpoints if e.healthy and e not in exclude]
+        if not candidates:
+            # Everything is evicted: try the evicted ones rather than failing
+            # outright, a server may have come back before the next probe.
+            candidates = [e for e in self.endpoints if e not in exclude]
+        if not candidates:
+            return None
+        # Requests sharing a prompt prefix stick to one endpoint so its KV
+        # prefix cache gets reused, unless that endpoint is clearly busier.
+        if affinity_key is not None and len(candidates) > 1:
+            preferred = max(candidates, key=lambda e: self._affinity_score(affinity_key, e))
+            least_loaded = min(e.outstanding for e in candidates)
+            if preferred.outstanding <= least_loaded + AFFINITY_SLACK:
+                return preferred
+        # Least outstanding requests relative to weight; ties go to the
+        # endpoint that has served the fewest requests relative to weight,
+        # which gives weighted round-robin when requests arrive one by one.
+        return min(
+            candidates,
+            key=lambda e: ((e.outstanding + 1) / e.weight, (e.requests + e.failures) / e.weight),
+        )
+
+    @contextmanager
+    def lease(self, exclude=(), affinity_key=None):
+        """Reserve the best endpoint for one request; records latency on clean exit."""
+        self._ensure_health_thread()
+        with self._lock:
+            endpoint = self._pick(exclude, affinity_key)
+            if endpoint is None:
+                raise NoHealthyEndpointError("No healthy LLM endpoint available")
+            endpoint.outstanding += 1
+
+        start = time.time()
+        try:
+            yield endpoint
+        except Exception as e:
+            if not is_endpoint_error(e):
+                raise
+            with self._lock:
+                endpoint.record_failure(e)
+                if endpoint.consecutive_failures >= self.max_failures and endpoint.healthy:
+                    endpoint.healthy = False
+                    print(f"   ⚠️  Evicting LLM endpoint {endpoint.name} ({endpoint.base_url}): {e}")
+            raise
+        else:
+            with self._lock:
+                endpoint.record_success(time.time() - start)
+        finally:
+            with self._lock:
+                endpoint.outstanding -= 1
+
+    def chat_completion(self, messages, affinity_key=None, abort=None, **kwargs):
+        """
+        Send one chat completion, failing over to other endpoints on connection
+        or server errors. Requests with the same affinity_key prefer the same
+        endpoint. Returns (completion, endpoint).
+        
+        With abort (a callable returning True to stop), the response is
+        streamed and checked between chunks; when abort() fires the connection
+        is closed, which makes vLLM drop the request and free its batch slot,
+        and RequestAborted is raised.
+        """
+        tried = []
+        last_error = None
+        while len(tried) < len(self.endpoints):
+            try:
+                with self.lease(exclude=tried, affinity_key=affinity_key) as endpoint:
+                    tried.append(endpoint)
+                    request_kwargs = {"model": endpoint.model, "messages": messages, **kwargs}
+                    if endpoint.extra_body:
+                        request_kwargs["extra_body"] = {
+                            **endpoint.extra_body, **kwargs.get("extra_body", {})
+                        }
+                    if abort is not None:
+                        return self._stream_completion(endpoint, request_kwargs, abort), endpoint
+                    return endpoint.client.chat.completions.create(**request_kwargs), endpoint
+            except Exception as e:
+                if not is_endpoint_error(e):
+                    raise
+                last_error = e
+        raise NoHealthyEndpointError(f"All {len(self.endpoints)} LLM endpoints failed: {last_error}")
+
+    @staticmethod
+    def _stream_completion(endpoint, request_kwargs, abort):
+        """Stream a completion, aborting between chunks; returns a completion-shaped object."""
+        if abort():
+            raise RequestAborted("Request aborted before it was sent")
+        stream = endpoint.client.chat.completions.create(
+            stream=True, stream_options={"include_usage": True}, **request_kwargs
+        )
+        parts = []
+        usage = None
+        try:
+            for chunk in stream:
+                if abort():
+                    raise RequestAborted("Request aborted while streaming")
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+        finally:
+            stream.close()  # Closing the connection aborts the request server-side
+        message = SimpleNamespace(role="assistant", content="".join(parts))
+        return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message)], usage=usage,
+                               model=endpoint.model)
+
+    # --- Health checks ---
+
+    def _ensure_health_thread(self):
+        if len(self.endpoints) < 2 or self._health_thread is not None:
+            return
+        with self._lock:
+            if self._health_thread is None:
+                self._health_thread = threading.Thread(target=self._health_loop, daemon=True)
+                self._health_thread.start()
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_interval):
+            self.check_health()
+
+    def check_health(self):
+        """Probe every endpoint once; evict dead ones and re-admit recovered ones."""
+        for endpoint in self.endpoints:
+            try:
+                endpoint.client.with_options(timeout=HEALTH_CHECK_TIMEOUT, max_retries=0).models.list()
+                alive, error = True, None
+            except Exception as e:
+                alive, error = False, e
+
+            with self._lock:
+                if alive and not endpoint.healthy:
+                    endpoint.healthy = True
+                    endpoint.consecutive_failures = 0
+                    print(f"   ✅ LLM endpoint back online: {endpoint.name} ({endpoint.base_url})")
+                elif not alive and endpoint.healthy:
+                    endpoint.healthy = False
+                    endpoint.last_error = str(error)
+                    print(f"   ⚠️  Evicting LLM endpoint {endpoint.name} ({endpoint.base_url}): health check failed")
+
+    def close(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            return [e.stats() for e in self.endpoints]
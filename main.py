@@ -1,14 +1,30 @@
 import argparse
 import logging
+import multiprocessing
+import os
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from queue import Queue
 from pathlib import Path
 from datetime import datetime
-from pdf_processor import LocalPDFProcessor
+from pdf_processor import (
+    LocalPDFProcessor, PROMPT_LAYOUTS, PREFIX_KEY_CHARS, PHASE1_SERVER_URL,
+    SHARD_PAGE_THRESHOLD, SHARD_PAGES, SHARD_WORKERS, PROMPT_VERSION, PHASE1_PROFILES, PROFILE_HASHES,
+    DEFAULT_PHASE1_PROFILE, VLM_API_URL, DOCUMENT_SUFFIX, REEXPORT_FORMATS, prefix_group_key, reexport_document, text_hash
+)
+import artifact_store
+from manifest import Manifest
+from memory_governor import MEMORY_BUDGET_MB, RECYCLE_AFTER_DOCS, MemoryGovernor
+from dataset_export import FORMATS as DATASET_FORMATS, DatasetExporter, refresh_existing
+from watcher import InputWatcher
+from scheduling import PHASE2_ORDERS, EtaModel, estimate_tokens, format_eta, order_by_size
 
 # --- CONFIG ---
 INPUT_DIR = Path("data/input")
 OUTPUT_DIR = Path("data/output")
 MARKDOWN_DIR = Path("data/markdown")
+EXPORTS_DIR = Path("data/exports")  # --reexport formats other than Markdown
 LOGS_DIR = Path("logs")
 
 # Ensure directories exist
@@ -66,117 +82,156 @@ def format_time(seconds):
         return f"{hours}h {mins}m"
 
 
-def list_categories():
+def list_categories(manifest):
     """Show available PDF categories."""
     if not INPUT_DIR.exists():
         log.error("❌ 'data/input' directory not found.")
         return
     
+    manifest.sync(INPUT_DIR, MARKDOWN_DIR, OUTPUT_DIR)
     log.info("\n📂 Available Categories:")
-    found = False
-    for item in INPUT_DIR.iterdir():
-        if item.is_dir():
-            pdfs = list(item.glob("*.pdf"))
-            mds = list((MARKDOWN_DIR / item.name).glob("*.md")) if (MARKDOWN_DIR / item.name).exists() else []
-            jsons = list((OUTPUT_DIR / item.name).glob("*.json")) if (OUTPUT_DIR / item.name).exists() else []
-            log.info(f"   - {item.name}: {len(pdfs)} PDFs | {len(mds)} MDs | {len(jsons)} JSONs")
-            found = True
-    if not found:
+    # Every input folder, including empty ones; the counts come from the manifest
+    categories = sorted(item.name for item in INPUT_DIR.iterdir() if item.is_dir())
+    for cat_name in categories:
+        counts = manifest.phase_counts(cat_name)
+        failed = f" | {counts['failed']} failed" if counts['failed'] else ""
+        log.info(f"   - {cat_name}: {counts['total']} PDFs | {counts['markdown']} MDs | "
+                 f"{counts['json']} JSONs{failed}")
+    if not categories:
         log.info("   (No folders found in data/input)")
 
 
-def list_files_in_category(category):
+STATUS_LABELS = {
+    "completed": "✅ Complete",
+    "markdown": "🔶 MD only (needs JSON)",
+    "failed": "❌ Failed",
+    "pending": "⏳ Pending",
+}
+
+
+def list_files_in_category(manifest, category):
     """List all files in a category with their processing status."""
     cat_dir = INPUT_DIR / category
     if not cat_dir.exists():
         log.error(f"❌ Category '{category}' not found.")
         return
     
-    files = sorted(list(cat_dir.glob("*.pdf")))
-    if not files:
+    manifest.sync(INPUT_DIR, MARKDOWN_DIR, OUTPUT_DIR, category)
+    rows = manifest.list_category(category)
+    if not rows:
         log.error(f"❌ No PDF files found in '{category}'")
         return
     
     log.info(f"\n📂 Category: {category}")
     log.info(f"📁 Path: {cat_dir}")
-    log.info(f"🔢 Total: {len(files)} PDFs\n")
+    log.info(f"🔢 Total: {len(rows)} PDFs\n")
     
-    for idx, pdf_file in enumerate(files, 1):
-        paper_id = f"{category}-{idx:03d}"
-        md_exists = (MARKDOWN_DIR / category / f"{paper_id}.md").exists()
-        json_exists = (OUTPUT_DIR / category / f"{paper_id}.json").exists()
-        
-        # Status indicators
-        if json_exists:
-            status = "✅ Complete"
-        elif md_exists:
-            status = "🔶 MD only (needs JSON)"
-        else:
-            status = "⏳ Pending"
-        
-        log.info(f"  {idx:3d}. {pdf_file.name}")
-        log.info(f"       ID: {paper_id} | {status}")
+    for idx, row in enumerate(rows, 1):
+        status = STATUS_LABELS[row["status"]]
+        if row["status"] == "failed" and row["error"]:
+            status += f" ({row['error'][:60]})"
+        log.info(f"  {idx:3d}. {row['filename']}")
+        log.info(f"       ID: {row['stem']} | {status}")
+
+
+def selected_categories(manifest, category):
+    """Categories to process (after syncing the manifest with the data folders)."""
+    manifest.sync(INPUT_DIR, MARKDOWN_DIR, OUTPUT_DIR, category)
+    if category:
+        return [category]
+    return manifest.categories()
+
+
+def select_stale(processor, category=None):
+    """
+    Papers whose outputs are out of date, as two sets of (category, filename):
+    those needing Phase 1 again (PDF changed, or made with other Phase 1
+    options than the run's profile) and those
+    needing Phase 2 again (Markdown, prompt or model changed; includes every
+    paper that gets a new Markdown).
+    """
+    manifest = processor.manifest
+    manifest.sync(INPUT_DIR, MARKDOWN_DIR, OUTPUT_DIR, category)
+    models = processor.pool.models if processor.pool is not None else []
+    stale = manifest.stale(PROFILE_HASHES[processor.profile], PROMPT_VERSION, models, category)
+    
+    redo_phase1 = {(row["category"], row["filename"]) for row, phase in stale if phase == 1}
+    redo_phase2 = {(row["category"], row["filename"]) for row, _ in stale}
+    
+    log.info(f"\n🕰️  Stale outputs: {len(redo_phase1)} need Phase 1 + 2, "
+             f"{len(redo_phase2) - len(redo_phase1)} need Phase 2 only")
+    for row, phase in stale:
+        log.info(f"   - {row['category']}/{row['filename']} → from Phase {phase}")
+    return redo_phase1, redo_phase2
 
 
-def phase1_convert_to_markdown(processor, category=None, resume=False, start_from=1):
+def make_room(processor, pdf_path):
+    """
+    Memory budget before a conversion: drop the Phase 1 models if the
+    governor wants this process recycled, then wait until the machine has
+    room for the paper.
+    """
+    governor = processor.governor
+    cost = governor.estimate(pdf_path)
+    reason = governor.recycle_reason(cost)
+    if reason is not None:
+        processor.release_phase1(reason)
+    governor.wait_for_room(cost)
+
+
+def phase1_convert_to_markdown(processor, category=None, resume=False, start_from=1, only=None):
     """
     PHASE 1: Convert all PDFs to Markdown.
     If category is None, process all categories.
+    With only (a set of (category, filename)), convert just those papers,
+    even if their Markdown exists.
     """
     phase_start = time.time()
+    manifest = processor.manifest
     
     log.info("\n" + "="*60)
     log.info("📄 PHASE 1: Converting PDFs to Markdown")
     log.info("="*60)
     
-    categories = []
-    if category:
-        cat_dir = INPUT_DIR / category
-        if not cat_dir.exists():
-            log.error(f"❌ Category '{category}' not found.")
-            return
-        categories = [cat_dir]
-    else:
-        categories = [d for d in INPUT_DIR.iterdir() if d.is_dir()]
+    if category and not (INPUT_DIR / category).exists():
+        log.error(f"❌ Category '{category}' not found.")
+        return
     
     total_success = 0
     total_files = 0
     timing_data = []
     
-    for cat_dir in categories:
-        cat_name = cat_dir.name
-        files = sorted(list(cat_dir.glob("*.pdf")))
+    for cat_name in selected_categories(manifest, category):
+        rows = manifest.list_category(cat_name)
         
-        if not files:
+        if not rows:
             continue
             
-        log.info(f"\n🔹 Category: {cat_name} ({len(files)} PDFs)")
+        log.info(f"\n🔹 Category: {cat_name} ({len(rows)} PDFs)")
         
-        md_output_dir = MARKDOWN_DIR / cat_name
-        md_output_dir.mkdir(parents=True, exist_ok=True)
-        
-        for idx, pdf_file in enumerate(files, 1):
-            paper_id = f"{cat_name}-{idx:03d}"
-            expected_md = md_output_dir / f"{paper_id}.md"
-            
+        for idx, row in enumerate(rows, 1):
             # Skip if before start_from
             if idx < start_from:
-                log.info(f"   ⏩ [{idx}/{len(files)}] Skipping: {pdf_file.name} (before --start-from)")
+                log.info(f"   ⏩ [{idx}/{len(rows)}] Skipping: {row['filename']} (before --start-from)")
+                continue
+            
+            if only is not None and (cat_name, row["filename"]) not in only:
                 continue
             
             # Skip if resume and MD exists
-            if resume and expected_md.exists():
-                log.info(f"   ⏩ [{idx}/{len(files)}] Skipping: {pdf_file.name} (MD exists)")
+            if resume and only is None and row["phase1_status"] == "done":
+                log.info(f"   ⏩ [{idx}/{len(rows)}] Skipping: {row['filename']} (MD exists)")
                 continue
             
-            log.info(f"   📄 [{idx}/{len(files)}] Converting: {pdf_file.name}")
+            log.info(f"   📄 [{idx}/{len(rows)}] Converting: {row['filename']}")
             
+            make_room(processor, row["pdf_path"])
             file_start = time.time()
-            success = processor.convert_pdf_to_markdown(pdf_file, cat_name, idx)
+            success = processor.convert_pdf_to_markdown(row["pdf_path"], cat_name)
             file_time = time.time() - file_start
             
             timing_data.append({
-                'paper_id': paper_id,
+                'paper_id': row['stem'],
                 'phase': 'Phase1_MD',
                 'time_seconds': file_time,
                 'success': success
@@ -200,76 +255,107 @@ def phase1_convert_to_markdown(processor, category=None, resume=False, start_fro
     return timing_data
 
 
-def phase2_generate_json(processor, category=None, resume=False, start_from=1):
+def phase2_generate_json(processor, category=None, resume=False, start_from=1, parallel=1, only=None,
+                         order="shortest"):
     """
     PHASE 2: Generate JSON from all Markdown files.
     If category is None, process all categories.
+    With only (a set of (category, filename)), generate just those papers.
+    With parallel > 1, up to that many requests are in flight at once and
+    spread over the processor's LLM endpoint pool.
+    order is one of PHASE2_ORDERS: requests are sorted by estimated prompt
+    tokens so similar sizes run side by side.
     """
     phase_start = time.time()
+    manifest = processor.manifest
     
     log.info("\n" + "="*60)
     log.info("🧠 PHASE 2: Generating JSON from Markdown")
     log.info("="*60)
     
-    categories = []
-    if category:
-        md_dir = MARKDOWN_DIR / category
-        if not md_dir.exists():
-            log.error(f"❌ No markdown found for '{category}'. Run Phase 1 first.")
-            return
-        categories = [md_dir]
-    else:
-        categories = [d for d in MARKDOWN_DIR.iterdir() if d.is_dir()]
+    if category and not (MARKDOWN_DIR / category).exists():
+        log.error(f"❌ No markdown found for '{category}'. Run Phase 1 first.")
+        return
     
-    total_success = 0
-    total_files = 0
-    timing_data = []
+    work = []
     
-    for md_dir in categories:
-        cat_name = md_dir.name
-        files = sorted(list(md_dir.glob("*.md")))
+    for cat_name in selected_categories(manifest, category):
+        rows = [row for row in manifest.list_category(cat_name) if row["phase1_status"] == "done"]
         
-        if not files:
+        if not rows:
             continue
             
-        log.info(f"\n🔹 Category: {cat_name} ({len(files)} Markdown files)")
-        
-        json_output_dir = OUTPUT_DIR / cat_name
-        json_output_dir.mkdir(parents=True, exist_ok=True)
+        log.info(f"\n🔹 Category: {cat_name} ({len(rows)} Markdown files)")
         
-        for idx, md_file in enumerate(files, 1):
-            paper_id = md_file.stem
-            expected_json = json_output_dir / f"{paper_id}.json"
+        for idx, row in enumerate(rows, 1):
+            md_file = MARKDOWN_DIR / cat_name / f"{row['stem']}.md"
             
             # Skip if before start_from
             if idx < start_from:
-                log.info(f"   ⏩ [{idx}/{len(files)}] Skipping: {md_file.name} (before --start-from)")
+                log.info(f"   ⏩ [{idx}/{len(rows)}] Skipping: {md_file.name} (before --start-from)")
                 continue
             
-            # Skip if resume and JSON exists
-            if resume and expected_json.exists():
-                log.info(f"   ⏩ [{idx}/{len(files)}] Skipping: {md_file.name} (JSON exists)")
+            if only is not None and (cat_name, row["filename"]) not in only:
                 continue
             
-            log.info(f"   🧠 [{idx}/{len(files)}] Processing: {md_file.name}")
-            
-            file_start = time.time()
-            success = processor.generate_json_from_markdown(md_file, cat_name)
-            file_time = time.time() - file_start
-            
-            timing_data.append({
-                'paper_id': paper_id,
-                'phase': 'Phase2_JSON',
-                'time_seconds': file_time,
-                'success': success
-            })
+            # Skip if resume and JSON exists
+            if resume and only is None and row["phase2_status"] == "done":
+                log.info(f"   ⏩ [{idx}/{len(rows)}] Skipping: {md_file.name} (JSON exists)")
+                continue
             
+            work.append((f"[{idx}/{len(rows)}]", md_file, cat_name))
+    
+    tokens = {item[1]: estimate_tokens(item[1]) for item in work}
+    work = order_by_size(work, tokens=lambda item: tokens[item[1]], order=order)
+    if processor.prompt_layout == "prefix-cache":
+        work = group_by_shared_prefix(work)
+    
+    eta = EtaModel()
+    progress = {"done": 0, "remaining_tokens": sum(tokens.values())}
+    progress_lock = threading.Lock()
+    if work:
+        sizes = sorted(tokens.values())
+        log.info(f"\n📏 {len(work)} requests, ~{progress['remaining_tokens']:,} prompt tokens "
+                 f"(median {sizes[len(sizes) // 2]:,}, max {sizes[-1]:,}) | order: {order} | "
+                 f"ETA {format_eta(eta.estimate(phase2_tokens=progress['remaining_tokens'], concurrency=parallel))}")
+    
+    def run_one(item):
+        label, md_file, cat_name = item
+        log.info(f"   🧠 {label} Processing: {md_file.name} (~{tokens[md_file]:,} tokens)")
+        
+        file_start = time.time()
+        success = processor.generate_json_from_markdown(md_file, cat_name)
+        file_time = time.time() - file_start
+        
+        with progress_lock:
             if success:
-                total_success += 1
-                log.info(f"   ✅ Completed in {format_time(file_time)}")
-            else:
-                log.error(f"   ❌ Failed after {format_time(file_time)}")
-            total_files += 1
+                eta.record(2, file_time, tokens=tokens[md_file])
+            progress["done"] += 1
+            progress["remaining_tokens"] -= tokens[md_file]
+            remaining = eta.estimate(phase2_tokens=progress["remaining_tokens"], concurrency=parallel)
+            counter = f"{progress['done']}/{len(work)}, ETA {format_eta(remaining)}"
+        
+        if success:
+            log.info(f"   ✅ {md_file.stem} completed in {format_time(file_time)} ({counter})")
+        else:
+            log.error(f"   ❌ {md_file.stem} failed after {format_time(file_time)} ({counter})")
+        
+        return {
+            'paper_id': md_file.stem,
+            'phase': 'Phase2_JSON',
+            'time_seconds': file_time,
+            'success': success
+        }
+    
+    if parallel > 1 and len(work) > 1:
+        log.info(f"\n⚡ Running {len(work)} requests with up to {parallel} in flight")
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            timing_data = list(executor.map(run_one, work))
+    else:
+        timing_data = [run_one(item) for item in work]
+    
+    total_files = len(timing_data)
+    total_success = sum(1 for item in timing_data if item['success'])
     
     phase_time = time.time() - phase_start
     log.info(f"\n{'='*60}")
@@ -279,9 +365,105 @@ def phase2_generate_json(processor, category=None, resume=False, start_from=1):
         log.info(f"⏱️  Average: {format_time(phase_time/total_files)} per file")
     log.info(f"{'='*60}")
     
+    print_endpoint_summary(processor)
+    
     return timing_data
 
 
+def watch_and_process(processor, category=None):
+    """
+    WATCH MODE: process unfinished PDFs, then every PDF that appears (or
+    changes) under data/input, through both phases, until Ctrl+C.
+    """
+    manifest = processor.manifest
+    ready = Queue()
+    
+    log.info("\n" + "="*60)
+    log.info("👀 WATCH MODE: PDFs are processed as they arrive (Ctrl+C to stop)")
+    log.info("="*60)
+    
+    for cat_name in selected_categories(manifest, category):
+        for row in manifest.list_category(cat_name, statuses=["pending", "markdown"]):
+            ready.put((Path(row["pdf_path"]), cat_name))
+    if ready.qsize():
+        log.info(f"   📥 {ready.qsize()} unfinished PDFs queued from the manifest")
+    
+    def on_ready(pdf_path, cat_name):
+        if category is None or cat_name == category:
+            ready.put((pdf_path, cat_name))
+    
+    watcher = InputWatcher(INPUT_DIR, on_ready).start()
+    processed = 0
+    try:
+        while True:
+            pdf_path, cat_name = ready.get()
+            if not pdf_path.exists():
+                continue
+            
+            # Unchanged PDFs that were only touched are already complete
+            row = manifest.register_pdf(pdf_path, cat_name)
+            if row["status"] == "completed":
+                continue
+            
+            log.info(f"\n📥 {cat_name}/{pdf_path.name}")
+            file_start = time.time()
+            if row["phase1_status"] != "done":
+                make_room(processor, pdf_path)
+                if not processor.convert_pdf_to_markdown(pdf_path, cat_name):
+                    log.error(f"   ❌ Phase 1 failed after {format_time(time.time() - file_start)}")
+                    continue
+            md_file = MARKDOWN_DIR / cat_name / f"{pdf_path.stem}.md"
+            if processor.generate_json_from_markdown(md_file, cat_name):
+                processed += 1
+                log.info(f"   ✅ Completed in {format_time(time.time() - file_start)} "
+                         f"({processed} this session, {ready.qsize()} waiting)")
+            else:
+                log.error(f"   ❌ Phase 2 failed after {format_time(time.time() - file_start)}")
+    except KeyboardInterrupt:
+        log.info(f"\n👋 Watch stopped ({processed} papers processed)")
+    finally:
+        watcher.stop()
+
+
+def group_by_shared_prefix(work):
+    """
+    Reorder Phase 2 work so requests whose prompts share a document prefix
+    (duplicate papers, re-runs of the same Markdown) are sent back to back,
+    while the server still has that prefix in its KV cache. Groups keep the
+    order of their first member; items within a group keep their order.
+    """
+    groups = {}
+    for item in work:
+        md_file = item[1]
+        try:
+            key = prefix_group_key(artifact_store.read_text(md_file)[:PREFIX_KEY_CHARS])
+        except OSError:
+            key = str(md_file)
+        groups.setdefault(key, []).append(item)
+    
+    shared = sum(len(g) for g in groups.values() if len(g) > 1)
+    if shared:
+        log.info(f"\n🧩 Prefix grouping: {shared} requests share a document prefix ({len(groups)} groups)")
+    return [item for group in groups.values() for item in group]
+
+
+def print_endpoint_summary(processor):
+    """Print per-endpoint request counts and latencies for multi-endpoint pools."""
+    stats = processor.pool.stats()
+    if len(stats) < 2:
+        return
+    
+    log.info("\n📡 LLM ENDPOINTS")
+    log.info("-" * 70)
+    log.info(f"{'Endpoint':<20} {'Weight':>6} {'OK':>5} {'Fail':>5} {'Avg':>9} {'Max':>9} {'Health':>8}")
+    log.info("-" * 70)
+    for item in stats:
+        avg = format_time(item['avg_latency']) if item['avg_latency'] is not None else "-"
+        health = "up" if item['healthy'] else "evicted"
+        log.info(f"{item['name']:<20} {item['weight']:>6g} {item['requests']:>5} {item['failures']:>5} "
+                 f"{avg:>9} {format_time(item['max_latency']):>9} {health:>8}")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Two-Phase PDF Pipeline: PDF → Markdown → JSON",
@@ -314,6 +496,14 @@ def main():
   python main.py --file path/to/paper.pdf           # Full pipeline for one PDF
   python main.py --file path/to/paper.pdf --json-only  # Only regenerate JSON
 
+🕰️  STALE OUTPUTS (prompt / model / Phase 1 settings changed):
+  python main.py --full --stale-only                # Redo only outdated papers, from the changed phase
+  python main.py --generate Req_2 --stale-only --backend vllm  # JSON made by another model/prompt
+
+👀 WATCH MODE (process PDFs as they are dropped into data/input):
+  python main.py --watch                   # All categories, until Ctrl+C
+  python main.py --watch Req_2             # One category
+
 🔢 START FROM SPECIFIC FILE:
   python main.py --convert Req_2 --start-from 5     # Start Phase 1 from file #5
   python main.py --generate Req_2 --start-from 10   # Start Phase 2 from file #10
@@ -335,6 +525,36 @@ def main():
 � BACKEND SELECTION:
   python main.py --generate Req_2 --backend vllm    # Use vLLM (default)
   python main.py --generate Req_2 --backend ollama  # Use Ollama + Nemotron
+  python main.py --generate Req_2 --backend all --parallel 8   # Pool from BACKEND_POOLS
+  python main.py --generate Req_2 --backend vllm,ollama        # Ad-hoc pool
+  python main.py --generate Req_2 --backend pool.json          # Pool from JSON file
+  python main.py --generate Req_2 --prompt-layout prefix-cache # Reuse server KV prefix cache
+
+⚡ PHASE 1 PROFILES (fast | balanced | accurate):
+  python main.py --convert Req_2 --profile fast      # No OCR, FAST tables, no VLM
+  python main.py --full Req_2 --profile accurate     # ACCURATE tables, every figure to the VLM
+  python main.py --full Req_2 --profile accurate --stale-only  # Redo papers made with another profile
+  python main.py --convert Req_2 --vlm-url http://localhost:8001/v1  # Figures on a vLLM/Ollama vision server
+
+🧠 MEMORY BUDGET (long runs):
+  python main.py --convert --memory-budget 24000     # Release models before RSS would pass 24 GB
+  python main.py --convert --recycle-after 100       # Release models every 100 conversions
+
+🧩 LARGE PDFs (page-range sharding):
+  python main.py --convert Theses --shard-threshold 40 --shard-size 16 --shard-workers 2
+  python main.py --convert Req_2 --shard-threshold 0          # Disable sharding
+
+🔁 RE-EXPORT (from stored Docling documents, no Phase 1 rerun):
+  python main.py --reexport                             # Markdown for all categories
+  python main.py --reexport Req_2 --reexport-format html
+
+🗃️  DATASET EXPORT (columnar, partitioned by category):
+  python main.py --export-dataset parquet   # data/dataset/parquet/category=*/part-*.parquet
+  python main.py --export-dataset ndjson    # data/dataset/ndjson/category=*/papers.ndjson.gz
+
+🔥 WARM PHASE 1 SERVER:
+  python phase1_server.py &                                    # Keep Docling models loaded
+  python main.py --convert Req_2 --phase1-server http://127.0.0.1:8765
 
 �📝 LOGS:
   All runs are logged to: logs/pipeline_YYYYMMDD_HHMMSS.log
@@ -353,34 +573,100 @@ def main():
                        help="Phase 2: Generate JSON from Markdown (all or specific category)")
     group.add_argument("--full", nargs="?", const="__ALL__", metavar="CATEGORY", 
                        help="Run both phases: PDF → MD → JSON")
+    group.add_argument("--watch", nargs="?", const="__ALL__", metavar="CATEGORY",
+                       help="Process new or changed PDFs in data/input as they arrive (all or one category)")
     group.add_argument("--file", type=str, metavar="PDF_PATH", 
                        help="Process a single PDF file (both phases)")
+    group.add_argument("--reexport", nargs="?", const="__ALL__", metavar="CATEGORY",
+                       help="Re-render Markdown (see --reexport-format) from the stored Docling documents, "
+                            "without re-running Phase 1 (all or specific category)")
+    group.add_argument("--export-dataset", choices=list(DATASET_FORMATS), metavar="FORMAT",
+                       help="Build/update the columnar dataset in data/dataset: 'parquet' (needs pyarrow) "
+                            "or 'ndjson' (gzip), partitioned by category; only new JSON is read")
     
     parser.add_argument("--resume", action="store_true", 
                         help="Skip files that already have output")
+    parser.add_argument("--stale-only", action="store_true",
+                        help="Only redo papers whose outputs were made from other inputs "
+                             "(PDF, Phase 1 options, prompt or model), from the phase that changed")
     parser.add_argument("--start-from", type=int, default=1, metavar="N",
                         help="Start processing from sequence number N (skip 1 to N-1)")
+    parser.add_argument("--reexport-format", choices=list(REEXPORT_FORMATS), default="md",
+                        help="For --reexport: 'md' (replaces data/markdown), 'html' or 'text' (data/exports)")
     parser.add_argument("--json-only", action="store_true",
                         help="For --file: skip Phase 1, only regenerate JSON from existing MD")
-    parser.add_argument("--backend", choices=["vllm", "ollama"], default="ollama",
-                        help="LLM backend for JSON generation: 'vllm' or 'ollama' (default)")
+    parser.add_argument("--backend", type=str, default="ollama", metavar="BACKEND",
+                        help="LLM backend for JSON generation: 'vllm', 'ollama' (default), "
+                             "a BACKEND_POOLS name, a comma-separated list, or a JSON pool file")
+    parser.add_argument("--prompt-layout", choices=list(PROMPT_LAYOUTS), default="header-first",
+                        help="Phase 2 prompt layout; 'prefix-cache' puts the document before per-paper "
+                             "metadata and groups shared prefixes for server-side KV prefix caching")
+    parser.add_argument("--phase1-server", type=str, metavar="URL", default=PHASE1_SERVER_URL,
+                        help="Send Phase 1 conversions to a running phase1_server.py "
+                             "(default: $PAPER_PIPELINE_PHASE1_URL)")
+    parser.add_argument("--profile", choices=list(PHASE1_PROFILES), default=DEFAULT_PHASE1_PROFILE,
+                        help="Phase 1 settings: 'fast' (no OCR, FAST tables, no VLM), 'balanced' or 'accurate' "
+                             "(default: $PAPER_PIPELINE_PROFILE or balanced)")
+    parser.add_argument("--vlm-url", type=str, metavar="URL", default=VLM_API_URL,
+                        help="Phase 1: describe figures on an OpenAI-compatible vision server (vLLM, Ollama) "
+                             "instead of in-process (default: $PAPER_PIPELINE_VLM_URL)")
+    parser.add_argument("--memory-budget", type=float, default=MEMORY_BUDGET_MB, metavar="MB",
+                        help="Phase 1: release the models before RSS would pass this "
+                             "(default: $PAPER_PIPELINE_WORKER_MEMORY_MB, 0 = no limit)")
+    parser.add_argument("--recycle-after", type=int, default=RECYCLE_AFTER_DOCS, metavar="N",
+                        help="Phase 1: release the models after N conversions "
+                             "(default: $PAPER_PIPELINE_RECYCLE_AFTER, 0 = never)")
+    parser.add_argument("--shard-threshold", type=int, default=SHARD_PAGE_THRESHOLD, metavar="PAGES",
+                        help="Phase 1: split PDFs with more pages than this into shards (0 disables)")
+    parser.add_argument("--shard-size", type=int, default=SHARD_PAGES, metavar="PAGES",
+                        help="Phase 1: pages per shard")
+    parser.add_argument("--shard-workers", type=int, default=SHARD_WORKERS, metavar="N",
+                        help="Phase 1: shards converted in parallel")
+    parser.add_argument("--parallel", type=int, default=1, metavar="N",
+                        help="Phase 2: max concurrent LLM requests, spread over the backend pool")
+    parser.add_argument("--order", choices=list(PHASE2_ORDERS), default="shortest",
+                        help="Phase 2 request order by estimated prompt size: 'shortest' first (lowest "
+                             "average wait), 'longest' first (shortest total time with --parallel), or 'name'")
 
     args = parser.parse_args()
     
     total_start = time.time()
+    manifest = Manifest()
 
     if args.list:
-        list_categories()
+        list_categories(manifest)
         return
     
     if args.list_files:
-        list_files_in_category(args.list_files)
+        list_files_in_category(manifest, args.list_files)
+        return
+
+    if args.export_dataset:
+        export_dataset(args.export_dataset)
+        return
+
+    if args.reexport:
+        reexport_documents(manifest, None if args.reexport == "__ALL__" else args.reexport,
+                           args.reexport_format)
         return
 
     # Initialize Processor
-    log.info(f"🚀 Initializing PDF Processor (backend: {args.backend})...")
+    log.info(f"🚀 Initializing PDF Processor (backend: {args.backend}, Phase 1 profile: {args.profile})...")
     init_start = time.time()
-    processor = LocalPDFProcessor(backend=args.backend)
+    # Docling is only loaded for Phase 1 work; start loading it in the
+    # background right away when this run will need it
+    needs_phase1 = bool(args.convert or args.full or args.watch or (args.file and not args.json_only))
+    try:
+        processor = LocalPDFProcessor(backend=args.backend, prompt_layout=args.prompt_layout,
+                                      warmup=needs_phase1, phase1_server=args.phase1_server,
+                                      shard_threshold=args.shard_threshold, shard_pages=args.shard_size,
+                                      shard_workers=args.shard_workers, manifest=manifest,
+                                      profile=args.profile, vlm_url=args.vlm_url,
+                                      governor=MemoryGovernor(budget_mb=args.memory_budget,
+                                                              recycle_after=args.recycle_after))
+    except ValueError as e:
+        log.error(f"❌ {e}")
+        return
     log.info(f"✅ Processor initialized in {format_time(time.time() - init_start)}")
 
     # Get category (None means all categories)
@@ -403,46 +689,137 @@ def main():
         if args.json_only:
             # JSON-only mode: skip Phase 1, use existing MD
             log.info("   Mode: JSON-only (skipping Vision phase)")
-            md_file = MARKDOWN_DIR / category / f"{category}-001.md"
-            if not md_file.exists():
+            md_file = MARKDOWN_DIR / category / f"{pdf_path.stem}.md"
+            if not artifact_store.exists(md_file):
                 log.error(f"❌ Markdown not found: {md_file}")
                 log.info("   Run without --json-only first to generate Markdown.")
                 return
+            manifest.register_pdf(pdf_path, category)
             
             file_start = time.time()
             processor.generate_json_from_markdown(md_file, category)
             log.info(f"⏱️  JSON generation: {format_time(time.time() - file_start)}")
         else:
             # Full pipeline: Phase 1 + Phase 2
+            make_room(processor, pdf_path)
             phase1_start = time.time()
-            success = processor.convert_pdf_to_markdown(pdf_path, category, 1)
+            success = processor.convert_pdf_to_markdown(pdf_path, category)
             log.info(f"⏱️  Phase 1 (Vision): {format_time(time.time() - phase1_start)}")
             
             if success:
-                md_file = MARKDOWN_DIR / category / f"{category}-001.md"
+                md_file = MARKDOWN_DIR / category / f"{pdf_path.stem}.md"
                 phase2_start = time.time()
                 processor.generate_json_from_markdown(md_file, category)
                 log.info(f"⏱️  Phase 2 (JSON): {format_time(time.time() - phase2_start)}")
 
     elif args.convert:
-        timing1 = phase1_convert_to_markdown(processor, get_category(args.convert), args.resume, args.start_from)
+        cat = get_category(args.convert)
+        only1 = select_stale(processor, cat)[0] if args.stale_only else None
+        timing1 = phase1_convert_to_markdown(processor, cat, args.resume, args.start_from, only1)
         print_timing_summary(timing1, [])
     
     elif args.generate:
-        timing2 = phase2_generate_json(processor, get_category(args.generate), args.resume, args.start_from)
+        cat = get_category(args.generate)
+        only2 = None
+        if args.stale_only:
+            only1, only2 = select_stale(processor, cat)
+            if only1:
+                log.info(f"   ⚠️  {len(only1)} papers need Phase 1 first; use --full --stale-only to redo them")
+            only2 -= only1
+        timing2 = phase2_generate_json(processor, cat, args.resume, args.start_from, args.parallel, only2,
+                                       args.order)
         print_timing_summary([], timing2)
+        refresh_existing(OUTPUT_DIR)
     
     elif args.full:
         cat = get_category(args.full)
-        timing1 = phase1_convert_to_markdown(processor, cat, args.resume, args.start_from)
-        timing2 = phase2_generate_json(processor, cat, args.resume, args.start_from)
+        only1, only2 = select_stale(processor, cat) if args.stale_only else (None, None)
+        timing1 = phase1_convert_to_markdown(processor, cat, args.resume, args.start_from, only1)
+        timing2 = phase2_generate_json(processor, cat, args.resume, args.start_from, args.parallel, only2,
+                                       args.order)
         print_timing_summary(timing1, timing2)
+        refresh_existing(OUTPUT_DIR)
+    
+    elif args.watch:
+        watch_and_process(processor, get_category(args.watch))
     
     # Final timing
     total_time = time.time() - total_start
     log.info(f"\n🏁 Total execution time: {format_time(total_time)}")
 
 
+def export_dataset(fmt):
+    """Build or incrementally update the columnar dataset of all results."""
+    try:
+        exporter = DatasetExporter(fmt, OUTPUT_DIR)
+    except ImportError:
+        log.error("❌ Parquet export needs pyarrow: pip install pyarrow (or use --export-dataset ndjson)")
+        return
+    start = time.time()
+    report = exporter.update()
+    for category, change in sorted(report.items()):
+        how = "rewritten" if change["rewritten"] else "appended"
+        log.info(f"   🗃️  {category}: +{change['added']} ~{change['changed']} -{change['removed']} ({how})")
+    log.info(f"✅ Dataset: {exporter.paper_count()} papers in {exporter.root} "
+             f"({'up to date' if not report else f'{len(report)} categories updated'}, "
+             f"{format_time(time.time() - start)})")
+
+
+def _reexport_one(job):
+    """Process-pool task: (text, None) or (None, error) for one stored document."""
+    doc_path, fmt = job
+    try:
+        return reexport_document(doc_path, fmt), None
+    except Exception as e:
+        return None, str(e)
+
+
+def reexport_documents(manifest, category=None, fmt="md"):
+    """
+    Re-render Markdown (or HTML / text) from the DoclingDocuments Phase 1
+    stored, without running Docling. Markdown replaces data/markdown and its
+    new hash is recorded, so changed papers show up for --stale-only Phase 2;
+    other formats go to data/exports/<format>/.
+    """
+    categories = [category] if category else sorted(d.name for d in MARKDOWN_DIR.iterdir() if d.is_dir())
+    documents = [(cat, MARKDOWN_DIR / cat / f"{stem}{DOCUMENT_SUFFIX}") for cat in categories
+                 for stem in sorted(artifact_store.stems(MARKDOWN_DIR / cat, DOCUMENT_SUFFIX))]
+    if not documents:
+        log.info("   (No stored documents; they are saved by Phase 1 runs from now on)")
+        return
+    
+    log.info(f"\n🔁 Re-exporting {len(documents)} documents as {fmt}...")
+    start = time.time()
+    written = unchanged = failed = 0
+    # Rendering is CPU-bound (pydantic); fork so workers skip this module's logging setup
+    with ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("fork")) as executor:
+        jobs = [(doc_path, fmt) for _, doc_path in documents]
+        for (cat, doc_path), (text, error) in zip(documents, executor.map(_reexport_one, jobs, chunksize=16)):
+            stem = doc_path.name[:-len(DOCUMENT_SUFFIX)]
+            if error is not None:
+                log.error(f"   ❌ {cat}/{stem}: {error}")
+                failed += 1
+                continue
+            
+            out_dir = MARKDOWN_DIR / cat if fmt == "md" else EXPORTS_DIR / fmt / cat
+            out_path = out_dir / f"{stem}{REEXPORT_FORMATS[fmt]}"
+            if artifact_store.exists(out_path) and artifact_store.read_text(out_path) == text:
+                unchanged += 1
+                continue
+            artifact_store.write_text(out_path, text)
+            written += 1
+            
+            if fmt == "md":
+                row = manifest.get_by_stem(cat, stem)
+                if row is not None:
+                    manifest.set_md_hash(cat, row["filename"], text_hash(text))
+    
+    log.info(f"✅ Re-export done in {format_time(time.time() - start)}: {written} written, "
+             f"{unchanged} unchanged, {failed} failed")
+    if fmt == "md" and written:
+        log.info("   Run --generate --stale-only to refresh the JSON of changed papers")
+
+
 def print_timing_summary(phase1_data, phase2_data):
     """Print a detailed timing summary table."""
     if not phase1_data and not phase2_data:
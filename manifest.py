@@ -0,0 +1,516 @@
+"""
+Run manifest: one SQLite row per paper with its PDF hash, artifact paths,
+per-phase status and timings, model, prompt version and last error.
+
+The CLI, the web backend and rename_outputs.py all read and update this
+store instead of inferring state from which .md / .json files exist, so
+resume, listing and stats are indexed lookups.
+
+Usage:
+    manifest = Manifest()                        # data/manifest.db
+    manifest.sync(INPUT_DIR, MARKDOWN_DIR, OUTPUT_DIR)
+    manifest.status_counts("Req_2")              # {"pending": 3, "completed": 10, ...}
+"""
+
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import artifact_store
+
+PROJECT_ROOT = Path(__file__).parent.resolve()
+MANIFEST_PATH = Path(os.environ.get("PAPER_PIPELINE_MANIFEST", PROJECT_ROOT / "data" / "manifest.db"))
+
+# Phase status values
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+# Columns added after the first release: (name, type), applied with ALTER TABLE
+MIGRATIONS = [
+    ("md_hash", "TEXT"),          # sha1 of the Markdown written by Phase 1
+    ("md_pdf_hash", "TEXT"),      # pdf_hash the Markdown was made from
+    ("docling_version", "TEXT"),  # Phase 1 options hash the Markdown was made with
+    ("json_md_hash", "TEXT"),     # md_hash the JSON was made from
+    ("figures_described", "INTEGER"),    # Pictures the VLM described in Phase 1
+    ("figures_skipped", "INTEGER"),      # Pictures triaged as decorative (placeholder only)
+    ("figure_seconds_saved", "REAL"),    # Estimated VLM time the skipped ones would have taken
+    ("enrichment", "TEXT"),              # Phase 1 enrichment policy and counts (JSON)
+    ("phase1_profile", "TEXT"),          # Phase 1 profile (fast, balanced, accurate) the Markdown was made with
+    ("degraded", "TEXT"),                # SLA shortcuts the outputs were made with (JSON), NULL at full quality
+    ("peak_rss_mb", "REAL"),             # Peak RSS of the process that ran Phase 1
+    ("memory_estimate_mb", "REAL"),      # What the memory governor expected the conversion to add
+]
+
+# Paper status as shown by the CLI and the web UI
+STATUSES = ("pending", "markdown", "completed", "failed")
+
+# Sort keys for paged listings -> column; each has a (category, column, filename)
+# index so a page is an index range scan (ties broken by filename)
+SORT_COLUMNS = {"name": "filename", "date": "pdf_mtime", "size": "pdf_size", "status": "status"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    category        TEXT NOT NULL,
+    filename        TEXT NOT NULL,
+    stem            TEXT NOT NULL,
+    file_id         TEXT NOT NULL,
+    pdf_path        TEXT NOT NULL,
+    pdf_hash        TEXT,
+    pdf_size        INTEGER,
+    pdf_mtime       REAL,
+    md_path         TEXT,
+    json_path       TEXT,
+    phase1_status   TEXT NOT NULL DEFAULT 'pending',
+    phase2_status   TEXT NOT NULL DEFAULT 'pending',
+    phase1_seconds  REAL,
+    phase2_seconds  REAL,
+    model           TEXT,
+    prompt_version  TEXT,
+    md_hash         TEXT,
+    md_pdf_hash     TEXT,
+    docling_version TEXT,
+    json_md_hash    TEXT,
+    figures_described    INTEGER,
+    figures_skipped      INTEGER,
+    figure_seconds_saved REAL,
+    enrichment      TEXT,
+    phase1_profile  TEXT,
+    degraded        TEXT,
+    peak_rss_mb     REAL,
+    memory_estimate_mb REAL,
+    error           TEXT,
+    created_at      TEXT NOT NULL,
+    updated_at      TEXT NOT NULL,
+    status          TEXT GENERATED ALWAYS AS (
+        CASE
+            WHEN phase2_status = 'done' THEN 'completed'
+            WHEN phase1_status = 'failed' OR phase2_status = 'failed' THEN 'failed'
+            WHEN phase1_status = 'done' THEN 'markdown'
+            ELSE 'pending'
+        END
+    ) VIRTUAL,
+    PRIMARY KEY (category, filename)
+);
+"""
+
+# Indexes are created after migrations so they can use added columns
+INDEXES = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_papers_file_id ON papers(file_id);
+CREATE INDEX IF NOT EXISTS idx_papers_stem ON papers(category, stem);
+CREATE INDEX IF NOT EXISTS idx_papers_hash ON papers(pdf_hash);
+CREATE INDEX IF NOT EXISTS idx_papers_status_name ON papers(category, status, filename);
+CREATE INDEX IF NOT EXISTS idx_papers_mtime ON papers(category, pdf_mtime, filename);
+CREATE INDEX IF NOT EXISTS idx_papers_size ON papers(category, pdf_size, filename);
+DROP INDEX IF EXISTS idx_papers_status;
+"""
+
+# Change counter bumped by every write to papers (from any process), so
+# readers can tell cheaply whether anything changed (e.g., for HTTP ETags)
+VERSIONING = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+CREATE TRIGGER IF NOT EXISTS papers_version_insert AFTER INSERT ON papers
+    BEGIN UPDATE meta SET value = value + 1 WHERE key = 'version'; END;
+CREATE TRIGGER IF NOT EXISTS papers_version_update AFTER UPDATE ON papers
+    BEGIN UPDATE meta SET value = value + 1 WHERE key = 'version'; END;
+CREATE TRIGGER IF NOT EXISTS papers_version_delete AFTER DELETE ON papers
+    BEGIN UPDATE meta SET value = value + 1 WHERE key = 'version'; END;
+"""
+
+
+def file_id_for(category, filename):
+    """Stable short ID for a PDF (same scheme the web API has always used)."""
+    return hashlib.md5(f"{category}/{filename}".encode()).hexdigest()[:12]
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class Manifest:
+    """SQLite-backed paper manifest. Safe to share between threads."""
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(papers)")}
+            for column, column_type in MIGRATIONS:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE papers ADD COLUMN {column} {column_type}")
+            conn.executescript(INDEXES)
+            conn.executescript(VERSIONING)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def version(self):
+        """Counter that changes whenever any paper row is added, changed or removed."""
+        return self._conn().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    # --- Lookups ---
+
+    def get(self, category, filename):
+        return self._conn().execute(
+            "SELECT * FROM papers WHERE category = ? AND filename = ?", (category, filename)
+        ).fetchone()
+
+    def get_by_file_id(self, file_id):
+        return self._conn().execute(
+            "SELECT * FROM papers WHERE file_id = ?", (file_id,)
+        ).fetchone()
+
+    def get_by_stem(self, category, stem):
+        return self._conn().execute(
+            "SELECT * FROM papers WHERE category = ? AND stem = ? ORDER BY filename LIMIT 1",
+            (category, stem),
+        ).fetchone()
+
+    def list_category(self, category, statuses=None):
+        """All papers in a category ordered by filename, optionally filtered by status."""
+        sql = "SELECT * FROM papers WHERE category = ?"
+        params = [category]
+        if statuses:
+            sql += f" AND status IN ({','.join('?' * len(statuses))})"
+            params.extend(statuses)
+        return self._conn().execute(sql + " ORDER BY filename", params).fetchall()
+
+    def page_category(self, category, sort="name", descending=False, statuses=None, cursor=None, limit=100):
+        """
+        One page of a category listing, sorted by SORT_COLUMNS[sort] and
+        filename. Returns (rows, next_cursor); next_cursor is None on the last
+        page. Cursors are opaque strings that resume after the last row, so
+        pages stay consistent while papers are added or change status.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Unknown sort '{sort}'. Choose from: {list(SORT_COLUMNS)}")
+        column = SORT_COLUMNS[sort]
+        direction = "DESC" if descending else "ASC"
+        sql = "SELECT * FROM papers WHERE category = ?"
+        params = [category]
+        if statuses:
+            sql += f" AND status IN ({','.join('?' * len(statuses))})"
+            params.extend(statuses)
+        if cursor:
+            sql += f" AND ({column}, filename) {'<' if descending else '>'} (?, ?)"
+            params.extend(_decode_cursor(cursor))
+        sql += f" ORDER BY {column} {direction}, filename {direction} LIMIT ?"
+        params.append(limit + 1)  # One extra row tells whether there is a next page
+        rows = self._conn().execute(sql, params).fetchall()
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, _encode_cursor([rows[-1][column], rows[-1]["filename"]])
+
+    def count_category(self, category, statuses=None):
+        sql = "SELECT COUNT(*) FROM papers WHERE category = ?"
+        params = [category]
+        if statuses:
+            sql += f" AND status IN ({','.join('?' * len(statuses))})"
+            params.extend(statuses)
+        return self._conn().execute(sql, params).fetchone()[0]
+
+    def list_papers(self, statuses=None):
+        """All papers across categories, optionally filtered by status."""
+        sql = "SELECT * FROM papers"
+        params = []
+        if statuses:
+            sql += f" WHERE status IN ({','.join('?' * len(statuses))})"
+            params.extend(statuses)
+        return self._conn().execute(sql + " ORDER BY category, filename", params).fetchall()
+
+    def categories(self):
+        return [r["category"] for r in self._conn().execute(
+            "SELECT DISTINCT category FROM papers ORDER BY category"
+        )]
+
+    def status_counts(self, category=None):
+        """{"pending": n, "markdown": n, "completed": n, "failed": n} for one or all categories."""
+        counts = {status: 0 for status in STATUSES}
+        if category is None:
+            rows = self._conn().execute("SELECT status, COUNT(*) AS n FROM papers GROUP BY status")
+        else:
+            rows = self._conn().execute(
+                "SELECT status, COUNT(*) AS n FROM papers WHERE category = ? GROUP BY status", (category,)
+            )
+        for row in rows:
+            counts[row["status"]] = row["n"]
+        return counts
+
+    def phase_counts(self, category=None):
+        """{"total", "markdown", "json", "failed"} counts for one or all categories."""
+        sql = ("SELECT COUNT(*) AS total, "
+               "COALESCE(SUM(phase1_status = 'done'), 0) AS markdown, "
+               "COALESCE(SUM(phase2_status = 'done'), 0) AS json, "
+               "COALESCE(SUM(status = 'failed'), 0) AS failed FROM papers")
+        if category is None:
+            row = self._conn().execute(sql).fetchone()
+        else:
+            row = self._conn().execute(sql + " WHERE category = ?", (category,)).fetchone()
+        return dict(row)
+
+    def stale(self, docling_version, prompt_version, models, category=None):
+        """
+        Papers whose outputs were made from different inputs than the current
+        ones, as (row, phase) pairs: phase 1 when the Markdown is stale (PDF or
+        Phase 1 options changed), phase 2 when only the JSON is (Markdown,
+        prompt or model changed). Outputs without stamps (made before stamping
+        existed) count as current.
+        """
+        models = list(models) or [""]
+        phase1_stale = (
+            "(phase1_status = 'done' AND ("
+            " (md_pdf_hash IS NOT NULL AND md_pdf_hash != pdf_hash)"
+            " OR (docling_version IS NOT NULL AND docling_version != ?)))"
+        )
+        phase2_stale = (
+            "(phase2_status = 'done' AND ("
+            " (json_md_hash IS NOT NULL AND md_hash IS NOT NULL AND json_md_hash != md_hash)"
+            " OR (prompt_version IS NOT NULL AND prompt_version != ?)"
+            f" OR (model IS NOT NULL AND model NOT IN ({','.join('?' * len(models))}))))"
+        )
+        sql = (f"SELECT *, {phase1_stale} AS phase1_stale FROM papers "
+               f"WHERE ({phase1_stale} OR {phase2_stale})")
+        params = [docling_version, docling_version, prompt_version, *models]
+        if category is not None:
+            sql += " AND category = ?"
+            params.append(category)
+        rows = self._conn().execute(sql + " ORDER BY category, filename", params).fetchall()
+        return [(row, 1 if row["phase1_stale"] else 2) for row in rows]
+
+    def is_done(self, category, filename, phase):
+        row = self.get(category, filename)
+        return row is not None and row[f"phase{phase}_status"] == DONE
+
+    # --- Updates ---
+
+    def register_pdf(self, pdf_path, category):
+        """
+        Add a PDF (or refresh it if its size/mtime changed). A changed PDF gets
+        a new hash and both phases reset to pending. Returns the row.
+        """
+        pdf_path = Path(pdf_path).resolve()
+        stat = pdf_path.stat()
+        row = self.get(category, pdf_path.name)
+        conn = self._conn()
+
+        if row is not None and row["pdf_size"] == stat.st_size and row["pdf_mtime"] == stat.st_mtime:
+            return row
+
+        pdf_hash = hash_file(pdf_path)
+        now = _now()
+        with conn:
+            if row is None:
+                conn.execute(
+                    """INSERT INTO papers (category, filename, stem, file_id, pdf_path, pdf_hash,
+                                           pdf_size, pdf_mtime, created_at, updated_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (category, pdf_path.name, pdf_path.stem, file_id_for(category, pdf_path.name),
+                     str(pdf_path), pdf_hash, stat.st_size, stat.st_mtime, now, now),
+                )
+            elif row["pdf_hash"] != pdf_hash:
+                conn.execute(
+                    """UPDATE papers SET pdf_path = ?, pdf_hash = ?, pdf_size = ?, pdf_mtime = ?,
+                                         phase1_status = 'pending', phase2_status = 'pending',
+                                         error = NULL, updated_at = ?
+                       WHERE category = ? AND filename = ?""",
+                    (str(pdf_path), pdf_hash, stat.st_size, stat.st_mtime, now, category, pdf_path.name),
+                )
+            else:
+                # Touched but unchanged (e.g. copied with new mtime)
+                conn.execute(
+                    "UPDATE papers SET pdf_path = ?, pdf_size = ?, pdf_mtime = ? WHERE category = ? AND filename = ?",
+                    (str(pdf_path), stat.st_size, stat.st_mtime, category, pdf_path.name),
+                )
+        return self.get(category, pdf_path.name)
+
+    def start_phase(self, category, filename, phase):
+        with self._conn() as conn:
+            conn.execute(
+                f"UPDATE papers SET phase{phase}_status = 'running', updated_at = ? "
+                "WHERE category = ? AND filename = ?",
+                (_now(), category, filename),
+            )
+
+    def finish_phase(self, category, filename, phase, success, seconds=None, output_path=None,
+                     error=None, **fields):
+        """
+        Record the outcome of a phase. output_path is stored as md_path (phase 1)
+        or json_path (phase 2); extra keyword fields (model, prompt_version, ...)
+        are written as-is. A successful Phase 1 resets Phase 2 to pending.
+        """
+        updates = {
+            f"phase{phase}_status": DONE if success else FAILED,
+            f"phase{phase}_seconds": seconds,
+            "error": None if success else error,
+            "updated_at": _now(),
+            **fields,
+        }
+        if output_path is not None:
+            updates["md_path" if phase == 1 else "json_path"] = str(Path(output_path).resolve())
+        if phase == 1 and success:
+            updates["phase2_status"] = PENDING
+
+        assignments = ", ".join(f"{column} = ?" for column in updates)
+        with self._conn() as conn:
+            conn.execute(
+                f"UPDATE papers SET {assignments} WHERE category = ? AND filename = ?",
+                (*updates.values(), category, filename),
+            )
+
+    def set_md_hash(self, category, filename, md_hash):
+        """Record Markdown rewritten outside Phase 1 (re-export); a JSON made from the old one becomes stale."""
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE papers SET md_hash = ?, updated_at = ? WHERE category = ? AND filename = ?",
+                (md_hash, _now(), category, filename),
+            )
+
+    def reset(self, category, filename, from_phase=1):
+        """Mark a paper for reprocessing from the given phase."""
+        columns = ["phase2_status = 'pending'"]
+        if from_phase == 1:
+            columns.append("phase1_status = 'pending'")
+        with self._conn() as conn:
+            conn.execute(
+                f"UPDATE papers SET {', '.join(columns)}, error = NULL, updated_at = ? "
+                "WHERE category = ? AND filename = ?",
+                (_now(), category, filename),
+            )
+
+    def set_degraded(self, category, filename, settings):
+        """Record the SLA shortcuts (dict) a paper's outputs were made with; None clears the flag."""
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE papers SET degraded = ?, updated_at = ? WHERE category = ? AND filename = ?",
+                (json.dumps(settings, sort_keys=True) if settings else None, _now(), category, filename),
+            )
+
+    def list_degraded(self, limit=None):
+        """Completed papers made in SLA degraded mode, least recently updated first (for upgrading)."""
+        sql = "SELECT * FROM papers WHERE degraded IS NOT NULL AND status = 'completed' ORDER BY updated_at"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self._conn().execute(sql).fetchall()
+
+    def count_degraded(self):
+        return self._conn().execute("SELECT COUNT(*) FROM papers WHERE degraded IS NOT NULL").fetchone()[0]
+
+    def remove(self, category, filename):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM papers WHERE category = ? AND filename = ?", (category, filename))
+
+    # --- Reconciliation with the data directories ---
+
+    def sync(self, input_dir, markdown_dir, output_dir, category=None):
+        """
+        Reconcile the manifest with the data directories using one directory
+        listing per folder: register new or changed PDFs, drop rows whose PDF
+        is gone, and import outputs written outside the pipeline (or removed
+        by hand). Returns {"added": n, "removed": n, "updated": n}.
+        """
+        input_dir, markdown_dir, output_dir = Path(input_dir), Path(markdown_dir), Path(output_dir)
+        if category is not None:
+            categories = [category] if (input_dir / category).is_dir() else []
+        else:
+            categories = [d.name for d in input_dir.iterdir() if d.is_dir()] if input_dir.exists() else []
+
+        stats = {"added": 0, "removed": 0, "updated": 0}
+        start_t = time.time()
+
+        for cat in categories:
+            pdfs = {e.name: e for e in os.scandir(input_dir / cat)
+                    if e.is_file() and e.name.lower().endswith(".pdf")}
+            md_stems = artifact_store.stems(markdown_dir / cat, ".md")
+            json_stems = _stems(output_dir / cat, ".json")
+            known = {row["filename"]: row for row in self.list_category(cat)}
+
+            for filename in set(known) - set(pdfs):
+                self.remove(cat, filename)
+                stats["removed"] += 1
+
+            for filename, entry in pdfs.items():
+                row = known.get(filename)
+                stat = entry.stat()
+                if row is None or row["pdf_size"] != stat.st_size or row["pdf_mtime"] != stat.st_mtime:
+                    row = self.register_pdf(entry.path, cat)
+                    stats["added" if filename not in known else "updated"] += 1
+                self._reconcile_outputs(row, cat, markdown_dir, output_dir, md_stems, json_stems, stats)
+
+        # Categories whose input folder was removed
+        if category is None:
+            for cat in set(self.categories()) - set(categories):
+                with self._conn() as conn:
+                    stats["removed"] += conn.execute("DELETE FROM papers WHERE category = ?", (cat,)).rowcount
+
+        if any(stats.values()):
+            print(f"   🗂️  Manifest synced in {time.time() - start_t:.1f}s: "
+                  f"+{stats['added']} new, {stats['updated']} updated, -{stats['removed']} removed")
+        return stats
+
+    def _reconcile_outputs(self, row, category, markdown_dir, output_dir, md_stems, json_stems, stats):
+        stem = row["stem"]
+        updates = {}
+        for phase, stems, directory, suffix, column in (
+            (1, md_stems, markdown_dir, ".md", "md_path"),
+            (2, json_stems, output_dir, ".json", "json_path"),
+        ):
+            status = row[f"phase{phase}_status"]
+            # Only adopt outputs the pipeline never recorded (legacy runs, copies);
+            # a recorded output that is pending again was reset on purpose
+            if stem in stems and status in (PENDING, FAILED) and row[column] is None:
+                updates[f"phase{phase}_status"] = DONE
+                updates[column] = str((directory / category / f"{stem}{suffix}").resolve())
+            elif stem not in stems and status == DONE:
+                updates[f"phase{phase}_status"] = PENDING
+        if updates:
+            assignments = ", ".join(f"{column} = ?" for column in updates)
+            with self._conn() as conn:
+                conn.execute(
+                    f"UPDATE papers SET {assignments}, updated_at = ? WHERE category = ? AND filename = ?",
+                    (*updates.values(), _now(), category, row["filename"]),
+                )
+            stats["updated"] += 1
+
+
+def _stems(directory, suffix):
+    if not directory.is_dir():
+        return set()
+    return {e.name[:-len(suffix)] for e in os.scandir(directory) if e.name.endswith(suffix)}
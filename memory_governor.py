@@ -0,0 +1,266 @@
+"""
+Memory budget for Phase 1 workers: admission, peak tracking and recycling.
+
+A long run in one process keeps growing: torch's caching allocator, Docling
+intermediates and the odd 400-page PDF leave memory behind that is never
+given back. MemoryGovernor keeps a worker inside a budget:
+
+- Before a paper, its cost is estimated from the page and image count of
+  the PDF. The paper is admitted when the machine has that much memory
+  available above a reserve; otherwise the worker waits for other workers
+  to finish theirs (up to MEMORY_WAIT_SECONDS, then it goes ahead).
+- A worker is recycled after RECYCLE_AFTER_DOCS local conversions, or when
+  its RSS is over MEMORY_BUDGET_MB, or would be with the next paper's
+  estimate. worker.py restarts its process in place. main.py and
+  in-process workers drop the Docling models and caches instead; if RSS
+  is still over the budget after that, dropping them again won't help, so
+  the process warns once and from then on recycles only after
+  RECYCLE_AFTER_DOCS conversions.
+- The peak RSS of every conversion is sampled and stored with the paper
+  (_phase1 metadata and the manifest's peak_rss_mb column).
+
+RSS comes from psutil when it is installed, else from /proc (Linux).
+
+Usage:
+    governor = MemoryGovernor()
+    cost = governor.estimate(pdf_path)         # {"pages", "images", "estimate_mb"}
+    reason = governor.recycle_reason(cost)     # None, or why to recycle first
+    governor.wait_for_room(cost)
+    with governor.track(cost) as usage:        # usage.summary() after the block
+        convert(pdf_path)
+"""
+
+import os
+import threading
+import time
+from functools import lru_cache
+
+MEMORY_BUDGET_MB = float(os.environ.get("PAPER_PIPELINE_WORKER_MEMORY_MB", 0))  # Per worker; 0: no limit
+RECYCLE_AFTER_DOCS = int(os.environ.get("PAPER_PIPELINE_RECYCLE_AFTER", 0))  # Conversions; 0: never
+MEMORY_RESERVE_MB = float(os.environ.get("PAPER_PIPELINE_MEMORY_RESERVE_MB", 2048))  # Kept free on the machine
+MEMORY_WAIT_SECONDS = float(os.environ.get("PAPER_PIPELINE_MEMORY_WAIT", 600))  # Then admit anyway
+SAMPLE_SECONDS = 0.25
+
+# Conversion cost: page renders, layout and table models per page, figure
+# crops for the VLM per embedded image, on top of a per-document base
+COST_BASE_MB = 256
+COST_PER_PAGE_MB = 24
+COST_PER_IMAGE_MB = 12
+
+
+def rss_mb():
+    """Resident memory of this process in MB, or None if it can't be read."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def available_mb():
+    """Memory the machine can still hand out (MemAvailable) in MB, or None if unknown."""
+    try:
+        import psutil
+        return psutil.virtual_memory().available / 2 ** 20
+    except ImportError:
+        pass
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+@lru_cache(maxsize=256)
+def _count_pages_and_images(path, mtime, size):
+    import pypdfium2
+    import pypdfium2.raw as pdfium_c
+    pdf = pypdfium2.PdfDocument(path)
+    try:
+        images = 0
+        for index in range(len(pdf)):
+            page = pdf[index]
+            images += sum(1 for _ in page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_IMAGE]))
+            page.close()
+        return len(pdf), images
+    finally:
+        pdf.close()
+
+
+def count_pages_and_images(pdf_path):
+    """(pages, embedded images) of a PDF, or (None, None) if it can't be read. Cached per file version."""
+    try:
+        stat = os.stat(pdf_path)
+        return _count_pages_and_images(str(pdf_path), stat.st_mtime, stat.st_size)
+    except Exception:
+        return None, None
+
+
+def estimate_mb(pages, images):
+    """Estimated peak memory a conversion adds, in MB (unknown counts count as one page, no images)."""
+    return COST_BASE_MB + COST_PER_PAGE_MB * (pages or 1) + COST_PER_IMAGE_MB * (images or 0)
+
+
+class MemoryUsage:
+    """Samples this process's RSS on a thread while a conversion runs; keeps the peak."""
+
+    def __init__(self, cost=None, interval=SAMPLE_SECONDS, on_exit=None):
+        self.cost = cost or {}
+        self.interval = interval
+        self.on_exit = on_exit
+        self.start_mb = self.peak_mb = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._update()
+
+    def _update(self):
+        current = rss_mb()
+        if current is not None and (self.peak_mb is None or current > self.peak_mb):
+            self.peak_mb = current
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._update()
+        if self.on_exit is not None:
+            self.on_exit(self)
+        return False
+
+    def summary(self):
+        """Stored with the paper (_phase1 "memory")."""
+        return {
+            "peak_rss_mb": round(self.peak_mb, 1) if self.peak_mb is not None else None,
+            "start_rss_mb": round(self.start_mb, 1) if self.start_mb is not None else None,
+            "estimate_mb": self.cost.get("estimate_mb"),
+            "pages": self.cost.get("pages"),
+            "images": self.cost.get("images"),
+        }
+
+
+class MemoryGovernor:
+    """Budget settings plus the conversions done since this worker (re)started."""
+
+    def __init__(self, budget_mb=MEMORY_BUDGET_MB, recycle_after=RECYCLE_AFTER_DOCS,
+                 reserve_mb=MEMORY_RESERVE_MB, wait_seconds=MEMORY_WAIT_SECONDS):
+        self.budget_mb = budget_mb
+        self.recycle_after = recycle_after
+        self.reserve_mb = reserve_mb
+        self.wait_seconds = wait_seconds
+        self._lock = threading.Lock()
+        self.documents = 0      # Local conversions since the last recycle
+        self.peak_mb = None     # Highest RSS seen during one of them
+        self.recycles = 0
+        self.rss_recycling = True   # Off once an in-process release left RSS over the budget
+
+    def estimate(self, pdf_path):
+        pages, images = count_pages_and_images(pdf_path)
+        return {"pages": pages, "images": images, "estimate_mb": estimate_mb(pages, images)}
+
+    def room_mb(self):
+        """Memory a new paper may use on this machine (available minus reserve), None if unknown."""
+        available = available_mb()
+        return None if available is None else available - self.reserve_mb
+
+    def wait_for_room(self, cost, stop=None):
+        """
+        Block until the machine has room for a paper of this cost, at most
+        wait_seconds (or until `stop`, a threading.Event, is set). Returns
+        the seconds waited.
+        """
+        start = time.time()
+        room = self.room_mb()
+        if room is None or room >= cost["estimate_mb"]:
+            return 0.0
+        print(f"   ⏳ Waiting for memory: ~{cost['estimate_mb']:.0f} MB needed, {max(0.0, room):.0f} MB free "
+              f"above the {self.reserve_mb:.0f} MB reserve")
+        while time.time() - start < self.wait_seconds:
+            if stop is None:
+                time.sleep(5)
+            elif stop.wait(5):
+                return time.time() - start
+            room = self.room_mb()
+            if room is None or room >= cost["estimate_mb"]:
+                return time.time() - start
+        print(f"   ⚠️  Still short of memory after {time.time() - start:.0f}s - going ahead")
+        return time.time() - start
+
+    def track(self, cost=None):
+        """Context manager sampling the peak RSS of one conversion; counts it when it ends."""
+        return MemoryUsage(cost, on_exit=self._finished)
+
+    def _finished(self, usage):
+        with self._lock:
+            self.documents += 1
+            if usage.peak_mb is not None and (self.peak_mb is None or usage.peak_mb > self.peak_mb):
+                self.peak_mb = usage.peak_mb
+
+    def recycle_reason(self, cost=None):
+        """
+        Why this worker should be recycled before its next paper (`cost`, if
+        known), or None. A worker that hasn't converted anything yet is never
+        recycled: a fresh process can't do better.
+        """
+        with self._lock:
+            documents = self.documents
+        if not documents:
+            return None
+        if self.recycle_after and documents >= self.recycle_after:
+            return f"{documents} conversion(s) since the last recycle"
+        if self.budget_mb and self.rss_recycling:
+            current = rss_mb()
+            if current is not None and current > self.budget_mb:
+                return f"RSS {current:.0f} MB over the {self.budget_mb:.0f} MB budget"
+            if current is not None and cost is not None and current + cost["estimate_mb"] > self.budget_mb:
+                return (f"RSS {current:.0f} MB + ~{cost['estimate_mb']:.0f} MB for the next paper "
+                        f"over the {self.budget_mb:.0f} MB budget")
+        return None
+
+    def recycled(self):
+        """Start counting again after the worker dropped its models (or restarted)."""
+        with self._lock:
+            self.documents = 0
+            self.peak_mb = None
+            self.recycles += 1
+
+    def released(self):
+        """
+        Start counting again after the models were dropped in this process.
+        If RSS is still over the budget, releasing again can't bring it down
+        (every paper would just reload the models): warn once and stop
+        recycling on RSS, leaving recycle_after (and worker.py's restart).
+        """
+        self.recycled()
+        if not self.budget_mb or not self.rss_recycling:
+            return
+        current = rss_mb()
+        if current is not None and current > self.budget_mb:
+            self.rss_recycling = False
+            print(f"   ⚠️  RSS still {current:.0f} MB after releasing the models, over the "
+                  f"{self.budget_mb:.0f} MB budget - no more RSS-triggered releases in this process")
+
+    def status(self):
+        with self._lock:
+            return {
+                "rss_mb": round(rss_mb() or 0, 1) or None,
+                "peak_mb": round(self.peak_mb, 1) if self.peak_mb is not None else None,
+                "budget_mb": self.budget_mb or None,
+                "documents": self.documents,
+                "recycle_after": self.recycle_after or None,
+                "recycles": self.recycles,
+                "rss_recycling": self.rss_recycling,
+            }
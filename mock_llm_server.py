@@ -0,0 +1,356 @@
+"""
+Local stand-in for an OpenAI-compatible LLM server (vLLM / Ollama).
+
+Answers /v1/chat/completions with a schema-valid paper JSON so Phase 2 and
+the benchmarks can run without a GPU. It simulates vLLM's automatic prefix
+caching: prompts are split into fixed-size token blocks, each block is keyed
+by the hash of everything before it, and the number of leading blocks
+already in the (LRU) cache is reported as usage.prompt_tokens_details.cached_tokens.
+Streaming requests ("stream": true) are answered as server-sent events with
+an optional per-token delay, and a client that disconnects mid-stream is
+counted as an aborted request (GET /stats).
+
+Requests with image_url content parts (Docling's picture description API
+client) are answered with a figure description in the VLM_PROMPT format,
+after an optional per-image delay. GET /stats reports how many images were
+described and the most vision requests that were in flight at once.
+
+Usage:
+    python mock_llm_server.py --port 8009
+    python main.py --generate Req_2 --backend mock.json   # base_url http://localhost:8009/v1
+    python main.py --convert Req_2 --vlm-url http://localhost:8009/v1   # Figures described by the mock
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BLOCK_SIZE = 16            # tokens per cache block (vLLM default)
+CACHE_CAPACITY = 200_000   # tokens kept in the simulated KV cache
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def tokenize(text):
+    """Cheap stand-in for a real tokenizer (~1 token per word or symbol)."""
+    return TOKEN_RE.findall(text)
+
+
+def render_prompt(messages):
+    """Flatten chat messages the way a chat template would (role markers + content)."""
+    parts = []
+    for msg in messages:
+        content = msg.get("content", "")
+        if isinstance(content, list):  # multimodal content parts
+            content = " ".join(p.get("text", "") for p in content if p.get("type") == "text")
+        parts.append(f"<|im_start|>{msg.get('role', 'user')}\n{content}<|im_end|>")
+    return "\n".join(parts) + "\n<|im_start|>assistant\n"
+
+
+def image_urls(messages):
+    """image_url parts of the chat messages (data: URLs or links)."""
+    return [p["image_url"].get("url", "") if isinstance(p.get("image_url"), dict) else p.get("image_url", "")
+            for msg in messages if isinstance(msg.get("content"), list)
+            for p in msg["content"] if p.get("type") == "image_url"]
+
+
+def png_size(url):
+    """(width, height) of a base64 PNG data: URL, or None for anything else."""
+    if not url.startswith("data:image/png;base64,"):
+        return None
+    header = base64.b64decode(url.split(",", 1)[1][:44] + "==")  # IHDR is in the first 24 bytes
+    if header[:8] != b"\x89PNG\r\n\x1a\n" or len(header) < 24:
+        return None
+    return int.from_bytes(header[16:20], "big"), int.from_bytes(header[20:24], "big")
+
+
+class PrefixCache:
+    """Block-level prefix cache with LRU eviction, mirroring vLLM's APC."""
+
+    def __init__(self, capacity_tokens=CACHE_CAPACITY, block_size=BLOCK_SIZE):
+        self.block_size = block_size
+        self.capacity_blocks = max(1, capacity_tokens // block_size)
+        self.blocks = OrderedDict()
+        self.lock = threading.Lock()
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.requests = 0
+
+    def lookup_and_insert(self, tokens):
+        """Return how many leading tokens were cached, then cache the full blocks."""
+        hashes = []
+        running = hashlib.sha1()
+        full_blocks = len(tokens) // self.block_size
+        for i in range(full_blocks):
+            running.update("\x1f".join(tokens[i * self.block_size:(i + 1) * self.block_size]).encode())
+            hashes.append(running.copy().hexdigest())
+
+        with self.lock:
+            hit_blocks = 0
+            for h in hashes:
+                if h not in self.blocks:
+                    break
+                hit_blocks += 1
+            for h in hashes:
+                self.blocks[h] = True
+                self.blocks.move_to_end(h)
+            while len(self.blocks) > self.capacity_blocks:
+                self.blocks.popitem(last=False)
+
+            cached = hit_blocks * self.block_size
+            self.requests += 1
+            self.prompt_tokens += len(tokens)
+            self.cached_tokens += cached
+        return cached
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "prefill_tokens": self.prompt_tokens - self.cached_tokens,
+            }
+
+    def reset(self):
+        with self.lock:
+            self.blocks.clear()
+            self.prompt_tokens = self.cached_tokens = self.requests = 0
+
+
+def fake_paper_json(user_text):
+    """Schema-shaped answer; echoes PAPER ID / CATEGORY wherever they appear in the prompt."""
+    paper_id = re.search(r"PAPER ID:\s*(\S+)", user_text)
+    category = re.search(r"CATEGORY:\s*(\S+)", user_text)
+    title = re.search(r"^#+\s*(.+)$", user_text, re.MULTILINE)
+    return {
+        "paper_id": paper_id.group(1) if paper_id else "UNKNOWN",
+        "metadata": {
+            "title": title.group(1).strip() if title else "Mock Paper",
+            "authors": ["Mock Author"],
+            "year": 2024,
+            "publication_venue": None,
+            "doi": None,
+        },
+        "summary": {
+            "problem_statement": "Mock problem statement.",
+            "objective": "Mock objective.",
+            "key_contribution": f"Mock contribution ({category.group(1) if category else 'n/a'}).",
+        },
+        "methodology": {
+            "approach_type": "Empirical Study",
+            "technologies_and_protocols": ["mock"],
+            "method_summary": "Mock method summary.",
+        },
+        "results_and_evaluation": {
+            "key_findings": ["Mock finding"],
+            "evaluation_metrics": ["Latency: 0ms"],
+        },
+        "visual_insights": {"has_visuals": False, "description": None},
+        "keywords": ["mock", "benchmark"],
+    }
+
+
+def fake_figure_json(size):
+    """Figure description in the VLM_PROMPT format for an image of `size` (or None)."""
+    dims = f"{size[0]}x{size[1]} px" if size else "unknown size"
+    return {
+        "type": "chart",
+        "description": f"Mock description of a {dims} figure.",
+        "data": ["mock label", "1"],
+        "insight": "Mock insight.",
+    }
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    server_version = "MockLLM/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self._send_json({"object": "list", "data": [
+                {"id": self.server.model, "object": "model", "owned_by": "mock"}
+            ]})
+        elif self.path.rstrip("/") == "/stats":
+            with self.server.stats_lock:
+                vision = dict(self.server.vision)
+            self._send_json({**self.server.cache.stats(), "aborted": self.server.aborted, **vision})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path.rstrip("/") == "/reset":
+            self.server.cache.reset()
+            with self.server.stats_lock:
+                self.server.vision.update(images=0, vision_requests=0, vision_peak_concurrency=0)
+            self._send_json({"status": "ok"})
+            return
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json({"error": "not found"}, 404)
+            return
+
+        messages = payload.get("messages", [])
+        tokens = tokenize(render_prompt(messages))
+        cached = self.server.cache.lookup_and_insert(tokens)
+
+        # Simulated prefill cost only for the uncached part of the prompt
+        if self.server.prefill_ms_per_1k:
+            time.sleep((len(tokens) - cached) / 1000 * self.server.prefill_ms_per_1k / 1000)
+
+        images = image_urls(messages)
+        if images:
+            content = self._describe(images)
+        else:
+            user_text = "\n".join(
+                m.get("content", "") for m in messages
+                if m.get("role") == "user" and isinstance(m.get("content"), str)
+            )
+            content = json.dumps(fake_paper_json(user_text), indent=2)
+        completion_tokens = len(tokenize(content))
+        usage = {
+            "prompt_tokens": len(tokens),
+            "completion_tokens": completion_tokens,
+            "total_tokens": len(tokens) + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached},
+        }
+        completion_id = f"chatcmpl-mock-{self.server.cache.requests}"
+        model = payload.get("model", self.server.model)
+
+        if payload.get("stream"):
+            include_usage = (payload.get("stream_options") or {}).get("include_usage", False)
+            self._stream(completion_id, model, content, usage if include_usage else None)
+            return
+
+        self._send_json({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        })
+
+    def _describe(self, images):
+        """Answer a vision request after vision_ms per image, tracking how many run at once."""
+        stats = self.server.vision
+        with self.server.stats_lock:
+            self.server.vision_in_flight += 1
+            stats["vision_requests"] += 1
+            stats["images"] += len(images)
+            stats["vision_peak_concurrency"] = max(stats["vision_peak_concurrency"], self.server.vision_in_flight)
+        try:
+            if self.server.vision_ms:
+                time.sleep(len(images) * self.server.vision_ms / 1000)
+        finally:
+            with self.server.stats_lock:
+                self.server.vision_in_flight -= 1
+        return json.dumps(fake_figure_json(png_size(images[0])), indent=2)
+
+    def _stream(self, completion_id, model, content, usage):
+        """Send the answer as chat.completion.chunk events, one line at a time."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def event(delta, finish_reason=None, chunk_usage=None):
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [], "usage": chunk_usage}
+            if delta is not None:
+                chunk["choices"] = [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        try:
+            event({"role": "assistant", "content": ""})
+            for line in content.splitlines(keepends=True):
+                if self.server.decode_ms_per_token:
+                    time.sleep(len(tokenize(line)) * self.server.decode_ms_per_token / 1000)
+                event({"content": line})
+            event({}, finish_reason="stop")
+            if usage is not None:
+                event(None, chunk_usage=usage)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            with self.server.stats_lock:
+                self.server.aborted += 1
+
+
+def make_server(host="127.0.0.1", port=8009, model="mock-model", prefill_ms_per_1k=0.0,
+                cache_tokens=CACHE_CAPACITY, verbose=False, decode_ms_per_token=0.0, vision_ms=0.0):
+    """Create (but do not start) a mock server; port=0 picks a free port."""
+    server = ThreadingHTTPServer((host, port), MockLLMHandler)
+    server.daemon_threads = True
+    server.model = model
+    server.prefill_ms_per_1k = prefill_ms_per_1k
+    server.cache = PrefixCache(capacity_tokens=cache_tokens)
+    server.verbose = verbose
+    server.decode_ms_per_token = decode_ms_per_token
+    server.vision_ms = vision_ms
+    server.aborted = 0
+    server.vision_in_flight = 0
+    server.vision = {"images": 0, "vision_requests": 0, "vision_peak_concurrency": 0}
+    server.stats_lock = threading.Lock()
+    return server
+
+
+def start_in_thread(**kwargs):
+    """Start a mock server on a background thread; returns (server, base_url)."""
+    server = make_server(**kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM server with prefix-cache simulation")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8009)
+    parser.add_argument("--model", default="mock-model")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=0.0,
+                        help="Simulated prefill latency per 1k uncached prompt tokens")
+    parser.add_argument("--cache-tokens", type=int, default=CACHE_CAPACITY,
+                        help="Simulated KV cache capacity in tokens")
+    parser.add_argument("--decode-ms-per-token", type=float, default=0.0,
+                        help="Simulated generation latency per output token (streaming only)")
+    parser.add_argument("--vision-ms", type=float, default=0.0,
+                        help="Simulated latency per image of a vision (picture description) request")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.model, args.prefill_ms_per_1k,
+                         args.cache_tokens, args.verbose, args.decode_ms_per_token, args.vision_ms)
+    print(f"🧪 Mock LLM server on http://{args.host}:{args.port}/v1 (model: {args.model})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,56 @@
+import contextvars
+import hashlib
 import json
 import re
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
-from openai import OpenAI
-
-# --- DOCLING IMPORTS ---
-from docling.document_converter import DocumentConverter, PdfFormatOption
-from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import (
-    PdfPipelineOptions,
-    TableFormerMode,
-    AcceleratorOptions,
-    AcceleratorDevice,
-    PictureDescriptionVlmOptions,
-    EasyOcrOptions  # GPU-accelerated OCR for better math/symbol recognition
-)
-from docling.datamodel.pipeline_options_vlm_model import (
-    InferenceFramework,
-    TransformersModelType
-)
+
+import artifact_store
+from llm_pool import BackendPool, RequestAborted
+from enrichment_policy import EnrichmentPolicy
+from figure_triage import TRIAGE_OPTIONS, VLM_PATCH_PX, FigureTriage, figure_counts
+from manifest import Manifest
+from memory_governor import MemoryGovernor
+from raster_cache import RASTER_CACHE_MB, RasterCache, cached_pdf_backend
+
+# Docling (and with it torch, EasyOCR and the VLM stack) is imported lazily in
+# _setup_docling so Phase-2-only runs start without paying for it.
 
 # --- CONFIG ---
 # Use absolute path based on project root (where this file lives)
 PROJECT_ROOT = Path(__file__).parent.resolve()
 MARKDOWN_DIR = PROJECT_ROOT / "data" / "markdown"
 
+# Warm Phase 1 server (phase1_server.py) to send conversions to, if running
+PHASE1_SERVER_URL = os.environ.get("PAPER_PIPELINE_PHASE1_URL")
+
+# Page-range sharding of large PDFs in Phase 1: documents with more pages than
+# the threshold are converted as shards of SHARD_PAGES pages in parallel and
+# stitched back together, so one 200-page thesis doesn't dominate a batch.
+SHARD_PAGE_THRESHOLD = int(os.environ.get("PAPER_PIPELINE_SHARD_THRESHOLD", 40))  # 0 disables
+SHARD_PAGES = int(os.environ.get("PAPER_PIPELINE_SHARD_PAGES", 16))
+SHARD_WORKERS = int(os.environ.get("PAPER_PIPELINE_SHARD_WORKERS", 2))
+
+# Phase 1 also saves the DoclingDocument (JSON, compressed by the artifact
+# store) next to the Markdown, so a different export (placeholder, tables,
+# format) is a re-export, not a reconversion. See main.py --reexport.
+DOCUMENT_SUFFIX = ".docling.json"
+
+# How a DoclingDocument becomes Phase 2 Markdown: VLM descriptions are added as
+# annotations automatically, the image reference itself is left empty
+MARKDOWN_EXPORT_OPTIONS = {"image_placeholder": ""}
+
+# Key of the Phase 1 record (options hash, enrichment policy and counts) added
+# to the stored document dict
+PHASE1_METADATA_KEY = "_phase1"
+
+# --reexport formats -> file suffix
+REEXPORT_FORMATS = {"md": ".md", "html": ".html", "text": ".txt"}
+
 # Backend configurations
 BACKENDS = {
     "vllm": {
@@ -42,6 +67,157 @@ BACKENDS = {
     }
 }
 
+# Named pools of several OpenAI-compatible endpoints for Phase 2.
+# Each entry either references a BACKENDS name ("backend") or gives a full
+# endpoint config (base_url, api_key, model, extra_body). "weight" scales how
+# much traffic an endpoint gets relative to the others (default 1).
+BACKEND_POOLS = {
+    "all": [
+        {"backend": "vllm", "weight": 3},
+        {"backend": "ollama", "weight": 1},
+    ],
+}
+
+
+# Picture descriptions from an OpenAI-compatible vision server (vLLM or Ollama
+# serving the VLM) instead of Qwen3-VL in-process: set its base URL. A paper's
+# figures are sent VLM_API_CONCURRENCY requests at a time, and the server
+# batches requests from every Phase 1 worker.
+VLM_API_URL = os.environ.get("PAPER_PIPELINE_VLM_URL")  # e.g. http://localhost:8001/v1
+VLM_API_KEY = os.environ.get("PAPER_PIPELINE_VLM_API_KEY", "EMPTY")
+VLM_API_MODEL = os.environ.get("PAPER_PIPELINE_VLM_MODEL")  # Name on the server (default: vlm_repo_id)
+VLM_API_CONCURRENCY = int(os.environ.get("PAPER_PIPELINE_VLM_CONCURRENCY", 8))
+VLM_API_TIMEOUT = float(os.environ.get("PAPER_PIPELINE_VLM_TIMEOUT", 300))
+
+# JSON structured output - forces complete response
+VLM_PROMPT = """Analyze this scientific figure and output valid JSON:
+
+{
+  "type": "chart|diagram|table|photo|other",
+  "description": "what the figure shows",
+  "data": ["list", "of", "all", "labels", "and", "values"],
+  "insight": "what the data means or shows"
+}
+
+Output only the JSON, nothing else."""
+
+# Everything about Phase 1 that changes the Markdown it produces, as named
+# profiles. Each profile's settings are hashed (PROFILE_HASHES) and stored with
+# the Markdown, so Markdown made with other settings shows up as stale.
+BALANCED_OPTIONS = {
+    "do_ocr": True,
+    "ocr_lang": ["en"],
+    "table_mode": "adaptive",  # fast | accurate | adaptive (FAST, ACCURATE for complex tables)
+    "do_formula_enrichment": True,
+    "do_code_enrichment": True,
+    "do_picture_description": True,
+    "vlm_repo_id": "Qwen/Qwen3-VL-8B-Instruct",
+    "vlm_prompt": VLM_PROMPT,
+    # Figure crops are rendered at vlm_scale, then downscaled to about
+    # vlm_pixel_budget pixels (512 vision tokens), but not below vlm_min_scale
+    "vlm_scale": 3.0,
+    "vlm_pixel_budget": 512 * VLM_PATCH_PX ** 2,  # None keeps vlm_scale
+    "vlm_min_scale": 1.0,
+    "vlm_min_coverage_area_pct": 0.01,
+    "vlm_generation_config": {"max_new_tokens": 2048, "temperature": 0.2, "do_sample": True},
+    "figure_triage": TRIAGE_OPTIONS,  # None sends every picture to the VLM
+    # Another model on the vision server makes other descriptions
+    **({"vlm_api_model": VLM_API_MODEL} if VLM_API_MODEL else {}),
+}
+
+PHASE1_PROFILES = {
+    # Digital-text PDFs, quick look: no OCR, FAST tables, no enrichment, no VLM
+    "fast": {
+        **BALANCED_OPTIONS,
+        "do_ocr": False,
+        "table_mode": "fast",
+        "do_formula_enrichment": False,
+        "do_code_enrichment": False,
+        "do_picture_description": False,
+    },
+    # ACCURATE tables only where needed, decorative figures skipped, figures
+    # downscaled to the VLM pixel budget
+    "balanced": BALANCED_OPTIONS,
+    # ACCURATE tables throughout, every picture described at the full render scale
+    "accurate": {
+        **BALANCED_OPTIONS,
+        "table_mode": "accurate",
+        "vlm_pixel_budget": None,
+        "figure_triage": None,
+    },
+}
+
+# Profile for runs and categories that don't choose one
+DEFAULT_PHASE1_PROFILE = os.environ.get("PAPER_PIPELINE_PROFILE", "balanced")
+if DEFAULT_PHASE1_PROFILE not in PHASE1_PROFILES:
+    raise ValueError(f"Unknown Phase 1 profile '{DEFAULT_PHASE1_PROFILE}' in PAPER_PIPELINE_PROFILE. "
+                     f"Choose from: {list(PHASE1_PROFILES)}")
+PHASE1_OPTIONS = PHASE1_PROFILES[DEFAULT_PHASE1_PROFILE]
+
+
+def options_hash(options):
+    """Short stable hash of a JSON-serialisable settings dict."""
+    return hashlib.sha1(json.dumps(options, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+PROFILE_HASHES = {name: options_hash(options) for name, options in PHASE1_PROFILES.items()}
+DOCLING_OPTIONS_HASH = PROFILE_HASHES[DEFAULT_PHASE1_PROFILE]
+
+
+def check_profile(profile):
+    """`profile`, or the default for None; ValueError if it isn't a PHASE1_PROFILES name."""
+    if profile is None:
+        return DEFAULT_PHASE1_PROFILE
+    if profile not in PHASE1_PROFILES:
+        raise ValueError(f"Unknown Phase 1 profile '{profile}'. Choose from: {list(PHASE1_PROFILES)}")
+    return profile
+
+
+def resolve_backend(spec):
+    """
+    Turn a --backend value into a list of endpoint configs.
+
+    Accepts a BACKENDS name ("vllm"), a BACKEND_POOLS name ("all"), a
+    comma-separated list of BACKENDS names ("vllm,ollama"), or a path to a
+    JSON file holding a list of endpoint configs (or {"endpoints": [...]}).
+    """
+    if spec in BACKENDS:
+        return [{"name": spec, **BACKENDS[spec]}]
+
+    if spec in BACKEND_POOLS:
+        entries = BACKEND_POOLS[spec]
+    elif spec.endswith(".json") and Path(spec).exists():
+        with open(spec, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        if isinstance(entries, dict):
+            entries = entries.get("endpoints", [])
+    elif "," in spec:
+        entries = [{"backend": name.strip()} for name in spec.split(",") if name.strip()]
+    else:
+        raise ValueError(
+            f"Unknown backend '{spec}'. Choose from: {list(BACKENDS.keys())}, "
+            f"pools {list(BACKEND_POOLS.keys())}, a comma-separated list, or a JSON pool file"
+        )
+
+    endpoints = []
+    for idx, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ValueError(f"Endpoint {idx + 1} in pool '{spec}' must be an object, got {entry!r}")
+        if "backend" in entry:
+            name = entry["backend"]
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown backend '{name}' in pool '{spec}'")
+            config = {"name": name, **BACKENDS[name]}
+            config.update({k: v for k, v in entry.items() if k != "backend"})
+        else:
+            config = {"name": f"endpoint-{idx + 1}", **entry}
+        missing = [key for key in ("base_url", "model") if not config.get(key)]
+        if missing:
+            raise ValueError(f"Endpoint {idx + 1} ({config['name']}) in pool '{spec}' is missing "
+                             f"{', '.join(repr(key) for key in missing)}")
+        endpoints.append(config)
+    return endpoints
+
 SYSTEM_PROMPT = """# Role
 You are an advanced AI Research Scientist. Your inputs are not just raw text, but a rich Markdown document containing both the text of a scientific paper and detailed AI-generated descriptions of its charts, diagrams, and tables.
 
@@ -95,81 +271,428 @@ Your goal is to perform a deep, comprehensive analysis of this document and outp
 }
 """
 
+# Recorded per paper in the manifest so outputs can be traced to the prompt that made them
+PROMPT_VERSION = hashlib.sha1(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+# Phase 2 user-message layouts:
+#   header-first - PAPER ID / CATEGORY header, then the document (original layout)
+#   prefix-cache - document first, per-paper metadata last, so the server's KV
+#                  prefix cache covers system prompt + document on re-runs
+PROMPT_LAYOUTS = ("header-first", "prefix-cache")
+PREFIX_KEY_CHARS = 4096  # leading document chars that identify a shared prefix
+
+
+def build_user_message(paper_id, category_code, markdown_text, layout="header-first"):
+    """Build the Phase 2 user message for the given prompt layout."""
+    if layout == "prefix-cache":
+        return (f"ANALYZED DOCUMENT CONTENT (MARKDOWN):\n{markdown_text}\n\n"
+                f"PAPER ID: {paper_id}\nCATEGORY: {category_code}")
+    return f"PAPER ID: {paper_id}\nCATEGORY: {category_code}\n\nANALYZED DOCUMENT CONTENT (MARKDOWN):\n{markdown_text}"
+
+
+# Sections left out of compacted Phase 2 prompts (SLA degraded mode): nothing
+# in the JSON schema comes from them
+COMPACT_DROP_SECTIONS = re.compile(
+    r"(references|bibliography|acknowledge?ments?|funding|conflicts? of interest|"
+    r"declaration of competing interest|author contributions)\b", re.IGNORECASE)
+
+
+def compact_markdown(markdown_text):
+    """
+    Markdown for a compacted Phase 2 prompt: reference lists and back matter
+    (COMPACT_DROP_SECTIONS, up to the next heading of the same or a higher
+    level) are dropped and runs of blank lines collapsed.
+    """
+    lines, drop_level = [], None
+    for line in markdown_text.splitlines():
+        heading = re.match(r"(#+)\s+(?:[\dIVX]+\.?\s+)*(.*)", line)
+        if heading:
+            level = len(heading.group(1))
+            if drop_level is not None and level <= drop_level:
+                drop_level = None
+            if drop_level is None and COMPACT_DROP_SECTIONS.match(heading.group(2)):
+                drop_level = level
+        if drop_level is None:
+            lines.append(line)
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip() + "\n"
+
+
+def text_hash(text):
+    """Hash used to stamp which Markdown a JSON was generated from."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def prefix_group_key(markdown_text):
+    """Key shared by requests whose prompts start with the same document prefix."""
+    return hashlib.sha1(markdown_text[:PREFIX_KEY_CHARS].encode("utf-8")).hexdigest()[:16]
+
+
+def count_pdf_pages(pdf_path):
+    """Page count via pypdfium2 (a Docling dependency); None if the PDF can't be read."""
+    try:
+        import pypdfium2
+        pdf = pypdfium2.PdfDocument(str(pdf_path))
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    except Exception:
+        return None
+
+
+def plan_page_shards(num_pages, shard_pages):
+    """1-based inclusive (start, end) page ranges covering the document in order."""
+    return [
+        (start, min(start + shard_pages - 1, num_pages))
+        for start in range(1, num_pages + 1, shard_pages)
+    ]
+
+
+def document_path(md_path):
+    """Where the DoclingDocument behind a Markdown file is stored."""
+    md_path = Path(md_path)
+    return md_path.with_name(md_path.stem + DOCUMENT_SUFFIX)
+
+
+def save_document(document, path):
+    """Store a DoclingDocument (or its export_to_dict()) in the artifact store."""
+    data = document if isinstance(document, dict) else document.export_to_dict()
+    artifact_store.write_text(path, json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+
+
+def load_document(path):
+    """Read a DoclingDocument saved by save_document."""
+    from docling_core.types.doc import DoclingDocument
+    return DoclingDocument.model_validate_json(artifact_store.read_bytes(path))
+
+
+def render_document(document, fmt="md"):
+    """Export a DoclingDocument as one of REEXPORT_FORMATS."""
+    if fmt == "md":
+        return document.export_to_markdown(**MARKDOWN_EXPORT_OPTIONS)
+    if fmt == "html":
+        return document.export_to_html()
+    if fmt == "text":
+        return document.export_to_text()
+    raise ValueError(f"Unknown export format '{fmt}'. Choose from: {list(REEXPORT_FORMATS)}")
+
+
+def reexport_document(path, fmt="md"):
+    """Load a stored DoclingDocument and render it (module-level for process pools)."""
+    return render_document(load_document(path), fmt)
+
+
+class ProcessingCancelled(Exception):
+    """Raised at a checkpoint when the file's processing was cancelled."""
+
+
+class ProcessingControl:
+    """
+    Cooperative pause/cancel for one file. The worker calls checkpoint()
+    between units of work (Docling page batches, LLM stream chunks): it blocks while
+    the shared run gate is cleared (paused) and raises ProcessingCancelled
+    once cancel() was called. Nothing polls; waiting is on threading.Event.
+    """
+
+    def __init__(self, run_gate=None):
+        self.cancel_event = threading.Event()
+        if run_gate is None:
+            run_gate = threading.Event()
+            run_gate.set()
+        self.run_gate = run_gate  # Set = running, cleared = paused
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def paused(self):
+        return not self.run_gate.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def checkpoint(self):
+        """Wait out a pause, then raise ProcessingCancelled if cancelled."""
+        if self.cancelled:
+            raise ProcessingCancelled()
+        self.run_gate.wait()
+        if self.cancelled:
+            raise ProcessingCancelled()
+
+
+# ProcessingControl of the Docling conversion running in this context (thread)
+_CONVERSION_CONTROL = contextvars.ContextVar("conversion_control", default=None)
+
+
+class CheckpointedStage:
+    """
+    Wraps the first model of a Docling pipeline's build_pipe so the current
+    conversion's ProcessingControl is checked before each page batch; the
+    pipeline runs it on the thread that called convert(). Everything but
+    __call__ is delegated.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def __call__(self, conv_res, page_batch):
+        control = _CONVERSION_CONTROL.get()
+        if control is not None:
+            control.checkpoint()
+        yield from self.model(conv_res, page_batch)
+
+
+def run_converter(converter, pdf_path, control=None, **kwargs):
+    """converter.convert() with `control` checked before each page batch; returns the DoclingDocument."""
+    token = _CONVERSION_CONTROL.set(control)
+    try:
+        return converter.convert(pdf_path, **kwargs).document
+    finally:
+        _CONVERSION_CONTROL.reset(token)
+
+
+class Phase1Profile:
+    """
+    One profile's Phase 1 state in a processor: its options, the enrichment
+    policy and figure triage installed in its pipeline, and its Docling
+    converter (built on first use by LocalPDFProcessor.converter_for).
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.options = options = PHASE1_PROFILES[name]
+        self.options_hash = PROFILE_HASHES[name]
+        # Formula / code models only for detected regions, ACCURATE tables only when needed
+        self.enrichment = EnrichmentPolicy(options["table_mode"],
+                                           do_formula=options["do_formula_enrichment"],
+                                           do_code=options["do_code_enrichment"])
+        # Decorative pictures get a placeholder instead of a VLM description,
+        # the others are downscaled to the VLM pixel budget
+        self.figure_triage = None
+        if options["do_picture_description"] and (options["figure_triage"] or options["vlm_pixel_budget"]):
+            self.figure_triage = FigureTriage(options["figure_triage"], pixel_budget=options["vlm_pixel_budget"],
+                                              min_scale=options["vlm_min_scale"], max_scale=options["vlm_scale"])
+        self.converter = None
+
 
 class LocalPDFProcessor:
-    def __init__(self, backend="vllm"):
+    def __init__(self, backend="vllm", prompt_layout="header-first", warmup=False,
+                 phase1_server=PHASE1_SERVER_URL, shard_threshold=SHARD_PAGE_THRESHOLD,
+                 shard_pages=SHARD_PAGES, shard_workers=SHARD_WORKERS, manifest=None,
+                 profile=None, vlm_url=VLM_API_URL, governor=None):
         """
         Initialize processor with specified backend.
         
         Args:
-            backend: "vllm" (default) or "ollama"
+            backend: "vllm" (default), "ollama", or a pool spec (see resolve_backend);
+                     None for a Phase-1-only processor
+            prompt_layout: one of PROMPT_LAYOUTS ("prefix-cache" for vLLM prefix caching)
+            warmup: start loading the Docling models on a background thread now
+            phase1_server: URL of a running phase1_server to convert PDFs on
+                           (falls back to local Docling if it is unreachable)
+            shard_threshold: split PDFs with more pages than this (0 disables)
+            shard_pages: pages per shard
+            shard_workers: shards converted in parallel
+            manifest: Manifest to record phase status and timings in
+                      (default: the shared data/manifest.db)
+            profile: PHASE1_PROFILES name used when a call doesn't pass one
+                     (default: DEFAULT_PHASE1_PROFILE)
+            vlm_url: base URL of an OpenAI-compatible vision server for picture
+                     descriptions (default: $PAPER_PIPELINE_VLM_URL; None runs
+                     the VLM in-process)
+            governor: MemoryGovernor that samples the peak memory of local
+                      conversions and counts them (default: one with the
+                      settings from the environment)
         """
-        if backend not in BACKENDS:
-            raise ValueError(f"Unknown backend '{backend}'. Choose from: {list(BACKENDS.keys())}")
+        if prompt_layout not in PROMPT_LAYOUTS:
+            raise ValueError(f"Unknown prompt layout '{prompt_layout}'. Choose from: {list(PROMPT_LAYOUTS)}")
         
         self.backend = backend
-        config = BACKENDS[backend]
-        
-        self.client = OpenAI(base_url=config["base_url"], api_key=config["api_key"])
-        self.model_name = config["model"]
-        self.extra_body = config["extra_body"]
+        self.profile = check_profile(profile)
+        self.prompt_layout = prompt_layout
         self.system_prompt = SYSTEM_PROMPT
+        self.vlm_url = vlm_url
+        self.shard_threshold = shard_threshold
+        self.shard_pages = max(1, shard_pages)
+        self.shard_workers = max(1, shard_workers)
+        self.manifest = manifest if manifest is not None else Manifest()
+        self.governor = governor if governor is not None else MemoryGovernor()
+        if backend is None:
+            self.pool = None
+            self.model_name = None
+        else:
+            self.pool = BackendPool.from_config(resolve_backend(backend))
+            self.model_name = self.pool.describe()
+            print(f"   🔌 Using backend: {backend} ({self.model_name})")
+        if vlm_url:
+            print(f"   🖼️  Picture descriptions on vision server: {vlm_url} "
+                  f"({VLM_API_CONCURRENCY} concurrent requests)")
+        self._pools = {}  # Other backends asked for per call (pool_for)
+        self._pool_lock = threading.Lock()
+        
+        self.phase1_client = None
+        if phase1_server:
+            from phase1_server import Phase1Client
+            self.phase1_client = Phase1Client(phase1_server)
+            if self.phase1_client.health() is not None:
+                print(f"   🔗 Using warm Phase 1 server: {phase1_server}")
+                warmup = False  # The server holds the models
+            else:
+                print(f"   ⚠️  Phase 1 server not reachable at {phase1_server} (will retry per file)")
         
-        print(f"   🔌 Using backend: {backend} ({self.model_name})")
+        # Page renders shared by OCR, layout and the VLM, and kept across runs
+        self.raster_cache = RasterCache() if RASTER_CACHE_MB > 0 else None
         
-        # Initialize Docling (Heavy operation, done once on startup)
-        print("   ⚙️  Initializing Docling Vision Pipeline (Qwen-VL)...")
-        self.converter = self._setup_docling()
+        # Docling is a heavy operation, done once per profile on its first
+        # Phase 1 use (or by warm_up for the default profile); mixed workloads
+        # keep every converter they have built
+        self._profiles = {name: Phase1Profile(name) for name in PHASE1_PROFILES}
+        self._converter_lock = threading.Lock()
+        self._warmup_thread = None
+        if warmup:
+            self.warm_up()
+
+    @property
+    def converter(self):
+        """The Docling converter of the default profile, built on first access."""
+        return self.converter_for(self.profile)
+
+    def converter_for(self, profile=None):
+        """The Docling converter of a Phase 1 profile, built on first use and kept."""
+        setup = self._profiles[check_profile(profile)]
+        if setup.converter is None:
+            with self._converter_lock:
+                if setup.converter is None:
+                    print(f"   ⚙️  Initializing Docling Vision Pipeline (profile '{setup.name}')...")
+                    start_t = time.time()
+                    setup.converter = self._setup_docling(setup)
+                    print(f"   ✅ Docling converter ready ({time.time() - start_t:.1f}s)")
+        return setup.converter
+
+    def pool_for(self, backend=None):
+        """The Phase 2 pool for a backend spec (default: the processor's), built on first use and kept."""
+        if backend is None or backend == self.backend:
+            return self.pool
+        with self._pool_lock:
+            if backend not in self._pools:
+                self._pools[backend] = BackendPool.from_config(resolve_backend(backend))
+                print(f"   🔌 Using backend: {backend} ({self._pools[backend].describe()})")
+            return self._pools[backend]
+
+    def loaded_profiles(self):
+        """Names of the profiles whose converter has been built."""
+        return [name for name, setup in self._profiles.items() if setup.converter is not None]
+
+    def release_phase1(self, reason):
+        """
+        Drop every Docling converter and give cached memory back (torch's
+        CUDA cache, freed heap) so a long-running process starts over from a
+        clean slate; the converters are rebuilt on the next conversion.
+        """
+        import gc
+        import sys
+        print(f"   ♻️  Releasing Phase 1 models ({reason})")
+        with self._converter_lock:
+            # Fresh profiles: the enrichment policy holds its lazily loaded models too
+            self._profiles = {name: Phase1Profile(name) for name in PHASE1_PROFILES}
+        gc.collect()
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        try:
+            import ctypes
+            ctypes.CDLL("libc.so.6").malloc_trim(0)  # glibc keeps freed heap otherwise
+        except (OSError, AttributeError):
+            pass
+        self.governor.released()
 
-    def _setup_docling(self):
-        """Configures the Qwen-VL based document converter."""
+    def warm_up(self):
+        """
+        Build the converter and load the Phase 1 models on a background thread,
+        so the first PDF does not pay the cold start. Safe to call repeatedly.
+        """
+        if self._warmup_thread is not None or self._profiles[self.profile].converter is not None:
+            return self._warmup_thread
+        if self.phase1_client is not None and self.phase1_client.health() is not None:
+            return None  # The Phase 1 server already holds the models
+
+        def _warm():
+            try:
+                from docling.datamodel.base_models import InputFormat
+                start_t = time.time()
+                self.converter.initialize_pipeline(InputFormat.PDF)
+                print(f"   🔥 Phase 1 models warmed up ({time.time() - start_t:.1f}s)")
+            except Exception as e:
+                print(f"   ⚠️  Docling warm-up failed (will retry on first PDF): {e}")
+
+        self._warmup_thread = threading.Thread(target=_warm, name="docling-warmup", daemon=True)
+        self._warmup_thread.start()
+        return self._warmup_thread
+
+    def _setup_docling(self, setup):
+        """Configures the Qwen-VL based document converter for a Phase1Profile."""
+        from docling.document_converter import DocumentConverter, PdfFormatOption
+        from docling.datamodel.base_models import InputFormat
+        from docling.datamodel.pipeline_options import (
+            PdfPipelineOptions,
+            TableFormerMode,
+            AcceleratorOptions,
+            AcceleratorDevice,
+            PictureDescriptionVlmOptions,
+            EasyOcrOptions  # GPU-accelerated OCR for better math/symbol recognition
+        )
+        from docling.datamodel.pipeline_options_vlm_model import (
+            InferenceFramework,
+            TransformersModelType
+        )
+
+        options = setup.options
         pipeline_options = PdfPipelineOptions()
         # OCR disabled - Scopus papers (2020+) have embedded digital text
         # Enable only if processing scanned documents
-        pipeline_options.do_ocr = True
+        pipeline_options.do_ocr = options["do_ocr"]
         
         # Use EasyOCR (GPU-accelerated, PyTorch-based) instead of RapidOCR
         # RapidOCR had ONNX hardware issues on this system
         pipeline_options.ocr_options = EasyOcrOptions(
             use_gpu=True,
-            lang=["en"]  # English - add more languages if needed
+            lang=options["ocr_lang"]  # English - add more languages if needed
         )
         
         pipeline_options.do_table_structure = True
-        pipeline_options.table_structure_options.mode = TableFormerMode.ACCURATE
-        pipeline_options.do_formula_enrichment = True
-        pipeline_options.do_code_enrichment = True
+        # Adaptive tables start in FAST mode; formula and code enrichment are
+        # left off here and installed by the enrichment policy, which loads
+        # the model on the first formula or code region
+        table_mode = options["table_mode"]
+        pipeline_options.table_structure_options.mode = TableFormerMode(
+            "fast" if table_mode == "adaptive" else table_mode)
+        pipeline_options.do_formula_enrichment = False
+        pipeline_options.do_code_enrichment = False
         
         # Enable Qwen Vision for images/charts
-        pipeline_options.do_picture_description = True
-        
-        # JSON structured output - forces complete response
-        vlm_prompt = """Analyze this scientific figure and output valid JSON:
-
-{
-  "type": "chart|diagram|table|photo|other",
-  "description": "what the figure shows",
-  "data": ["list", "of", "all", "labels", "and", "values"],
-  "insight": "what the data means or shows"
-}
-
-Output only the JSON, nothing else."""
+        pipeline_options.do_picture_description = options["do_picture_description"]
 
-        pipeline_options.picture_description_options = PictureDescriptionVlmOptions(
-            repo_id="Qwen/Qwen3-VL-8B-Instruct", 
-            prompt=vlm_prompt,
-            inference_framework=InferenceFramework.TRANSFORMERS,
-            transformers_model_type=TransformersModelType.AUTOMODEL_IMAGETEXTTOTEXT,
-            scale=3.0,
-            min_coverage_area_pct=0.01,   # Process even small images (1% of page)
-            batch_size=1,                  # Process one image at a time for stability
-            # generation_config is the correct way to set token limits
-            generation_config={
-                "max_new_tokens": 2048,    # Max output length (was defaulting to 256!)
-                "temperature": 0.2,
-                "do_sample": True
-            }
-        )
+        if self.vlm_url:
+            # Docling refuses to send page content to a remote server without this
+            pipeline_options.enable_remote_services = True
+            pipeline_options.picture_description_options = self._vlm_api_options(options)
+        else:
+            pipeline_options.picture_description_options = PictureDescriptionVlmOptions(
+                repo_id=options["vlm_repo_id"], 
+                prompt=options["vlm_prompt"],
+                inference_framework=InferenceFramework.TRANSFORMERS,
+                transformers_model_type=TransformersModelType.AUTOMODEL_IMAGETEXTTOTEXT,
+                scale=options["vlm_scale"],
+                min_coverage_area_pct=options["vlm_min_coverage_area_pct"],   # Process even small images (1% of page)
+                batch_size=1,                  # Process one image at a time for stability
+                # generation_config is the correct way to set token limits
+                # (max_new_tokens was defaulting to 256!)
+                generation_config=dict(options["vlm_generation_config"])
+            )
 
         # Use the remaining GPU power (Docker used 50%, we use the rest)
         pipeline_options.accelerator_options = AcceleratorOptions(
@@ -177,32 +700,181 @@ Output only the JSON, nothing else."""
             device=AcceleratorDevice.CUDA
         )
 
+        format_kwargs = {"pipeline_cls": self._pipeline_class(setup)}
+        if self.raster_cache is not None:
+            format_kwargs["backend"] = cached_pdf_backend(self.raster_cache)
+
         return DocumentConverter(
             format_options={
-                InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
+                InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options, **format_kwargs)
             }
         )
 
-    def extract_markdown(self, pdf_path):
-        """Converts PDF to rich Markdown using Qwen-VL."""
-        print(f"   👁️  Visual Analysis: {Path(pdf_path).name} (this takes time)...")
+    def _vlm_api_options(self, options):
+        """
+        Picture description options for the vision server at self.vlm_url
+        (OpenAI chat completions API, as served by vLLM and Ollama). Each
+        enrichment batch sends VLM_API_CONCURRENCY figures at once.
+        """
+        from docling.datamodel.pipeline_options import PictureDescriptionApiOptions
+
+        url = self.vlm_url.rstrip("/")
+        if not url.endswith("/chat/completions"):
+            url += "/chat/completions"
+        generation = options["vlm_generation_config"]
+        return PictureDescriptionApiOptions(
+            url=url,
+            headers={"Authorization": f"Bearer {VLM_API_KEY}"},
+            params={
+                "model": options.get("vlm_api_model") or options["vlm_repo_id"],
+                "max_tokens": generation["max_new_tokens"],
+                "temperature": generation["temperature"],
+            },
+            prompt=options["vlm_prompt"],
+            scale=options["vlm_scale"],
+            min_coverage_area_pct=options["vlm_min_coverage_area_pct"],
+            timeout=VLM_API_TIMEOUT,
+            concurrency=VLM_API_CONCURRENCY,
+            batch_size=VLM_API_CONCURRENCY,
+        )
+
+    def _pipeline_class(self, setup):
+        """
+        Docling's PDF pipeline with a profile's enrichment policy, figure
+        triage and the pause/cancel checkpoint installed.
+        """
+        from docling.pipeline.standard_pdf_pipeline import StandardPdfPipeline
+        enrichment, figure_triage = setup.enrichment, setup.figure_triage
+
+        class Phase1Pipeline(StandardPdfPipeline):
+            def __init__(self, pipeline_options):
+                super().__init__(pipeline_options)
+                enrichment.install(self, pipeline_options)
+                if figure_triage is not None:
+                    figure_triage.install(self)
+                if getattr(self, "build_pipe", None):
+                    self.build_pipe = [CheckpointedStage(self.build_pipe[0]), *self.build_pipe[1:]]
+                else:
+                    print("   ⚠️  Pause/cancel: no build_pipe in this Docling pipeline, "
+                          "a local conversion runs to completion")
+
+        return Phase1Pipeline
+
+    def extract_markdown(self, pdf_path, control=None, profile=None):
+        """
+        Converts PDF to rich Markdown using Qwen-VL (on the Phase 1 server if configured).
+        With a ProcessingControl, a local conversion stops between Docling page
+        batches on cancel (raising ProcessingCancelled); a conversion already sent to
+        the Phase 1 server runs to completion. profile is a PHASE1_PROFILES
+        name (default: the processor's).
+        """
+        return self.extract_document(pdf_path, control, profile)[0]
+
+    def extract_document(self, pdf_path, control=None, profile=None):
+        """
+        Like extract_markdown, but returns (markdown, document) where document
+        is the DoclingDocument's export_to_dict(), or None if unavailable
+        (conversion failed, or a Phase 1 server too old to send it).
+        """
+        setup = self._profiles[check_profile(profile or self.profile)]
+        if control is not None:
+            control.checkpoint()
+        if self.phase1_client is not None:
+            from phase1_server import Phase1Unavailable
+            print(f"   👁️  Visual Analysis: {Path(pdf_path).name} (on Phase 1 server, profile '{setup.name}')...")
+            try:
+                start_t = time.time()
+                md_content, document = self.phase1_client.convert_document(pdf_path, profile=setup.name)
+                if md_content:
+                    print(f"   ✅ Visual Analysis complete ({time.time() - start_t:.1f}s)")
+                return md_content, document
+            except Phase1Unavailable as e:
+                print(f"   ⚠️  {e} - converting locally")
+        
+        print(f"   👁️  Visual Analysis: {Path(pdf_path).name} (profile '{setup.name}', this takes time)...")
         try:
             start_t = time.time()
-            result = self.converter.convert(pdf_path)
-            
-            # Export to Markdown
-            # VLM descriptions are added as annotations automatically
-            # image_placeholder is just for the image reference (we use empty to keep clean)
-            md_content = result.document.export_to_markdown(
-                image_placeholder=""  # VLM descriptions appear separately as text
-            )
+            raster_before = self.raster_cache.stats() if self.raster_cache is not None else None
+            triage_before = setup.figure_triage.stats() if setup.figure_triage is not None else None
+            enrichment_before = setup.enrichment.stats()
+            with self.governor.track(self.governor.estimate(pdf_path)) as memory:
+                document = self.convert_document(pdf_path, control, setup.name)
+            md_content = render_document(document, "md")
             
             elapsed = time.time() - start_t
             print(f"   ✅ Visual Analysis complete ({elapsed:.1f}s)")
-            return md_content
+            memory = memory.summary()
+            if memory["peak_rss_mb"] is not None:
+                print(f"   🧠 Memory: peak RSS {memory['peak_rss_mb']:.0f} MB "
+                      f"(+{memory['peak_rss_mb'] - (memory['start_rss_mb'] or 0):.0f} MB, "
+                      f"estimated {memory['estimate_mb']:.0f} MB)")
+            if raster_before is not None:
+                raster = self.raster_cache.stats()
+                print(f"   🖼️  Page renders: {raster['hits'] - raster_before['hits']} cached, "
+                      f"{raster['misses'] - raster_before['misses']} rendered")
+            if triage_before is not None:
+                self._report_triage(setup.figure_triage, triage_before)
+            enrichment = setup.enrichment.since(enrichment_before)
+            print(f"   🧮 Enrichment: {enrichment['tables_fast']} table(s) FAST, "
+                  f"{enrichment['tables_accurate']} ACCURATE, {enrichment['formulas']} formula(s), "
+                  f"{enrichment['code_blocks']} code block(s)")
+            record = document.export_to_dict()
+            # What Phase 1 did, stored with the document for auditing (ignored by Docling on load)
+            record[PHASE1_METADATA_KEY] = {"profile": setup.name, "options_hash": setup.options_hash,
+                                           "enrichment": enrichment, "memory": memory}
+            return md_content, record
+        except ProcessingCancelled:
+            raise
         except Exception as e:
             print(f"   ❌ Docling Error: {e}")
-            return None
+            return None, None
+
+    def _report_triage(self, figure_triage, before):
+        """Log figure triage for the paper just converted (the difference from `before`)."""
+        after = figure_triage.stats()
+        described = after["described"] - before["described"]
+        skipped = {kind: n - before["skipped"].get(kind, 0) for kind, n in after["skipped"].items()}
+        skipped = {kind: n for kind, n in skipped.items() if n}
+        if not (described or skipped):
+            return
+        line = f"   🔎 Figures: {described} described"
+        if described:
+            line += f" (mean scale {(after['scale_sum'] - before['scale_sum']) / described:.1f}x)"
+        line += f", {sum(skipped.values())} skipped"
+        if skipped:
+            line += f" ({', '.join(f'{n} {kind}' for kind, n in sorted(skipped.items()))})"
+        per_figure = figure_triage.seconds_per_figure()
+        if skipped and per_figure:
+            line += f", ~{sum(skipped.values()) * per_figure:.0f}s of VLM time saved"
+        print(line)
+
+    def convert_document(self, pdf_path, control=None, profile=None):
+        """
+        Run Docling on a PDF with a profile's converter and return the
+        DoclingDocument. PDFs above the shard threshold are converted as
+        page-range shards in parallel and concatenated in page order. With a
+        ProcessingControl, the pipeline checks it before each page batch.
+        """
+        converter = self.converter_for(profile or self.profile)
+        num_pages = count_pdf_pages(pdf_path) if self.shard_threshold > 0 else None
+        if not num_pages or num_pages <= self.shard_threshold:
+            return run_converter(converter, pdf_path, control)
+        
+        shards = plan_page_shards(num_pages, self.shard_pages)
+        print(f"   🧩 {num_pages} pages → {len(shards)} shards of ≤{self.shard_pages} pages "
+              f"({self.shard_workers} in parallel)")
+        
+        def convert_shard(page_range):
+            shard_start = time.time()
+            document = run_converter(converter, pdf_path, control, page_range=page_range)
+            print(f"      ✅ Pages {page_range[0]}-{page_range[1]} ({time.time() - shard_start:.1f}s)")
+            return document
+        
+        # map() yields results in submission order, i.e. page order
+        with ThreadPoolExecutor(max_workers=self.shard_workers) as executor:
+            documents = list(executor.map(convert_shard, shards))
+        
+        return type(documents[0]).concatenate(documents)
 
     def clean_json_response(self, response_text):
         """Cleans <think> tags and markdown to extract raw JSON."""
@@ -212,69 +884,139 @@ Output only the JSON, nothing else."""
             clean = json_match.group(1)
         return clean.strip()
 
-    def convert_pdf_to_markdown(self, pdf_path, category_code):
+    def convert_pdf_to_markdown(self, pdf_path, category_code, control=None, profile=None):
         """
         Phase 1: Convert a single PDF to Markdown and save it.
         Uses the original PDF filename for the output markdown file.
-        Returns True on success, False on failure.
+        profile is a PHASE1_PROFILES name (default: the processor's).
+        Returns True on success, False on failure; raises ProcessingCancelled
+        (with the paper reset to pending) if `control` is cancelled.
         """
+        profile = check_profile(profile or self.profile)
         path_obj = Path(pdf_path)
         base_name = path_obj.stem  # Original PDF filename without extension
+        row = self.manifest.register_pdf(path_obj, category_code)
+        self.manifest.start_phase(category_code, path_obj.name, 1)
         
         # Extract markdown from PDF
-        markdown_text = self.extract_markdown(str(path_obj))
+        start_t = time.time()
+        try:
+            markdown_text, document = self.extract_document(str(path_obj), control, profile)
+        except ProcessingCancelled:
+            self.manifest.reset(category_code, path_obj.name, from_phase=1)
+            print(f"   ⏹️  Cancelled: {path_obj.name}")
+            raise
         
         if not markdown_text:
+            self.manifest.finish_phase(category_code, path_obj.name, 1, False,
+                                       seconds=time.time() - start_t, error="Docling conversion failed")
             return False
 
         # Save the Markdown file with original PDF name
-        md_output_dir = MARKDOWN_DIR / category_code
-        md_output_dir.mkdir(parents=True, exist_ok=True)
-        md_file = md_output_dir / f"{base_name}.md"
-        
-        with open(md_file, "w", encoding="utf-8") as f:
-            f.write(markdown_text)
+        md_file = MARKDOWN_DIR / category_code / f"{base_name}.md"
+        artifact_store.write_text(md_file, markdown_text)
+        if document is not None:
+            save_document(document, document_path(md_file))
         
-        print(f"   ✅ Saved: {md_file}")
+        # Stamp the Markdown with the inputs that produced it (a Phase 1
+        # server reports the profile and options it actually used)
+        phase1 = (document or {}).get(PHASE1_METADATA_KEY, {})
+        profile = phase1.get("profile", profile)
+        fields = self.figure_fields(document, profile)
+        if "enrichment" in phase1:
+            fields["enrichment"] = json.dumps(phase1["enrichment"], sort_keys=True)
+        if "memory" in phase1:
+            fields["peak_rss_mb"] = phase1["memory"]["peak_rss_mb"]
+            fields["memory_estimate_mb"] = phase1["memory"]["estimate_mb"]
+        self.manifest.finish_phase(category_code, path_obj.name, 1, True,
+                                   seconds=time.time() - start_t, output_path=md_file,
+                                   md_hash=text_hash(markdown_text), md_pdf_hash=row["pdf_hash"],
+                                   docling_version=phase1.get("options_hash", PROFILE_HASHES.get(profile)),
+                                   phase1_profile=profile, **fields)
+        print(f"   ✅ Saved: {artifact_store.disk_path(md_file)}")
         return True
 
-    def generate_json_from_markdown(self, md_path, category_code):
+    def figure_fields(self, document, profile=None):
+        """Manifest fields for the figure triage of a converted document (dict form)."""
+        if document is None:
+            return {}
+        counts = figure_counts(document)
+        setup = self._profiles.get(profile or self.profile)
+        figure_triage = setup.figure_triage if setup is not None else None
+        per_figure = figure_triage.seconds_per_figure() if figure_triage is not None else None
+        return {"figures_described": counts["described"], "figures_skipped": counts["skipped"],
+                "figure_seconds_saved": round(counts["skipped"] * per_figure, 1) if per_figure else None}
+
+    def generate_json_from_markdown(self, md_path, category_code, control=None, backend=None, compact=False):
         """
         Phase 2: Read a Markdown file and generate JSON using LLM.
-        Returns True on success, False on failure.
+        Returns True on success, False on failure. With a ProcessingControl the
+        request is streamed and aborted on pause (re-sent after resume) or
+        cancel (raises ProcessingCancelled). backend sends the request to
+        another backend spec (see pool_for); compact drops reference lists
+        and back matter from the prompt (compact_markdown).
         """
         md_path = Path(md_path)
-        paper_id = md_path.stem  # e.g., "category-001"
+        paper_id = md_path.stem  # Same as the PDF stem
+        
+        # Manifest row of the source PDF (None for Markdown without a PDF)
+        row = self.manifest.get_by_stem(category_code, paper_id)
+        
+        def record(success, error=None, output_file=None, **fields):
+            if row is not None:
+                self.manifest.finish_phase(category_code, row["filename"], 2, success,
+                                           seconds=time.time() - start_t, output_path=output_file,
+                                           error=error, **fields)
         
         # Read the markdown content
         try:
-            with open(md_path, "r", encoding="utf-8") as f:
-                markdown_text = f.read()
+            markdown_text = artifact_store.read_text(md_path)
         except Exception as e:
             print(f"   ❌ Failed to read markdown: {e}")
             return False
 
         # Inject into Prompt
-        user_message = f"PAPER ID: {paper_id}\nCATEGORY: {category_code}\n\nANALYZED DOCUMENT CONTENT (MARKDOWN):\n{markdown_text}"
+        prompt_text = compact_markdown(markdown_text) if compact else markdown_text
+        user_message = build_user_message(paper_id, category_code, prompt_text, self.prompt_layout)
+        affinity_key = prefix_group_key(prompt_text) if self.prompt_layout == "prefix-cache" else None
 
-        print(f"   🧠 Generating JSON with {self.model_name}...")
+        pool = self.pool_for(backend) if self.pool is not None or backend is not None else None
+        if pool is None:
+            print("   ❌ No LLM backend configured for Phase 2")
+            return False
+        
+        note = f", compacted prompt {len(prompt_text) * 100 // max(1, len(markdown_text))}%" if compact else ""
+        print(f"   🧠 Generating JSON with {pool.describe()}{note}...")
+        start_t = time.time()
+        if row is not None:
+            self.manifest.start_phase(category_code, row["filename"], 2)
         try:
-            # Build request kwargs
-            request_kwargs = {
-                "model": self.model_name,
-                "messages": [
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                "temperature": 0.3,
-                "max_tokens": 8192
-            }
-            
-            # Add backend-specific options (e.g., Ollama's num_ctx)
-            if self.extra_body:
-                request_kwargs["extra_body"] = self.extra_body
+            # The pool picks the endpoint and adds its model and
+            # backend-specific options (e.g., Ollama's num_ctx)
+            while True:
+                try:
+                    completion, endpoint = pool.chat_completion(
+                        messages=[
+                            {"role": "system", "content": self.system_prompt},
+                            {"role": "user", "content": user_message}
+                        ],
+                        temperature=0.3,
+                        max_tokens=8192,
+                        affinity_key=affinity_key,
+                        abort=(lambda: control.cancelled or control.paused) if control is not None else None
+                    )
+                    break
+                except RequestAborted:
+                    if not control.cancelled:
+                        print(f"   ⏸️  {paper_id}: request aborted for pause, re-sending on resume")
+                    control.checkpoint()  # Blocks while paused, raises if cancelled
             
-            completion = self.client.chat.completions.create(**request_kwargs)
+            usage = getattr(completion, "usage", None)
+            details = getattr(usage, "prompt_tokens_details", None)
+            cached = getattr(details, "cached_tokens", None)
+            cache_note = f", {cached}/{usage.prompt_tokens} prompt tokens cached" if cached is not None else ""
+            print(f"   📡 {paper_id}: answered by {endpoint.name} ({endpoint.model}) "
+                  f"in {time.time() - start_t:.1f}s{cache_note}")
             
             raw_output = completion.choices[0].message.content
             json_str = self.clean_json_response(raw_output)
@@ -283,6 +1025,19 @@ Output only the JSON, nothing else."""
             data = json.loads(json_str)
             data['paper_id'] = paper_id
             
+            # Stamp the JSON with the inputs that produced it
+            md_hash = text_hash(markdown_text)
+            data['_provenance'] = {
+                "pdf_hash": row["pdf_hash"] if row is not None else None,
+                "docling_options": row["docling_version"] if row is not None else None,
+                "markdown_hash": md_hash,
+                "prompt_version": PROMPT_VERSION,
+                "model": endpoint.model,
+                "generated_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            if compact:
+                data['_provenance']["compact_prompt"] = True
+            
             # Save JSON
             output_dir = PROJECT_ROOT / "data" / "output" / category_code
             output_dir.mkdir(parents=True, exist_ok=True)
@@ -291,10 +1046,18 @@ Output only the JSON, nothing else."""
             with open(output_file, "w", encoding="utf-8") as f:
                 json.dump(data, f, indent=2)
                 
+            record(True, output_file=output_file, model=endpoint.model, prompt_version=PROMPT_VERSION,
+                   md_hash=md_hash, json_md_hash=md_hash)
             print(f"   ✅ Saved: {output_file}")
             return True
 
+        except ProcessingCancelled:
+            if row is not None:
+                self.manifest.reset(category_code, row["filename"], from_phase=2)
+            print(f"   ⏹️  Cancelled: {paper_id}")
+            raise
         except Exception as e:
+            record(False, error=str(e))
             print(f"   ❌ Inference Failed: {e}")
             return False
 
@@ -0,0 +1,247 @@
+"""
+Long-lived Phase 1 (PDF → Markdown) server.
+
+Keeps the Docling converter and its models (EasyOCR, TableFormer, Qwen3-VL)
+resident in one process and accepts conversion jobs over a localhost HTTP
+API, so `main.py` runs and the Flask backend share one warm copy instead of
+each paying the cold start and holding their own weights.
+
+Usage:
+    python phase1_server.py                      # http://127.0.0.1:8765
+    python main.py --convert Req_2 --phase1-server http://127.0.0.1:8765
+    PAPER_PIPELINE_PHASE1_URL=http://127.0.0.1:8765 python backend/app.py
+
+API:
+    GET  /health   → {"status": "ok", "models_loaded": bool, "busy": bool, ...}
+    POST /convert  {"pdf_path": "/abs/path.pdf"} → {"markdown": "...", "elapsed": 12.3}
+                   {"pdf_path": ..., "document": true} also returns the DoclingDocument
+                   as "document" (its export_to_dict())
+                   {"pdf_path": ..., "profile": "fast"} converts with a PHASE1_PROFILES
+                   profile (default: the server's); each profile's models are loaded
+                   on its first job and kept
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+CONVERT_TIMEOUT = 6 * 3600  # seconds; big scanned PDFs with many figures take a while
+HEALTH_TIMEOUT = 2.0
+
+
+class Phase1Unavailable(Exception):
+    """The Phase 1 server could not be reached (callers fall back to local conversion)."""
+
+
+class Phase1Timeout(Exception):
+    """The server took the request but didn't answer in time (it may still be converting)."""
+
+
+class Phase1Client:
+    """Client for a running phase1_server."""
+
+    def __init__(self, base_url, timeout=CONVERT_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path, payload=None, timeout=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        req = urllib.request.Request(
+            f"{self.base_url}{path}",
+            data=data,
+            headers={"Content-Type": "application/json"},
+            method="POST" if data is not None else "GET",
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=timeout or self.timeout) as resp:
+                return json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            # The server answered: report its error instead of falling back
+            try:
+                return json.loads(e.read())
+            except ValueError:
+                return {"error": f"HTTP {e.code}"}
+        except (urllib.error.URLError, ConnectionError) as e:
+            # Connecting or sending failed (urllib wraps those in URLError),
+            # or the server went away mid-request
+            raise Phase1Unavailable(f"Phase 1 server unreachable at {self.base_url}: {e}") from e
+        except TimeoutError as e:
+            # Read timeout: the server has the job and may still be working on
+            # it, so converting locally as well would only run it twice
+            raise Phase1Timeout(f"No answer from the Phase 1 server at {self.base_url} "
+                                f"within {timeout or self.timeout:.0f}s") from e
+
+    def health(self):
+        """Server status dict, or None if it is not running."""
+        try:
+            return self._request("/health", timeout=HEALTH_TIMEOUT)
+        except (Phase1Unavailable, Phase1Timeout):
+            return None
+
+    def convert(self, pdf_path):
+        """
+        Convert a PDF on the server. Returns the Markdown, or None if the
+        server failed to convert it or didn't answer within the timeout.
+        Raises Phase1Unavailable if unreachable.
+        """
+        return self.convert_document(pdf_path, with_document=False)[0]
+
+    def convert_document(self, pdf_path, with_document=True, profile=None):
+        """Like convert, but returns (markdown, document dict or None)."""
+        payload = {"pdf_path": str(Path(pdf_path).resolve()), "document": with_document}
+        if profile is not None:
+            payload["profile"] = profile
+        try:
+            result = self._request("/convert", payload)
+        except Phase1Timeout as e:
+            result = {"error": str(e)}
+        if "error" in result:
+            print(f"   ❌ Phase 1 server error: {result['error']}")
+            return None, None
+        return result["markdown"], result.get("document")
+
+
+class Phase1Handler(BaseHTTPRequestHandler):
+    server_version = "PaperPipelinePhase1/1.0"
+
+    def log_message(self, format, *args):
+        pass  # Conversions are logged by the processor itself
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/health":
+            self._send_json({"error": "not found"}, 404)
+            return
+        state = self.server.state
+        self._send_json({
+            "status": "ok",
+            "pid": os.getpid(),
+            "models_loaded": self.server.processor.profile in self.server.processor.loaded_profiles(),
+            "profiles_loaded": self.server.processor.loaded_profiles(),
+            "busy": state["busy"],
+            "waiting": state["waiting"],
+            "jobs_done": state["jobs_done"],
+            "jobs_failed": state["jobs_failed"],
+            "uptime": round(time.time() - state["started_at"], 1),
+            "memory": self.server.processor.governor.status(),
+        })
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/convert":
+            self._send_json({"error": "not found"}, 404)
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json({"error": "Invalid JSON body"}, 400)
+            return
+
+        pdf_path = Path(payload.get("pdf_path", ""))
+        if not pdf_path.is_absolute() or not pdf_path.is_file():
+            self._send_json({"error": f"PDF not found: {pdf_path}"}, 404)
+            return
+        from pdf_processor import PHASE1_PROFILES
+        profile = payload.get("profile")
+        if profile is not None and profile not in PHASE1_PROFILES:
+            self._send_json({"error": f"Unknown profile '{profile}'. Choose from: {list(PHASE1_PROFILES)}"}, 400)
+            return
+
+        state = self.server.state
+        with self.server.state_lock:
+            state["waiting"] += 1
+        # One conversion at a time: the models share one GPU
+        with self.server.convert_lock:
+            with self.server.state_lock:
+                state["waiting"] -= 1
+                state["busy"] = True
+            start_t = time.time()
+            try:
+                processor = self.server.processor
+                # Memory budget (memory_governor.py): drop the models between jobs when due
+                reason = processor.governor.recycle_reason(processor.governor.estimate(pdf_path))
+                if reason is not None:
+                    processor.release_phase1(reason)
+                markdown, document = processor.extract_document(str(pdf_path), profile=profile)
+            finally:
+                with self.server.state_lock:
+                    state["busy"] = False
+
+        with self.server.state_lock:
+            if markdown:
+                state["jobs_done"] += 1
+            else:
+                state["jobs_failed"] += 1
+
+        if not markdown:
+            self._send_json({"error": f"Conversion failed: {pdf_path.name}"}, 500)
+            return
+        response = {"markdown": markdown, "elapsed": round(time.time() - start_t, 2)}
+        if payload.get("document") and document is not None:
+            response["document"] = document
+        self._send_json(response)
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, warmup=True, profile=None, vlm_url=None):
+    """
+    Create the Phase 1 server with a Phase-1-only processor (profile: the one
+    warmed up and used by default; vlm_url: vision server for picture
+    descriptions, default $PAPER_PIPELINE_VLM_URL).
+    """
+    from pdf_processor import VLM_API_URL, LocalPDFProcessor
+
+    server = ThreadingHTTPServer((host, port), Phase1Handler)
+    server.daemon_threads = True
+    server.processor = LocalPDFProcessor(backend=None, warmup=warmup, phase1_server=None, profile=profile,
+                                         vlm_url=vlm_url or VLM_API_URL)
+    server.convert_lock = threading.Lock()
+    server.state_lock = threading.Lock()
+    server.state = {"busy": False, "waiting": 0, "jobs_done": 0, "jobs_failed": 0,
+                    "started_at": time.time()}
+    return server
+
+
+def main():
+    from pdf_processor import PHASE1_PROFILES
+
+    parser = argparse.ArgumentParser(description="Warm Phase 1 (Docling) conversion server")
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                        help="Bind address (default: localhost only)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="Load models on the first job instead of at startup")
+    parser.add_argument("--profile", choices=list(PHASE1_PROFILES), default=None,
+                        help="Phase 1 profile for jobs that don't name one (default: $PAPER_PIPELINE_PROFILE "
+                             "or balanced)")
+    parser.add_argument("--vlm-url", metavar="URL", default=None,
+                        help="Describe figures on an OpenAI-compatible vision server (vLLM, Ollama) "
+                             "(default: $PAPER_PIPELINE_VLM_URL, else in-process)")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, warmup=not args.no_warmup, profile=args.profile,
+                         vlm_url=args.vlm_url)
+    print(f"🚀 Phase 1 server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Phase 1 server stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Disk cache of rendered PDF pages and page crops for Phase 1.
+
+Docling rasterises every page for the layout model, then renders crops of it
+at higher scales for OCR regions and for the figures sent to the VLM. This
+cache keeps each render, keyed by the PDF's content hash, the page number,
+the scale and (for crops) the crop box, so shards, the Phase 1
+server and reruns (reprocess, a new VLM prompt) skip rasterisation for pages
+they have seen before. Entries are PNG files under data/cache/raster, written
+on a background thread and evicted least-recently-used once the cache exceeds
+its size cap.
+
+Usage:
+    cache = RasterCache()
+    backend = cached_pdf_backend(cache)   # PdfFormatOption(..., backend=backend)
+    cache.stats()                         # {"hits": ..., "misses": ..., "render_seconds": ...}
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.resolve()
+RASTER_CACHE_DIR = Path(os.environ.get("PAPER_PIPELINE_RASTER_CACHE_DIR", PROJECT_ROOT / "data" / "cache" / "raster"))
+RASTER_CACHE_MB = int(os.environ.get("PAPER_PIPELINE_RASTER_CACHE_MB", 4096))  # 0 disables
+EVICT_TO = 0.9  # Fraction of the cap to shrink to when evicting
+MAX_PENDING_WRITES = 8  # Beyond this, renders are written inline instead of queued
+
+
+class RasterCache:
+    """Page and crop renders on disk, LRU by file mtime (touched on every hit)."""
+
+    def __init__(self, root=RASTER_CACHE_DIR, max_mb=RASTER_CACHE_MB):
+        self.root = Path(root)
+        self.max_bytes = max_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self._total = None  # Bytes on disk, scanned on the first write
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="raster-cache")
+        self._pending = 0
+        self.hits = 0
+        self.misses = 0
+        self.render_seconds = 0.0  # Spent rendering on misses
+        self.load_seconds = 0.0    # Spent reading hits
+
+    def _path(self, doc_hash, page_no, scale, box=None):
+        key = f"{doc_hash}-p{page_no}-s{scale:g}"
+        if box is not None:
+            key += "-c" + "_".join(f"{v:.1f}" for v in box)
+        return self.root / doc_hash[:2] / f"{key}.png"
+
+    def get(self, doc_hash, page_no, scale, box=None):
+        """The cached render of a page (or of `box` on it: left, top, right, bottom), or None."""
+        from PIL import Image
+        path = self._path(doc_hash, page_no, scale, box)
+        start = time.perf_counter()
+        try:
+            with Image.open(path) as image:
+                image.load()
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)  # Recently used
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+            self.load_seconds += time.perf_counter() - start
+        return image
+
+    def put(self, doc_hash, page_no, scale, image, box=None):
+        path = self._path(doc_hash, page_no, scale, box)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        image.save(tmp, format="PNG", compress_level=1)  # Fast to write; still ~10x smaller than raw
+        size = tmp.stat().st_size
+        os.replace(tmp, path)
+        with self._lock:
+            if self._total is None:
+                self._total = self.size()
+            else:
+                self._total += size
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _write(self, doc_hash, page_no, scale, image, box):
+        try:
+            self.put(doc_hash, page_no, scale, image, box)
+        except OSError as e:
+            print(f"   ⚠️  Raster cache write failed: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def page_image(self, doc_hash, page_no, scale, render, box=None):
+        """
+        Cached render of a page (or crop), calling render() on a miss. The
+        render is stored on a background thread so a miss costs no more than
+        rendering without the cache.
+        """
+        image = self.get(doc_hash, page_no, scale, box)
+        if image is not None:
+            return image
+        start = time.perf_counter()
+        image = render()
+        with self._lock:
+            self.misses += 1
+            self.render_seconds += time.perf_counter() - start
+            self._pending += 1
+            inline = self._pending > MAX_PENDING_WRITES
+        if inline:
+            self._write(doc_hash, page_no, scale, image, box)
+        else:
+            self._writer.submit(self._write, doc_hash, page_no, scale, image, box)
+        return image
+
+    def flush(self):
+        """Wait for queued writes (the writer thread also drains them at exit)."""
+        self._writer.submit(lambda: None).result()
+
+    def _entries(self):
+        if not self.root.is_dir():
+            return []
+        entries = []
+        for shard in os.scandir(self.root):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if entry.name.endswith(".png"):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue  # Evicted by another process
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def size(self):
+        """Bytes on disk."""
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """Drop least recently used renders until under EVICT_TO of the cap (lock held)."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICT_TO
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._total = total
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "render_seconds": round(self.render_seconds, 2),
+                    "load_seconds": round(self.load_seconds, 2)}
+
+
+def cached_pdf_backend(cache):
+    """
+    A Docling PDF backend class whose page renders, whole pages and crops
+    (OCR regions, figures for the VLM), go through `cache`.
+    """
+    from docling.backend.docling_parse_v4_backend import DoclingParseV4DocumentBackend
+
+    class CachedPdfBackend(DoclingParseV4DocumentBackend):
+        def load_page(self, page_no):
+            page = super().load_page(page_no)
+            render = page.get_page_image
+            doc_hash = self.document_hash
+
+            def get_page_image(scale=1, cropbox=None):
+                box = None
+                if cropbox is not None:
+                    b = cropbox.to_top_left_origin(page.get_size().height)
+                    box = (b.l, b.t, b.r, b.b)
+                return cache.page_image(doc_hash, page_no, scale,
+                                        lambda: render(scale=scale, cropbox=cropbox), box)
+
+            page.get_page_image = get_page_image
+            return page
+
+    return CachedPdfBackend
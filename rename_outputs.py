@@ -2,11 +2,17 @@
 """
 Rename existing numbered output files (Req_2-001.md, Req_2-001.json, etc.)
 to match the original PDF filenames for proper status detection.
+
+Markdown and stored Docling documents go through artifact_store, so this
+works whether data/markdown holds plain files or zstd blobs.
 """
 
 from pathlib import Path
 import shutil
 
+import artifact_store
+from pdf_processor import DOCUMENT_SUFFIX
+
 # Directories
 DATA_DIR = Path("data")
 INPUT_DIR = DATA_DIR / "input"
@@ -25,6 +31,12 @@ def get_pdf_files_ordered(category: str) -> list[Path]:
     return sorted(pdf_files, key=lambda f: f.stat().st_mtime)
 
 
+def move_artifact(source: Path, target: Path):
+    """Rename a Markdown-tree artifact, whatever store holds it."""
+    artifact_store.write_bytes(target, artifact_store.read_bytes(source))
+    artifact_store.delete(source)
+
+
 def rename_outputs_for_category(category: str, dry_run: bool = True) -> dict:
     """Rename numbered outputs to match PDF filenames."""
     md_dir = MARKDOWN_DIR / category
@@ -34,6 +46,7 @@ def rename_outputs_for_category(category: str, dry_run: bool = True) -> dict:
         "category": category,
         "renamed_md": [],
         "renamed_json": [],
+        "renamed_documents": [],
         "skipped": [],
         "errors": []
     }
@@ -46,10 +59,10 @@ def rename_outputs_for_category(category: str, dry_run: bool = True) -> dict:
         return results
     
     # Get numbered markdown files
-    numbered_md = sorted([
-        f for f in md_dir.glob("*.md") 
-        if f.stem.startswith(f"{category}-") and f.stem.split("-")[-1].isdigit()
-    ]) if md_dir.exists() else []
+    numbered_md = sorted(
+        stem for stem in artifact_store.stems(md_dir, ".md")
+        if stem.startswith(f"{category}-") and stem.split("-")[-1].isdigit()
+    )
     
     # Get numbered JSON files
     numbered_json = sorted([
@@ -72,23 +85,33 @@ def rename_outputs_for_category(category: str, dry_run: bool = True) -> dict:
         correct_md = md_dir / f"{base_name}.md"
         correct_json = json_dir / f"{base_name}.json"
         
-        if correct_md.exists() and correct_json.exists():
+        if artifact_store.exists(correct_md) and correct_json.exists():
             results["skipped"].append(f"{base_name} (already has outputs)")
             continue
         
         # Look for numbered version
         numbered_md_file = md_dir / f"{numbered_name}.md"
         numbered_json_file = json_dir / f"{numbered_name}.json"
+        numbered_document = md_dir / f"{numbered_name}{DOCUMENT_SUFFIX}"
+        correct_document = md_dir / f"{base_name}{DOCUMENT_SUFFIX}"
         
-        # Rename MD
-        if numbered_md_file.exists() and not correct_md.exists():
+        # Rename MD, and the Docling document stored next to it
+        if artifact_store.exists(numbered_md_file) and not artifact_store.exists(correct_md):
             if dry_run:
                 print(f"   [DRY] Would rename: {numbered_md_file.name} → {base_name}.md")
             else:
-                shutil.move(str(numbered_md_file), str(correct_md))
+                move_artifact(numbered_md_file, correct_md)
                 print(f"   ✅ Renamed: {numbered_md_file.name} → {base_name}.md")
             results["renamed_md"].append((numbered_md_file.name, f"{base_name}.md"))
         
+        if artifact_store.exists(numbered_document) and not artifact_store.exists(correct_document):
+            if dry_run:
+                print(f"   [DRY] Would rename: {numbered_document.name} → {correct_document.name}")
+            else:
+                move_artifact(numbered_document, correct_document)
+                print(f"   ✅ Renamed: {numbered_document.name} → {correct_document.name}")
+            results["renamed_documents"].append((numbered_document.name, correct_document.name))
+        
         # Rename JSON
         if numbered_json_file.exists() and not correct_json.exists():
             if dry_run:
@@ -132,14 +155,22 @@ def main():
     
     total_md = sum(len(r["renamed_md"]) for r in all_results)
     total_json = sum(len(r["renamed_json"]) for r in all_results)
+    total_documents = sum(len(r["renamed_documents"]) for r in all_results)
     total_skipped = sum(len(r["skipped"]) for r in all_results)
     
     print(f"MD files to rename: {total_md}")
     print(f"JSON files to rename: {total_json}")
+    print(f"Docling documents to rename: {total_documents}")
     print(f"Skipped (already correct): {total_skipped}")
     
-    if dry_run and (total_md > 0 or total_json > 0):
+    if dry_run and (total_md > 0 or total_json > 0 or total_documents > 0):
         print("\n💡 Run with --run flag to apply these changes")
+    
+    if not dry_run:
+        # Let the manifest pick up the renamed outputs
+        from manifest import Manifest
+        for cat in categories:
+            Manifest().sync(INPUT_DIR, MARKDOWN_DIR, OUTPUT_DIR, cat)
 
 
 if __name__ == "__main__":
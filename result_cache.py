@@ -0,0 +1,89 @@
+"""
+In-process LRU cache of parsed JSON results.
+
+Entries are keyed by path and checked against the file's mtime and size on
+every lookup (one stat call), so a result rewritten by the pipeline is
+re-read while unchanged ones are served from memory. Each entry carries a
+content hash for strong HTTP ETags.
+
+Usage:
+    cache = ResultCache()
+    entry = cache.get(OUTPUT_DIR / "Req_2" / "paper.json")
+    entry.data     # parsed JSON
+    entry.text     # compact JSON text of data (for building responses)
+    entry.digest   # sha1 of the file's bytes
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, NamedTuple
+
+RESULT_CACHE_SIZE = int(os.environ.get("PAPER_PIPELINE_RESULT_CACHE", 256))  # entries; 0 disables
+
+
+class CachedResult(NamedTuple):
+    data: Any
+    text: str
+    digest: str
+
+
+class ResultCache:
+    """Thread-safe LRU of parsed JSON files, validated by (mtime, size)."""
+
+    def __init__(self, max_entries=RESULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # path -> ((mtime_ns, size), CachedResult)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def get(self, path):
+        """
+        Parsed contents of a JSON file. Raises OSError if it can't be read and
+        json.JSONDecodeError if it is not valid JSON (neither is cached).
+        """
+        key = str(path)
+        signature = self._signature(key)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        with open(key, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw)
+        entry = CachedResult(
+            data=data,
+            text=json.dumps(data, ensure_ascii=False, separators=(",", ":")),
+            digest=hashlib.sha1(raw).hexdigest(),
+        )
+
+        if self.max_entries > 0:
+            with self._lock:
+                # Signature from before the read: a write during the read makes
+                # the next lookup miss instead of serving a torn entry
+                self._entries[key] = (signature, entry)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, path):
+        with self._lock:
+            self._entries.pop(str(path), None)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,104 @@
+"""
+Size-aware scheduling and ETAs.
+
+Phase 2 latency grows with the prompt, so work is ordered by an up-front
+token estimate (file size / CHARS_PER_TOKEN, no tokenizer needed) and the
+ETA for what is left is derived from measured seconds per token (Phase 2)
+and seconds per PDF byte (Phase 1).
+
+Usage:
+    work = order_by_size(work, tokens=lambda item: item.tokens, order="shortest")
+    eta = EtaModel()
+    eta.record(2, tokens=12_000, seconds=41.0)
+    eta.estimate(phase1_bytes=3_000_000, phase2_tokens=80_000, concurrency=4)
+"""
+
+import threading
+
+import artifact_store
+
+CHARS_PER_TOKEN = 4          # rough average for English Markdown with some math
+SYSTEM_PROMPT_TOKENS = 1000  # SYSTEM_PROMPT plus chat template overhead
+
+# Phase 2 orderings:
+#   shortest - shortest prompt first: lowest average wait per paper
+#   longest  - longest prompt first: shortest total time with --parallel,
+#              big requests don't straggle at the end of the batch
+#   name     - file name order (previous behaviour)
+PHASE2_ORDERS = ("shortest", "longest", "name")
+
+# Used until the first measurement of a run/server comes in
+DEFAULT_PHASE1_SECONDS_PER_MB = 300.0    # Docling + VLM on a typical paper
+DEFAULT_PHASE2_SECONDS_PER_KTOKEN = 6.0  # prefill + ~2k output tokens, per request
+DEFAULT_MARKDOWN_TOKENS = 15_000         # Phase 2 size of a paper with no Markdown yet
+RATE_EWMA_ALPHA = 0.2
+
+
+def estimate_tokens(md_path):
+    """Estimated Phase 2 prompt tokens for a Markdown file (from its size)."""
+    try:
+        size = artifact_store.size(md_path)
+    except OSError:
+        return DEFAULT_MARKDOWN_TOKENS
+    return size // CHARS_PER_TOKEN + SYSTEM_PROMPT_TOKENS
+
+
+def order_by_size(items, tokens, order="shortest"):
+    """Sort work items by estimated tokens (stable, so equal sizes keep their order)."""
+    if order == "name":
+        return list(items)
+    if order not in PHASE2_ORDERS:
+        raise ValueError(f"Unknown order '{order}'. Choose from: {list(PHASE2_ORDERS)}")
+    return sorted(items, key=tokens, reverse=(order == "longest"))
+
+
+def format_eta(seconds):
+    """Compact ETA string (e.g., '2h 05m', '14m 30s', '45s')."""
+    if seconds is None:
+        return "unknown"
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class EtaModel:
+    """Running per-phase cost rates (EWMA) and ETA estimates; thread-safe."""
+
+    def __init__(self, phase1_seconds_per_mb=DEFAULT_PHASE1_SECONDS_PER_MB,
+                 phase2_seconds_per_ktoken=DEFAULT_PHASE2_SECONDS_PER_KTOKEN):
+        self._lock = threading.Lock()
+        self.phase1_seconds_per_byte = phase1_seconds_per_mb / 1_000_000
+        self.phase2_seconds_per_token = phase2_seconds_per_ktoken / 1000
+        self.samples = {1: 0, 2: 0}
+
+    def record(self, phase, seconds, pdf_bytes=0, tokens=0):
+        """Feed one finished request: Phase 1 with the PDF size, Phase 2 with the prompt tokens."""
+        units = pdf_bytes if phase == 1 else tokens
+        if units <= 0 or seconds <= 0:
+            return
+        rate = seconds / units
+        attr = "phase1_seconds_per_byte" if phase == 1 else "phase2_seconds_per_token"
+        with self._lock:
+            if self.samples[phase] == 0:
+                setattr(self, attr, rate)  # First real measurement replaces the default
+            else:
+                setattr(self, attr, RATE_EWMA_ALPHA * rate + (1 - RATE_EWMA_ALPHA) * getattr(self, attr))
+            self.samples[phase] += 1
+
+    def estimate(self, phase1_bytes=0, phase2_tokens=0, concurrency=1):
+        """Seconds to get through the given amount of work (Phase 2 spread over `concurrency` requests)."""
+        with self._lock:
+            phase1 = phase1_bytes * self.phase1_seconds_per_byte
+            phase2 = phase2_tokens * self.phase2_seconds_per_token / max(1, concurrency)
+        return phase1 + phase2
+
+    def stats(self):
+        with self._lock:
+            return {
+                "phase1_seconds_per_mb": round(self.phase1_seconds_per_byte * 1_000_000, 1),
+                "phase2_seconds_per_ktoken": round(self.phase2_seconds_per_token * 1000, 2),
+                "samples": dict(self.samples),
+            }
@@ -0,0 +1,139 @@
+"""
+Backlog SLA mode: cheaper settings while the queue is too long for a target.
+
+When a big batch lands, the queue ETA at full quality can reach days. With a
+target set (PAPER_PIPELINE_SLA_SECONDS), the worker compares the full-quality
+ETA of the backlog with it before each file. Above the target it switches to
+"degraded" mode: bulk files without a profile of their own get a cheaper
+Phase 1 profile (default "fast": no OCR, no VLM), a compacted Phase 2 prompt
+(reference lists and back matter dropped) and optionally another Phase 2
+backend (a smaller model). It goes back to "normal" once the ETA is below
+SLA_RESUME_FRACTION of the target, so it doesn't flap at the threshold.
+
+Papers made in degraded mode are flagged in the manifest (degraded column,
+JSON of the shortcuts taken). While the worker has nothing else to do, it
+queues them again at full quality and clears the flag.
+
+Usage:
+    sla = SlaPolicy()                          # Settings from the environment
+    sla.update(backlog_eta_seconds(state, queued))
+    settings = sla.settings_for(task)          # None: full quality
+"""
+
+import os
+import time
+
+from pdf_processor import PHASE1_PROFILES
+from scheduling import DEFAULT_MARKDOWN_TOKENS, EtaModel
+
+SLA_TARGET_SECONDS = float(os.environ.get("PAPER_PIPELINE_SLA_SECONDS", 0))  # 0 disables
+SLA_PROFILE = os.environ.get("PAPER_PIPELINE_SLA_PROFILE", "fast")
+SLA_BACKEND = os.environ.get("PAPER_PIPELINE_SLA_BACKEND") or None  # None keeps the worker's backend
+SLA_COMPACT_PROMPT = os.environ.get("PAPER_PIPELINE_SLA_COMPACT", "1") == "1"
+SLA_RESUME_FRACTION = 0.5  # Back to normal below this fraction of the target
+SLA_UPGRADE_BATCH = int(os.environ.get("PAPER_PIPELINE_SLA_UPGRADE_BATCH", 20))  # Papers queued per idle pass
+
+MODES = ("off", "normal", "degraded")
+
+
+def task_eta_seconds(task, eta_model):
+    """Estimated seconds to process one queued task (both phases as needed)."""
+    phase2_tokens = task.get("phase2_tokens")
+    if phase2_tokens is None:
+        phase2_tokens = DEFAULT_MARKDOWN_TOKENS  # Markdown not written yet
+    return eta_model.estimate(phase1_bytes=task.get("phase1_bytes", 0), phase2_tokens=phase2_tokens)
+
+
+def eta_model_from(rates):
+    """EtaModel with rates published by the worker (its defaults for missing ones)."""
+    return EtaModel(**{k: v for k, v in (rates or {}).items() if k != "samples"})
+
+
+def backlog_eta_seconds(state, queued, degraded=None):
+    """
+    ETA for everything queued plus what is left of the file in flight, from
+    the rates in job store `state`. With a SlaPolicy as `degraded`, tasks it
+    would degrade use the rates measured in degraded mode (eta_degraded).
+    None when there is no work.
+    """
+    current = state.get("current")
+    started_at = state.get("current_started_at")
+    if current is None and not queued:
+        return None
+    full = eta_model_from(state.get("eta"))
+    cheap = eta_model_from(state.get("eta_degraded")) if state.get("eta_degraded") else full
+
+    def model(task):
+        return cheap if degraded is not None and degraded.settings_for(task) is not None else full
+
+    remaining = sum(task_eta_seconds(task, model(task)) for task in queued)
+    if current is not None and started_at is not None:
+        in_flight = cheap if current.get("sla") else full
+        remaining += max(0.0, task_eta_seconds(current, in_flight) - (time.time() - started_at))
+    return int(remaining)
+
+
+class SlaPolicy:
+    """SLA settings and the current mode; update() moves between normal and degraded."""
+
+    def __init__(self, target_seconds=SLA_TARGET_SECONDS, profile=SLA_PROFILE, backend=SLA_BACKEND,
+                 compact=SLA_COMPACT_PROMPT, resume_fraction=SLA_RESUME_FRACTION, mode=None):
+        if profile is not None and profile not in PHASE1_PROFILES:
+            raise ValueError(f"Unknown SLA profile '{profile}'. Choose from: {list(PHASE1_PROFILES)}")
+        self.target_seconds = target_seconds
+        self.profile = profile
+        self.backend = backend
+        self.compact = compact
+        self.resume_fraction = resume_fraction
+        self.mode = mode if mode in MODES else ("normal" if target_seconds > 0 else "off")
+        self.since = time.time()
+
+    @property
+    def enabled(self):
+        return self.target_seconds > 0
+
+    def update(self, backlog_seconds):
+        """Switch mode for a full-quality backlog ETA (seconds, None for no work); returns the mode."""
+        if not self.enabled:
+            return self.mode
+        backlog_seconds = backlog_seconds or 0
+        if self.mode != "degraded" and backlog_seconds > self.target_seconds:
+            self._switch("degraded", f"backlog ETA {backlog_seconds / 3600:.1f}h > target "
+                                     f"{self.target_seconds / 3600:.1f}h")
+        elif self.mode == "degraded" and backlog_seconds < self.resume_fraction * self.target_seconds:
+            self._switch("normal", f"backlog ETA {backlog_seconds / 3600:.1f}h")
+        return self.mode
+
+    def _switch(self, mode, reason):
+        print(f"   {'🐢' if mode == 'degraded' else '🐇'} SLA mode: {self.mode} → {mode} ({reason})")
+        self.mode = mode
+        self.since = time.time()
+
+    def degraded_settings(self):
+        """The shortcuts degraded mode takes, as stored in the manifest."""
+        settings = {}
+        if self.profile is not None:
+            settings["profile"] = self.profile
+        if self.backend is not None:
+            settings["backend"] = self.backend
+        if self.compact:
+            settings["compact_prompt"] = True
+        return settings
+
+    def settings_for(self, task):
+        """
+        Degraded settings for a task, or None for full quality. Only bulk
+        tasks without a job profile are degraded: single-file requests and
+        jobs that ask for a profile keep what they asked for.
+        """
+        if self.mode != "degraded" or task.get("lane") != "bulk" or task.get("profile"):
+            return None
+        return self.degraded_settings() or None
+
+    def status(self):
+        return {
+            "mode": self.mode,
+            "since": self.since,
+            "target_seconds": self.target_seconds or None,
+            "degraded_settings": self.degraded_settings() if self.enabled else None,
+        }
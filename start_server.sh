@@ -6,6 +6,14 @@ LOG_DIR="$SCRIPT_DIR/logs"
 TIMESTAMP=$(date +"%Y-%m-%d_%H-%M-%S")
 LOG_FILE="$LOG_DIR/server_${TIMESTAMP}.log"
 PID_FILE="$LOG_DIR/server.pid"
+PHASE1_PID_FILE="$LOG_DIR/phase1.pid"
+PHASE1_LOG_FILE="$LOG_DIR/phase1_${TIMESTAMP}.log"
+PHASE1_PORT="${PHASE1_PORT:-8765}"
+WORKER_PID_FILE="$LOG_DIR/worker.pid"
+WORKER_LOG_FILE="$LOG_DIR/worker_${TIMESTAMP}.log"
+PORT="${PORT:-5000}"
+WEB_WORKERS="${WEB_WORKERS:-4}"    # gunicorn processes serving HTTP
+WEB_THREADS="${WEB_THREADS:-8}"    # threads per gunicorn process
 
 # Create logs directory if it doesn't exist
 mkdir -p "$LOG_DIR"
@@ -22,12 +30,38 @@ case "${1:-start}" in
         fi
         
         echo "Starting Paper Pipeline server..."
+        # Share the warm Phase 1 server's models if it is running
+        if [ -f "$PHASE1_PID_FILE" ] && kill -0 "$(cat "$PHASE1_PID_FILE")" 2>/dev/null; then
+            export PAPER_PIPELINE_PHASE1_URL="http://127.0.0.1:$PHASE1_PORT"
+            echo "Using Phase 1 server: $PAPER_PIPELINE_PHASE1_URL"
+        fi
+        
+        # Processing runs in its own process; the web tier only queues work
+        # and reads status through the shared job store (data/jobs.db)
+        if [ -f "$WORKER_PID_FILE" ] && kill -0 "$(cat "$WORKER_PID_FILE")" 2>/dev/null; then
+            echo "Worker already running (PID: $(cat "$WORKER_PID_FILE"))"
+        else
+            cd "$SCRIPT_DIR"
+            nohup python worker.py > "$WORKER_LOG_FILE" 2>&1 &
+            echo $! > "$WORKER_PID_FILE"
+            echo "Worker started (PID: $(cat "$WORKER_PID_FILE"))"
+        fi
+        
         cd "$SCRIPT_DIR/backend"
-        nohup python app.py > "$LOG_FILE" 2>&1 &
+        export PAPER_PIPELINE_EXTERNAL_WORKER=1
+        if command -v gunicorn > /dev/null; then
+            nohup gunicorn app:app --bind "0.0.0.0:$PORT" --workers "$WEB_WORKERS" \
+                --worker-class gthread --threads "$WEB_THREADS" --timeout 300 \
+                > "$LOG_FILE" 2>&1 &
+        else
+            echo "gunicorn not found (pip install gunicorn) - using the Flask development server"
+            nohup python app.py > "$LOG_FILE" 2>&1 &
+        fi
         echo $! > "$PID_FILE"
         echo "Server started (PID: $(cat "$PID_FILE"))"
         echo "Logs: $LOG_FILE"
-        echo "Access: http://localhost:5000"
+        echo "      $WORKER_LOG_FILE"
+        echo "Access: http://localhost:$PORT"
         ;;
     
     stop)
@@ -45,6 +79,13 @@ case "${1:-start}" in
         else
             echo "No PID file found. Server not running."
         fi
+        if [ -f "$WORKER_PID_FILE" ] && kill -0 "$(cat "$WORKER_PID_FILE")" 2>/dev/null; then
+            # A file in progress is re-queued when the worker starts again
+            echo "Stopping worker (PID: $(cat "$WORKER_PID_FILE"))..."
+            kill "$(cat "$WORKER_PID_FILE")"
+            echo "Worker stopped."
+        fi
+        rm -f "$WORKER_PID_FILE"
         ;;
     
     restart)
@@ -59,14 +100,46 @@ case "${1:-start}" in
         else
             echo "Server not running."
         fi
+        if [ -f "$WORKER_PID_FILE" ] && kill -0 "$(cat "$WORKER_PID_FILE")" 2>/dev/null; then
+            echo "Worker running (PID: $(cat "$WORKER_PID_FILE"))"
+        else
+            echo "Worker not running."
+        fi
         ;;
     
     logs)
-        tail -f "$LOG_FILE"
+        # Latest server and worker logs
+        tail -f "$(ls -t "$LOG_DIR"/server_*.log | head -1)" "$(ls -t "$LOG_DIR"/worker_*.log | head -1)"
+        ;;
+    
+    phase1-start)
+        if [ -f "$PHASE1_PID_FILE" ] && kill -0 "$(cat "$PHASE1_PID_FILE")" 2>/dev/null; then
+            echo "Phase 1 server already running (PID: $(cat "$PHASE1_PID_FILE"))"
+            exit 1
+        fi
+        
+        echo "Starting Phase 1 server (models stay loaded)..."
+        cd "$SCRIPT_DIR"
+        nohup python phase1_server.py --port "$PHASE1_PORT" > "$PHASE1_LOG_FILE" 2>&1 &
+        echo $! > "$PHASE1_PID_FILE"
+        echo "Phase 1 server started (PID: $(cat "$PHASE1_PID_FILE"))"
+        echo "Logs: $PHASE1_LOG_FILE"
+        echo "CLI:  python main.py --convert --phase1-server http://127.0.0.1:$PHASE1_PORT"
+        ;;
+    
+    phase1-stop)
+        if [ -f "$PHASE1_PID_FILE" ] && kill -0 "$(cat "$PHASE1_PID_FILE")" 2>/dev/null; then
+            echo "Stopping Phase 1 server (PID: $(cat "$PHASE1_PID_FILE"))..."
+            kill "$(cat "$PHASE1_PID_FILE")"
+            echo "Phase 1 server stopped."
+        else
+            echo "Phase 1 server not running."
+        fi
+        rm -f "$PHASE1_PID_FILE"
         ;;
     
     *)
-        echo "Usage: $0 {start|stop|restart|status|logs}"
+        echo "Usage: $0 {start|stop|restart|status|logs|phase1-start|phase1-stop}"
         exit 1
         ;;
 esac
@@ -9,6 +9,8 @@ import time
 from pathlib import Path
 from openai import OpenAI
 
+import artifact_store
+
 # --- CONFIG ---
 OLLAMA_BASE_URL = "http://localhost:11434/v1"
 MODEL_NAME = "nemotron-large-ctx"  # Custom model with 131K context (created via Modelfile)
@@ -70,15 +72,14 @@ def generate_json_from_markdown(md_path: str):
     """Generate JSON from a markdown file using Ollama."""
     md_path = Path(md_path)
     
-    if not md_path.exists():
+    if not artifact_store.exists(md_path):
         print(f"❌ Markdown file not found: {md_path}")
         return None
     
     print(f"\n📄 Processing: {md_path.name}")
     
-    # Read markdown
-    with open(md_path, "r", encoding="utf-8") as f:
-        markdown_text = f.read()
+    # Read markdown (plain or compressed, see artifact_store.py)
+    markdown_text = artifact_store.read_text(md_path)
     
     print(f"   📝 Markdown size: {len(markdown_text)} chars")
     
@@ -160,7 +161,9 @@ def main():
         return
     
     # Find a markdown file to test
-    test_files = list(MARKDOWN_DIR.glob("**/*.md"))
+    test_files = [MARKDOWN_DIR / category / f"{stem}.md"
+                  for category in artifact_store.open_store(MARKDOWN_DIR).categories()
+                  for stem in sorted(artifact_store.stems(MARKDOWN_DIR / category, ".md"))]
     
     if not test_files:
         print("❌ No markdown files found in data/markdown/")
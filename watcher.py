@@ -0,0 +1,180 @@
+"""
+Watch data/input for new or changed PDFs and hand them to the pipeline.
+
+Uses inotify (through watchdog) when it is installed and falls back to
+polling the category folders otherwise. Each PDF is reported once it has
+stopped changing for DEBOUNCE_SECONDS, so half-copied uploads are not
+picked up.
+
+Usage:
+    watcher = InputWatcher(INPUT_DIR, on_ready=lambda pdf_path, category: ...)
+    watcher.start()
+    ...
+    watcher.stop()
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+
+DEBOUNCE_SECONDS = float(os.environ.get("PAPER_PIPELINE_WATCH_DEBOUNCE", 3.0))
+POLL_INTERVAL = float(os.environ.get("PAPER_PIPELINE_WATCH_POLL", 5.0))
+
+
+def _is_pdf(path):
+    return path.suffix.lower() == ".pdf" and not path.name.startswith(".")
+
+
+def _signature(path):
+    """(size, mtime) of a file, or None if it is gone."""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime)
+
+
+class InputWatcher:
+    """Reports PDFs created or changed under input_dir/<category>/ to on_ready(pdf_path, category)."""
+
+    def __init__(self, input_dir, on_ready, debounce=DEBOUNCE_SECONDS, poll_interval=POLL_INTERVAL,
+                 use_inotify=True):
+        self.input_dir = Path(input_dir).resolve()
+        self.on_ready = on_ready
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.mode = None  # "inotify" or "polling" once started
+
+        self._pending = {}  # path -> (deadline, signature)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._observer = None
+
+    # --- Change intake ---
+
+    def touch(self, path):
+        """Note that a file changed; it is reported after it stays unchanged for the debounce time."""
+        path = Path(path)
+        if not _is_pdf(path) or path.parent.parent != self.input_dir:
+            return
+        with self._lock:
+            self._pending[path] = (time.monotonic() + self.debounce, _signature(path))
+        self._wake.set()
+
+    def _debounce_loop(self):
+        while not self._stop.is_set():
+            with self._lock:
+                next_deadline = min((d for d, _ in self._pending.values()), default=None)
+            timeout = None if next_deadline is None else max(0.0, next_deadline - time.monotonic())
+            self._wake.wait(timeout)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+
+            ready = []
+            now = time.monotonic()
+            with self._lock:
+                for path, (deadline, signature) in list(self._pending.items()):
+                    if deadline > now:
+                        continue
+                    current = _signature(path)
+                    if current is None:
+                        del self._pending[path]  # Deleted or renamed before it settled
+                    elif current != signature:
+                        self._pending[path] = (now + self.debounce, current)  # Still being written
+                    else:
+                        del self._pending[path]
+                        ready.append(path)
+
+            for path in ready:
+                try:
+                    self.on_ready(path, path.parent.name)
+                except Exception as e:
+                    print(f"   ❌ Watch: failed to enqueue {path.name}: {e}")
+
+    # --- Backends ---
+
+    def _start_inotify(self):
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return False
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_created(self, event):
+                if not event.is_directory:
+                    watcher.touch(event.src_path)
+
+            def on_modified(self, event):
+                if not event.is_directory:
+                    watcher.touch(event.src_path)
+
+            def on_closed(self, event):
+                if not event.is_directory:
+                    watcher.touch(event.src_path)
+
+            def on_moved(self, event):
+                if not event.is_directory:
+                    watcher.touch(event.dest_path)
+
+        self._observer = Observer()
+        self._observer.schedule(Handler(), str(self.input_dir), recursive=True)
+        self._observer.daemon = True
+        self._observer.start()
+        return True
+
+    def _snapshot(self):
+        snapshot = {}
+        for category in os.scandir(self.input_dir):
+            if not category.is_dir():
+                continue
+            for entry in os.scandir(category.path):
+                if entry.is_file() and entry.name.lower().endswith(".pdf"):
+                    stat = entry.stat()
+                    snapshot[Path(entry.path)] = (stat.st_size, stat.st_mtime)
+        return snapshot
+
+    def _poll_loop(self):
+        known = self._snapshot()
+        while not self._stop.wait(self.poll_interval):
+            try:
+                current = self._snapshot()
+            except OSError:
+                continue
+            for path, signature in current.items():
+                if known.get(path) != signature:
+                    self.touch(path)
+            known = current
+
+    # --- Lifecycle ---
+
+    def start(self):
+        self.input_dir.mkdir(parents=True, exist_ok=True)
+        if self.use_inotify and self._start_inotify():
+            self.mode = "inotify"
+        else:
+            self.mode = "polling"
+            self._threads.append(threading.Thread(target=self._poll_loop, name="watch-poll", daemon=True))
+        self._threads.append(threading.Thread(target=self._debounce_loop, name="watch-debounce", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+        detail = "" if self.mode == "inotify" else f" every {self.poll_interval:g}s; pip install watchdog for inotify"
+        print(f"   👀 Watching {self.input_dir} for new PDFs ({self.mode}{detail})")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+        for thread in self._threads:
+            thread.join(timeout=5)
@@ -0,0 +1,379 @@
+"""
+Processing worker: takes files off the shared job store (job_store.py) and
+runs them through both phases, so the web tier only queues work and reads
+status and its request latency does not depend on running jobs.
+
+Run it next to the web server (start_server.sh does this):
+    python worker.py                       # backend from PAPER_PIPELINE_BACKEND
+    python worker.py --backend vllm --watch
+    python worker.py --memory-budget 24000 --recycle-after 200
+
+Between files, the memory governor (memory_governor.py) may recycle the
+worker: a worker process restarts itself in place (same PID, the claimed
+file is re-queued first), an in-process worker drops its Phase 1 models.
+
+`python backend/app.py` (the development server) runs a Worker in-process
+instead, so a single command still works.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import artifact_store
+import dataset_export
+from job_store import JobStore, make_task
+from manifest import Manifest
+from memory_governor import MEMORY_BUDGET_MB, RECYCLE_AFTER_DOCS, MemoryGovernor
+from pdf_processor import (LocalPDFProcessor, ProcessingCancelled, ProcessingControl,
+                           PROFILE_HASHES, PROMPT_LAYOUTS)
+from scheduling import EtaModel, estimate_tokens
+from sla import SLA_UPGRADE_BATCH, SlaPolicy, backlog_eta_seconds
+
+PROJECT_ROOT = Path(__file__).parent.resolve()
+DATA_DIR = PROJECT_ROOT / "data"
+INPUT_DIR = DATA_DIR / "input"
+MARKDOWN_DIR = DATA_DIR / "markdown"
+OUTPUT_DIR = DATA_DIR / "output"
+
+# Phase 2 LLM backend: a BACKENDS or BACKEND_POOLS name from pdf_processor,
+# a comma-separated list of backends, or a path to a JSON pool config
+LLM_BACKEND = os.environ.get("PAPER_PIPELINE_BACKEND", "ollama")
+PROMPT_LAYOUT = os.environ.get("PAPER_PIPELINE_PROMPT_LAYOUT", "header-first")
+
+# Load the Phase 1 (Docling) models at startup instead of on the first queued file
+WARMUP_ON_START = os.environ.get("PAPER_PIPELINE_WARMUP", "0") == "1"
+
+# Queue PDFs as soon as they appear in data/input (uploads, copies, rsync)
+WATCH_INPUT = os.environ.get("PAPER_PIPELINE_WATCH", "0") == "1"
+
+# How often a worker in its own process checks the store for new work, pause
+# and cancel (an in-process worker is woken immediately)
+POLL_INTERVAL = float(os.environ.get("PAPER_PIPELINE_WORKER_POLL", 1.0))
+HEARTBEAT_SECONDS = 5.0
+
+# How often an idle worker looks for SLA-degraded papers to redo at full quality
+UPGRADE_CHECK_SECONDS = 60.0
+
+# Recycles of a worker process so far, carried across its restarts
+RECYCLES_ENV = "PAPER_PIPELINE_WORKER_RECYCLES"
+
+
+class Worker:
+    """Claims tasks from a JobStore and processes them one at a time."""
+
+    def __init__(self, store, manifest, backend=LLM_BACKEND, prompt_layout=PROMPT_LAYOUT,
+                 poll_interval=POLL_INTERVAL, warmup=WARMUP_ON_START, watch=WATCH_INPUT, sla=None,
+                 governor=None):
+        self.store = store
+        self.manifest = manifest
+        self.backend = backend
+        self.prompt_layout = prompt_layout
+        self.poll_interval = poll_interval
+        self.warmup = warmup
+        self.watch = watch
+
+        self.eta_model = EtaModel()      # Full-quality rates
+        self.sla = sla if sla is not None else SlaPolicy()
+        self.sla_eta_model = EtaModel()  # Rates of files done in SLA degraded mode
+        self._last_upgrade_check = 0.0
+        self.governor = governor if governor is not None else MemoryGovernor()
+        self.governor.recycles = int(os.environ.get(RECYCLES_ENV, 0))  # Restarts before this exec
+        self._restart_on_recycle = False  # Set by run(): restart the process instead of dropping models
+        self.run_gate = threading.Event()  # Cleared while the store says "paused"
+        self.run_gate.set()
+        self._current = None  # (task, ProcessingControl) of the file in progress
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._processor = None
+        self._watcher = None
+
+    @property
+    def processor(self):
+        if self._processor is None:
+            self._processor = LocalPDFProcessor(backend=self.backend, prompt_layout=self.prompt_layout,
+                                                manifest=self.manifest, governor=self.governor)
+        return self._processor
+
+    # --- Control: pause / resume / cancel coming from the web tier ---
+
+    def _sync_control(self):
+        state = self.store.state()
+        if state.get("status") == "paused":
+            self.run_gate.clear()
+        else:
+            self.run_gate.set()
+        with self._lock:
+            if self._current is not None:
+                task, control = self._current
+                if state.get("generation", 0) != task["generation"]:
+                    control.cancel()
+                    self.run_gate.set()  # Let a paused file unwind
+        return state
+
+    def _control_loop(self):
+        last_heartbeat = 0.0
+        while not self._stop.is_set():
+            self._sync_control()
+            if time.time() - last_heartbeat >= HEARTBEAT_SECONDS:
+                self.store.publish(worker={"pid": os.getpid(), "heartbeat": time.time()})
+                last_heartbeat = time.time()
+            self._wake.set()  # Let the main loop look for new work too
+            self.store.changed.wait(self.poll_interval)
+            self.store.changed.clear()
+
+    # --- Processing ---
+
+    def task_profile(self, task):
+        """Phase 1 profile of a task: its job's, else its category's; None for the processor's default."""
+        return task.get("profile") or self.store.category_profiles().get(task["category"])
+
+    def process_file(self, pdf_path, category, control, profile=None, sla=None):
+        """Process a single PDF file through the full pipeline.
+
+        Skips Phase 1 if markdown already exists (resumes from Phase 2),
+        unless `profile` is given and the Markdown was made with other
+        Phase 1 settings. With SLA degraded settings (`sla`, see
+        SlaPolicy.settings_for), existing Markdown is always kept and the
+        paper is flagged in the manifest for a full-quality upgrade.
+        Raises ProcessingCancelled if `control` is cancelled mid-file.
+        """
+        try:
+            processor = self.processor
+            md_path = MARKDOWN_DIR / category / f"{pdf_path.stem}.md"
+            row = self.manifest.get(category, pdf_path.name)
+            made_with = row["docling_version"] if row is not None else None
+            flagged = json.loads(row["degraded"]) if row is not None and row["degraded"] else {}
+            eta_model = self.sla_eta_model if sla else self.eta_model
+            degraded = {}
+
+            # Check if we can skip Phase 1 (markdown already exists)
+            if (self.manifest.is_done(category, pdf_path.name, 1) and artifact_store.exists(md_path)
+                    and (sla or profile is None or made_with in (None, PROFILE_HASHES.get(profile)))):
+                print(f"   ⏭️  Skipping Phase 1 - markdown exists: {md_path.name}")
+                if "profile" in flagged:
+                    degraded["profile"] = flagged["profile"]  # Still the degraded Markdown
+            else:
+                # Phase 1: PDF → Markdown
+                self.store.publish(current_phase=1)
+                phase1_start = time.time()
+                if sla and "profile" in sla:
+                    profile = degraded["profile"] = sla["profile"]
+                if not processor.convert_pdf_to_markdown(str(pdf_path), category, control, profile):
+                    return False
+                eta_model.record(1, time.time() - phase1_start, pdf_bytes=pdf_path.stat().st_size)
+
+            # Phase 2: Markdown → JSON
+            self.store.publish(current_phase=2)
+            phase2_start = time.time()
+            sla = sla or {}
+            json_success = processor.generate_json_from_markdown(str(md_path), category, control,
+                                                                 backend=sla.get("backend"),
+                                                                 compact=sla.get("compact_prompt", False))
+            if json_success:
+                eta_model.record(2, time.time() - phase2_start, tokens=estimate_tokens(md_path))
+                degraded.update({key: value for key, value in sla.items() if key != "profile"})
+                self.manifest.set_degraded(category, pdf_path.name, degraded)
+            return json_success
+
+        except ProcessingCancelled:
+            raise
+        except Exception as e:
+            print(f"Error processing {pdf_path.name}: {e}")
+            return False
+
+    def _loop(self):
+        requeued = self.store.requeue_running()
+        if requeued:
+            print(f"   ♻️  Re-queued {requeued} file(s) left running by a previous worker")
+        self.store.publish(memory=self.governor.status())
+        if self.warmup:
+            self.processor.warm_up()
+
+        while not self._stop.is_set():
+            self.update_sla()
+            task = self.store.claim()
+            if task is None:
+                self.queue_upgrades()
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+
+            pdf_path = Path(task["pdf_path"])
+            if not self.admit(pdf_path):
+                return  # Restarting; the task is re-queued by the new process
+            control = ProcessingControl(self.run_gate)
+            sla = self.sla.settings_for(task)
+            with self._lock:
+                self._current = (task, control)
+            self.store.publish(current=dict(task, sla=sla), current_phase=None, current_started_at=time.time())
+            self._sync_control()  # A cancel may have landed between claim and here
+
+            try:
+                success = self.process_file(pdf_path, task["category"], control, self.task_profile(task), sla)
+            except ProcessingCancelled:
+                success = None
+
+            with self._lock:
+                self._current = None
+            self.store.publish(eta=self.eta_model.stats(), eta_degraded=self.sla_eta_model.stats(),
+                               current=None, current_phase=None, current_started_at=None,
+                               llm_endpoints=self._processor.pool.stats() if self._processor else None,
+                               memory=self.governor.status())
+            self.store.finish(task, success)
+            if success and self.store.qsize() == 0:
+                self.refresh_datasets()
+
+    # --- Memory budget ---
+
+    def admit(self, pdf_path):
+        """
+        Make room for a claimed file: recycle first if the governor says so,
+        then wait until the machine has memory for it. Returns False if the
+        worker process is restarting instead.
+        """
+        cost = self.governor.estimate(pdf_path)
+        reason = self.governor.recycle_reason(cost)
+        if reason is not None:
+            if self._restart_on_recycle:
+                self.restart(reason)
+                return False
+            if self._processor is not None:
+                self._processor.release_phase1(reason)
+        if self.governor.wait_for_room(cost, self._stop):
+            self.store.publish(memory=self.governor.status())
+        return True
+
+    def restart(self, reason):
+        """Replace this worker process with a fresh one (same PID and arguments)."""
+        print(f"   ♻️  Recycling worker {os.getpid()} ({reason})")
+        self.stop()
+        os.environ[RECYCLES_ENV] = str(self.governor.recycles + 1)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+    # --- SLA mode ---
+
+    def update_sla(self):
+        """Set the SLA mode from the full-quality ETA of the backlog and publish it."""
+        if not self.sla.enabled:
+            return
+        state = self.store.state()
+        backlog = backlog_eta_seconds(dict(state, eta=self.eta_model.stats()), self.store.queued_tasks())
+        previous = self.sla.mode
+        if self.sla.update(backlog) != previous or state.get("sla") is None:
+            self.store.publish(sla=self.sla.status())
+
+    def queue_upgrades(self):
+        """
+        While idle and not degraded, queue papers made in SLA degraded mode
+        again at full quality (from Phase 1 if their Markdown was degraded).
+        """
+        if self.sla.mode == "degraded" or time.time() - self._last_upgrade_check < UPGRADE_CHECK_SECONDS:
+            return
+        self._last_upgrade_check = time.time()
+        rows = self.manifest.list_degraded(SLA_UPGRADE_BATCH)
+        if not rows:
+            return
+        job_id = self.store.create_job(len(rows))
+        tasks = []
+        for row in rows:
+            phase = 1 if "profile" in json.loads(row["degraded"]) else 2
+            self.manifest.reset(row["category"], row["filename"], from_phase=phase)
+            tasks.append(make_task(job_id, row["pdf_path"], row["category"],
+                                   self.manifest.get(row["category"], row["filename"])))
+        self.store.put_many(tasks)
+        print(f"   ⬆️  SLA: re-queued {len(tasks)} degraded paper(s) for a full-quality upgrade")
+
+    def refresh_datasets(self):
+        """Fold new results into the columnar datasets that have been exported before."""
+        try:
+            dataset_export.refresh_existing(OUTPUT_DIR, dataset_export.DATASET_DIR)
+        except Exception as e:
+            print(f"   ⚠️  Dataset update failed: {e}")
+
+    # --- Watch mode ---
+
+    def on_new_pdf(self, pdf_path, category):
+        """Watch callback: queue a new or changed PDF unless it is already processed."""
+        row = self.manifest.register_pdf(pdf_path, category)
+        if row["status"] == "completed":
+            return
+        print(f"   📥 Watch: queued {category}/{pdf_path.name}")
+        self.store.put(make_task(self.store.create_job(1), pdf_path, category, row))
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Run on background threads (in-process worker); returns self."""
+        if self.watch:
+            from watcher import InputWatcher
+            self._watcher = InputWatcher(INPUT_DIR, self.on_new_pdf).start()
+            self.store.publish(watch=self._watcher.mode)
+        for target, name in ((self._control_loop, "worker-control"), (self._loop, "worker")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def run(self):
+        """Run until interrupted (worker process)."""
+        self._restart_on_recycle = True
+        self.start()
+        try:
+            while not self._stop.wait(3600):
+                pass
+        except KeyboardInterrupt:
+            print("\n   🛑 Worker stopping")
+        finally:
+            self.stop()
+
+    def stop(self):
+        """
+        Stop taking new work. A file in progress is left as is: its task
+        stays "running" in the store and is re-queued when a worker starts.
+        """
+        self._stop.set()
+        self._wake.set()
+        self.store.changed.set()
+        if self._watcher is not None:
+            self._watcher.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paper Pipeline processing worker")
+    parser.add_argument("--backend", default=LLM_BACKEND,
+                        help="Phase 2 backend or pool (default: PAPER_PIPELINE_BACKEND or ollama)")
+    parser.add_argument("--prompt-layout", default=PROMPT_LAYOUT, choices=PROMPT_LAYOUTS)
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL,
+                        help="Seconds between job store checks (default: %(default)s)")
+    parser.add_argument("--watch", action="store_true", default=WATCH_INPUT,
+                        help="Queue new PDFs in data/input as they appear")
+    parser.add_argument("--warmup", action="store_true", default=WARMUP_ON_START,
+                        help="Load the Phase 1 models at startup")
+    parser.add_argument("--memory-budget", type=float, default=MEMORY_BUDGET_MB, metavar="MB",
+                        help="Restart the worker before its RSS would pass this (default: "
+                             "PAPER_PIPELINE_WORKER_MEMORY_MB, 0 = no limit)")
+    parser.add_argument("--recycle-after", type=int, default=RECYCLE_AFTER_DOCS, metavar="N",
+                        help="Restart the worker after N Phase 1 conversions (default: "
+                             "PAPER_PIPELINE_RECYCLE_AFTER, 0 = never)")
+    args = parser.parse_args()
+
+    manifest = Manifest()
+    manifest.sync(INPUT_DIR, MARKDOWN_DIR, OUTPUT_DIR)
+    store = JobStore()
+    print(f"   👷 Worker {os.getpid()} using job store {store.path}")
+    Worker(store, manifest, backend=args.backend, prompt_layout=args.prompt_layout,
+           poll_interval=args.poll_interval, warmup=args.warmup, watch=args.watch,
+           governor=MemoryGovernor(budget_mb=args.memory_budget, recycle_after=args.recycle_after)).run()
+
+
+if __name__ == "__main__":
+    main()